@@ -0,0 +1,150 @@
+# app/api/http.py
+
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+from models.user import User
+
+MAX_HEADER_LINES = 100
+
+class ApiError(Exception):
+    """An error reported to the client as {'error': message, ...} with an HTTP status"""
+
+    def __init__(self, status: int, message: str, **details):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes = b""
+    params: Dict[str, str] = field(default_factory=dict)  # From the route pattern
+    user: Optional[User] = None  # Set once the session token is checked
+
+    def json(self):
+        if not self.body:
+            raise ApiError(400, "Request body must be JSON")
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise ApiError(400, "Request body is not valid JSON")
+
+@dataclass
+class Response:
+    status: int = 200
+    body: object = None  # Serialized as JSON unless it is bytes
+    content_type: str = "application/json"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def encode(self, keep_alive: bool) -> bytes:
+        body = self.body if isinstance(self.body, bytes) else (
+            b"" if self.body is None else json.dumps(self.body, default=str).encode())
+        lines = [f"HTTP/1.1 {self.status} {HTTPStatus(self.status).phrase}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body:
+            lines.append(f"Content-Type: {self.content_type}")
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+@dataclass
+class Route:
+    method: str
+    pattern: re.Pattern
+    handler: Handler
+
+class Router:
+    """Match method and path against patterns like /api/users/{username}"""
+
+    def __init__(self):
+        self.routes: List[Route] = []
+
+    def add(self, method: str, path: str, handler: Handler):
+        pattern = re.sub(r"\\\{(\w+)\\\}", r"(?P<\1>[^/]+)", re.escape(path))
+        self.routes.append(Route(method, re.compile(f"^{pattern}$"), handler))
+
+    @property
+    def methods(self) -> Set[str]:
+        """Methods some route accepts"""
+        return {route.method for route in self.routes}
+
+    def resolve(self, method: str, path: str) -> Tuple[Handler, Dict[str, str]]:
+        allowed = False
+        for route in self.routes:
+            match = route.pattern.match(path)
+            if match:
+                if route.method == method:
+                    return route.handler, {name: unquote(value) for name, value in match.groupdict().items()}
+                allowed = True
+        if allowed:
+            raise ApiError(405, f"Method {method} not allowed on {path}")
+        raise ApiError(404, f"No such endpoint: {path}")
+
+async def read_request(reader: asyncio.StreamReader, max_body: int) -> Optional[Request]:
+    """Read one request from a keep-alive connection; None when the client closed it"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ApiError(400, "Malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ApiError(400, "Too many headers")
+    if version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+        headers.setdefault("connection", "close")
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise ApiError(400, "Invalid Content-Length")
+    if length > max_body:
+        raise ApiError(413, f"Request body is larger than {max_body} bytes")
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    return Request(method=method.upper(), path=url.path, query=dict(parse_qsl(url.query)),
+                   headers=headers, body=body)
+
+async def serve_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           dispatch: Handler, max_body: int):
+    """Serve requests on one connection until the client closes it or asks to"""
+    try:
+        while True:
+            try:
+                request = await read_request(reader, max_body)
+            except ApiError as e:
+                # The stream position is unknown after a bad request, so close it
+                writer.write(Response(e.status, {'error': e.message}).encode(keep_alive=False))
+                break
+            if request is None:
+                break
+            keep_alive = request.headers.get("connection", "").lower() != "close"
+            response = await dispatch(request)
+            writer.write(response.encode(keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
@@ -0,0 +1,536 @@
+# app/api/server.py
+"""Headless JSON API over the same storage and DataManager logic as the UI.
+
+For HR systems and scripts that sync with the leave data. Run from the
+project root:
+
+    python -m api.server --port 8502
+
+Log in with POST /api/login and send the returned token as
+"Authorization: Bearer <token>" on every other request; POST /api/logout
+revokes it. List endpoints take page and page_size and return
+{"items", "page", "page_size", "total"}.
+
+Calendar apps subscribe to /ics/... feeds with the long-lived token from
+GET /api/feeds instead; those honour If-None-Match and answer 304 while
+the feed is unchanged.
+"""
+
+import argparse
+import asyncio
+import calendar
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from config import (API_HOST, API_PORT, API_PAGE_SIZE, API_MAX_PAGE_SIZE, API_MAX_BODY,
+                    API_MAX_BULK, ICS_BASE_URL, ICS_MAX_AGE, LEAVE_TYPES, OUTBOX_DIR, SMTP_HOST,
+                    DEFAULT_TENANT)
+from models.leave import LeaveRequest
+from models.user import User
+from utils.auth import (LoginBusyError, PasswordVerifier, SessionSigner, create_admin_user,
+                        session_signer)
+from utils.audit import acting_as
+from utils.bulk_import import LEAVE_STATUSES
+from utils.data_manager import DataManager
+from utils.directory import SORT_FIELDS
+from utils.ics import ICSFeeds, feed_urls
+from utils.tenants import TenantRegistry
+from utils.metrics import API_REQUESTS, API_REQUEST_DURATION, LOGIN_ATTEMPTS
+from api.http import ApiError, Request, Response, Router, serve_connection
+
+def _int_param(query: Dict[str, str], name: str, default: Optional[int], minimum: int = None) -> Optional[int]:
+    value = query.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    if minimum is not None and number < minimum:
+        raise ApiError(400, f"{name} must be at least {minimum}")
+    return number
+
+def _parse_date(value, name: str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{name} must be a date in YYYY-MM-DD format")
+
+def user_json(user: User) -> dict:
+    """A user without the password hash"""
+    return {
+        'username': user.username,
+        'email': user.email,
+        'department': user.department,
+        'manager': user.manager,
+        'is_admin': user.is_admin,
+        'leave_balance': None if user.is_admin else dict(user.leave_balance),
+    }
+
+def _bulk_items(request: Request) -> list:
+    body = request.json()
+    items = body.get('items') if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError(400, "Body must be {\"items\": [...]} with at least one item")
+    if len(items) > API_MAX_BULK:
+        raise ApiError(413, f"At most {API_MAX_BULK} items per request")
+    return items
+
+class ApiServer:
+    """Routes API requests to the DataManager.
+
+    Handlers run one at a time on a single data thread, the same way
+    Streamlit sessions share one DataManager under its lock, and pick up
+    changes saved by other processes first. Password checks run on the
+    bounded verification pool without holding up the data thread.
+    """
+
+    def __init__(self, data_manager: DataManager, verifier: PasswordVerifier = None,
+                 signer: SessionSigner = None):
+        self.data_manager = data_manager
+        self.verifier = verifier or PasswordVerifier()
+        self.signer = signer or session_signer(data_manager.data_dir)
+        self.feeds = ICSFeeds(data_manager)
+        self._data_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-data")
+        self.router = Router()
+        self._add_routes()
+
+    def _add_routes(self):
+        routes = [
+            ('GET', '/api/health', self.health, True),
+            ('POST', '/api/logout', self.logout, False),
+            ('GET', '/api/users', self.list_users, False),
+            ('GET', '/api/users/{username}', self.get_user, False),
+            ('GET', '/api/users/{username}/balance', self.get_balance, False),
+            ('GET', '/api/leaves', self.list_leaves, False),
+            ('POST', '/api/leaves', self.submit_leave, False),
+            ('POST', '/api/leaves/bulk', self.submit_leaves, False),
+            ('GET', '/api/approvals', self.list_approvals, False),
+            ('POST', '/api/approvals/bulk', self.decide_bulk, False),
+            ('POST', '/api/approvals/{leave_id}/approve', self.approve, False),
+            ('POST', '/api/approvals/{leave_id}/reject', self.reject, False),
+            ('GET', '/api/calendar', self.calendar, False),
+            ('GET', '/api/holidays', self.list_holidays, False),
+            ('GET', '/api/feeds', self.feed_links, False),
+            # Feeds check their own token, see _feed_response()
+            ('GET', '/ics/org.ics', self.org_feed, True),
+            ('GET', '/ics/department/{department}.ics', self.department_feed, True),
+            ('GET', '/ics/user/{username}.ics', self.user_feed, True),
+        ]
+        self.router.add('POST', '/api/login', self.login)
+        for method, path, handler, public in routes:
+            self.router.add(method, path, self._on_data_thread(handler, public))
+        self._methods = self.router.methods
+
+    def _on_data_thread(self, handler: Callable[[Request], object], public: bool):
+        def call(request: Request):
+            self.data_manager.reload_if_changed()
+            if not public:
+                request.user = self._authenticate(request)
+            with acting_as(request.user.username if request.user else None):
+                return handler(request)
+
+        async def run(request: Request):
+            return await asyncio.get_running_loop().run_in_executor(self._data_thread, call, request)
+        return run
+
+    def _authenticate(self, request: Request) -> User:
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+        user = self.signer.verify(token, self.data_manager.users) if scheme.lower() == 'bearer' else None
+        if user is None:
+            raise ApiError(401, "Missing, invalid or expired session token")
+        return user
+
+    async def dispatch(self, request: Request) -> Response:
+        started = time.perf_counter()
+        try:
+            handler, request.params = self.router.resolve(request.method, request.path)
+            response = await handler(request)
+            if not isinstance(response, Response):
+                response = Response(200, response)
+        except ApiError as e:
+            response = Response(e.status, {'error': e.message, **e.details})
+        except Exception as e:
+            print(f"Error handling {request.method} {request.path}: {e}")
+            response = Response(500, {'error': "Internal server error"})
+        # The method comes from the client; other values would add a series each
+        method = request.method if request.method in self._methods else "other"
+        API_REQUESTS.inc(method=method, status=str(response.status))
+        API_REQUEST_DURATION.observe(time.perf_counter() - started)
+        return response
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(
+            lambda reader, writer: serve_connection(reader, writer, self.dispatch, API_MAX_BODY),
+            host, port)
+
+    # Helpers
+
+    def _require_admin(self, request: Request):
+        if not request.user.is_admin:
+            raise ApiError(403, "Admin access required")
+
+    def _require_self_or_admin(self, request: Request, username: str) -> User:
+        if not request.user.is_admin and request.user.username != username:
+            raise ApiError(403, "You can only access your own data")
+        user = self.data_manager.users.get(username)
+        if user is None:
+            raise ApiError(404, f"User '{username}' not found")
+        return user
+
+    def _page(self, request: Request, items: list, to_json: Callable) -> dict:
+        page = _int_param(request.query, 'page', 1, minimum=1)
+        page_size = min(_int_param(request.query, 'page_size', API_PAGE_SIZE, minimum=1), API_MAX_PAGE_SIZE)
+        offset = (page - 1) * page_size
+        return {'items': [to_json(item) for item in items[offset:offset + page_size]],
+                'page': page, 'page_size': page_size, 'total': len(items)}
+
+    def leave_json(self, leave: LeaveRequest) -> dict:
+        return {
+            'id': leave.id,
+            'username': leave.username,
+            'start_date': leave.start_date.isoformat(),
+            'end_date': leave.end_date.isoformat(),
+            'days': (leave.end_date - leave.start_date).days + 1,
+            'leave_type': leave.leave_type,
+            'reason': leave.reason,
+            'status': leave.status,
+            'stage': self.data_manager.approvals.current_stage(leave),
+            'admin_comment': leave.admin_comment,
+            'request_date': leave.request_date.isoformat() if leave.request_date else None,
+            'action_date': leave.action_date.isoformat() if leave.action_date else None,
+        }
+
+    def _new_leave(self, item, requester: User) -> LeaveRequest:
+        """Validate a submitted leave request the same way the request form does"""
+        if not isinstance(item, dict):
+            raise ApiError(400, "Each leave request must be an object")
+        username = item.get('username') or requester.username
+        if username != requester.username and not requester.is_admin:
+            raise ApiError(403, "You can only request leave for yourself")
+        user = self.data_manager.users.get(username)
+        if user is None:
+            raise ApiError(404, f"User '{username}' not found")
+        if user.is_admin:
+            raise ApiError(400, f"Admin '{username}' has no leave balance")
+        start_date = _parse_date(item.get('start_date'), 'start_date')
+        end_date = _parse_date(item.get('end_date'), 'end_date')
+        if end_date < start_date:
+            raise ApiError(400, "end_date is before start_date")
+        leave_type = item.get('leave_type')
+        if leave_type not in LEAVE_TYPES:
+            raise ApiError(400, f"leave_type must be one of {', '.join(LEAVE_TYPES)}")
+        reason = str(item.get('reason') or '').strip()
+        if not reason:
+            raise ApiError(400, "reason is required")
+        duration = (end_date - start_date).days + 1
+        if duration > user.leave_balance.get(leave_type, 0):
+            raise ApiError(400, f"Insufficient {leave_type} balance for {username}")
+        return LeaveRequest(id="", username=username, start_date=start_date, end_date=end_date,
+                            leave_type=leave_type, reason=reason)
+
+    def _actionable(self, leave_id: str, approver: User) -> LeaveRequest:
+        leave = self.data_manager._find_leave(leave_id)
+        if leave is None:
+            raise ApiError(404, f"Leave request '{leave_id}' not found")
+        if self.data_manager.approvals.current_stage(leave) is None:
+            raise ApiError(409, f"Leave request '{leave_id}' is not pending")
+        if not self.data_manager.approvals.can_act(leave, approver.username, approver.is_admin):
+            raise ApiError(403, f"Leave request '{leave_id}' is waiting for another approver")
+        return leave
+
+    def _decide(self, leave_id: str, action: str, approver: User, comment: str) -> dict:
+        approvals = self.data_manager.approvals
+        if action == 'approve':
+            status = approvals.approve(leave_id, approver.username, comment)
+        else:
+            approvals.reject(leave_id, approver.username, comment)
+            status = "Rejected"
+        return {'id': leave_id, 'status': status,
+                'stage': approvals.current_stage(self.data_manager._find_leave(leave_id))}
+
+    # Endpoints
+
+    async def login(self, request: Request) -> dict:
+        body = request.json()
+        username = body.get('username') if isinstance(body, dict) else None
+        password = body.get('password') if isinstance(body, dict) else None
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise ApiError(400, "username and password are required")
+        # Users and passwords saved by the app since the last request count
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._data_thread, self.data_manager.reload_if_changed)
+        user = self.data_manager.users.get(username)
+        if user is None:
+            LOGIN_ATTEMPTS.inc(result="unknown_user")
+            raise ApiError(401, "Invalid username or password")
+        try:
+            future = self.verifier.submit(user.password, password)
+        except LoginBusyError as e:
+            LOGIN_ATTEMPTS.inc(result="busy")
+            raise ApiError(503, str(e))
+        valid, upgraded_hash = await asyncio.wrap_future(future)
+        if not valid:
+            LOGIN_ATTEMPTS.inc(result="invalid_password")
+            raise ApiError(401, "Invalid username or password")
+        LOGIN_ATTEMPTS.inc(result="success")
+        if upgraded_hash:
+            await loop.run_in_executor(
+                self._data_thread, self.data_manager.update_user, username, {'password': upgraded_hash})
+        user = self.data_manager.users[username]
+        return {'token': self.signer.issue(user), 'expires_in': self.signer.ttl, 'user': user_json(user)}
+
+    def logout(self, request: Request) -> dict:
+        """Revoke the bearer token the request was made with"""
+        token = request.headers.get('authorization', '').partition(' ')[2]
+        self.signer.revoke(token, self.data_manager.users)
+        return {'status': "logged out"}
+
+    def health(self, request: Request) -> dict:
+        return {'status': "ok", 'version': self.data_manager.version}
+
+    def list_users(self, request: Request) -> dict:
+        """Users matching q, sorted by username, email or department"""
+        self._require_admin(request)
+        sort_by = request.query.get('sort', 'username')
+        if sort_by not in SORT_FIELDS:
+            raise ApiError(400, f"sort must be one of {', '.join(SORT_FIELDS)}")
+        role = request.query.get('role')
+        if role not in (None, 'admin', 'user'):
+            raise ApiError(400, "role must be admin or user")
+        page = _int_param(request.query, 'page', 1, minimum=1)
+        page_size = min(_int_param(request.query, 'page_size', API_PAGE_SIZE, minimum=1), API_MAX_PAGE_SIZE)
+        result = self.data_manager.user_directory.search(
+            request.query.get('q', ''), sort_by, request.query.get('desc') in ('1', 'true'),
+            page, page_size, None if role is None else role == 'admin')
+        users = self.data_manager.users
+        return {'items': [user_json(users[username]) for username in result.usernames],
+                'page': page, 'page_size': page_size, 'total': result.total}
+
+    def get_user(self, request: Request) -> dict:
+        return user_json(self._require_self_or_admin(request, request.params['username']))
+
+    def get_balance(self, request: Request) -> dict:
+        """Leave balance and days already requested but not yet decided"""
+        user = self._require_self_or_admin(request, request.params['username'])
+        if user.is_admin:
+            raise ApiError(404, f"Admin '{user.username}' has no leave balance")
+        pending = {leave_type: 0 for leave_type in user.leave_balance}
+        for leave in self.data_manager.leave_index.leaves(user.username):
+            if leave.status == "Pending":
+                pending[leave.leave_type] = pending.get(leave.leave_type, 0) + (
+                    (leave.end_date - leave.start_date).days + 1)
+        return {'username': user.username, 'balance': dict(user.leave_balance), 'pending_days': pending}
+
+    def list_leaves(self, request: Request) -> dict:
+        """Leave requests of the loaded years, or of one year.
+
+        Filters: username, department, status, year. Non-admins only see
+        their own requests.
+        """
+        query = request.query
+        username = query.get('username')
+        if not request.user.is_admin:
+            if username and username != request.user.username:
+                raise ApiError(403, "You can only access your own data")
+            username = request.user.username
+        status = query.get('status')
+        if status and status not in LEAVE_STATUSES:
+            raise ApiError(400, f"status must be one of {', '.join(LEAVE_STATUSES)}")
+        year = _int_param(query, 'year', None)
+
+        leave_index = self.data_manager.leave_index
+        if year is not None and year not in self.data_manager.loaded_years:
+            # An archived year is read for this request without loading it
+            snapshot = self.data_manager.snapshot([year])
+            if username:
+                leaves = snapshot.user_leaves(username)
+            elif query.get('department'):
+                leaves = snapshot.leaves_for(snapshot.members(query['department']), status)
+            else:
+                leaves = snapshot.leave_requests
+        elif username:
+            leaves = leave_index.leaves(username)
+        elif query.get('department'):
+            leaves = leave_index.leaves_for(self.data_manager.departments.members(query['department']), status)
+        elif status == "Pending":
+            leaves = self.data_manager.get_pending_leaves()
+        else:
+            leaves = self.data_manager.visible_leaves()
+        leaves = [leave for leave in leaves
+                  if (not status or leave.status == status)
+                  and (year is None or leave.start_date.year == year)]
+        return self._page(request, leaves, self.leave_json)
+
+    def submit_leave(self, request: Request) -> Response:
+        leave = self._new_leave(request.json(), request.user)
+        self.data_manager.add_leave_request(leave)
+        return Response(201, self.leave_json(leave))
+
+    def submit_leaves(self, request: Request) -> Response:
+        """Submit many leave requests in one save; nothing is submitted if any is invalid"""
+        leaves, errors = [], []
+        for index, item in enumerate(_bulk_items(request)):
+            try:
+                leaves.append(self._new_leave(item, request.user))
+            except ApiError as e:
+                errors.append({'index': index, 'error': e.message})
+        if errors:
+            raise ApiError(400, "No leave requests were submitted", errors=errors)
+        with self.data_manager.transaction():
+            for leave in leaves:
+                self.data_manager.add_leave_request(leave)
+        return Response(201, {'items': [self.leave_json(leave) for leave in leaves]})
+
+    def list_approvals(self, request: Request) -> dict:
+        """Requests waiting for the caller, oldest first within each queue"""
+        approvals = self.data_manager.approvals
+        department = request.query.get('department')
+        leaves = [leave for key in approvals.queue_keys_for(request.user.username, request.user.is_admin)
+                  for leave in approvals.queue(key, department)]
+        return self._page(request, leaves, self.leave_json)
+
+    def _comment(self, request: Request) -> str:
+        body = request.json() if request.body else {}
+        return str(body.get('comment') or '') if isinstance(body, dict) else ''
+
+    def approve(self, request: Request) -> dict:
+        leave_id = request.params['leave_id']
+        self._actionable(leave_id, request.user)
+        return self._decide(leave_id, 'approve', request.user, self._comment(request))
+
+    def reject(self, request: Request) -> dict:
+        leave_id = request.params['leave_id']
+        self._actionable(leave_id, request.user)
+        return self._decide(leave_id, 'reject', request.user, self._comment(request))
+
+    def decide_bulk(self, request: Request) -> dict:
+        """Approve or reject many requests in one save; nothing changes if any cannot be decided
+
+        Items are {"id", "action": "approve" or "reject", "comment"}.
+        """
+        decisions, errors, seen = [], [], set()
+        for index, item in enumerate(_bulk_items(request)):
+            leave_id = item.get('id') if isinstance(item, dict) else None
+            action = item.get('action', 'approve') if isinstance(item, dict) else None
+            try:
+                if not isinstance(leave_id, str) or action not in ('approve', 'reject'):
+                    raise ApiError(400, "Each item needs an id and an action of approve or reject")
+                if leave_id in seen:
+                    raise ApiError(409, f"Leave request '{leave_id}' appears more than once")
+                self._actionable(leave_id, request.user)
+            except ApiError as e:
+                errors.append({'index': index, 'id': leave_id, 'error': e.message})
+                continue
+            seen.add(leave_id)
+            decisions.append((leave_id, action, str(item.get('comment') or '')))
+        if errors:
+            raise ApiError(409, "No requests were approved or rejected", errors=errors)
+        with self.data_manager.transaction():
+            results = [self._decide(leave_id, action, request.user, comment)
+                       for leave_id, action, comment in decisions]
+        return {'items': results}
+
+    def calendar(self, request: Request) -> dict:
+        """Who is on approved leave on each day of a month, and holidays"""
+        today = date.today()
+        year = _int_param(request.query, 'year', today.year, minimum=1)
+        month = _int_param(request.query, 'month', today.month, minimum=1)
+        if month > 12:
+            raise ApiError(400, "month must be between 1 and 12")
+        department = request.query.get('department') or None
+        first_day = date(year, month, 1)
+        last_day = date(year, month, calendar.monthrange(year, month)[1])
+
+        on_leave: Dict[date, List[dict]] = {}
+        for leave in self.data_manager.get_approved_leaves(first_day, last_day, department):
+            day = max(leave.start_date, first_day)
+            while day <= min(leave.end_date, last_day):
+                on_leave.setdefault(day, []).append({'username': leave.username, 'leave_type': leave.leave_type})
+                day += timedelta(days=1)
+        holidays = {holiday['date']: holiday['description'] for holiday in self.data_manager.holidays
+                    if first_day.isoformat() <= holiday['date'] <= last_day.isoformat()}
+
+        days = []
+        for day_number in range(1, last_day.day + 1):
+            day = date(year, month, day_number)
+            leaves = on_leave.get(day, [])
+            days.append({'date': day.isoformat(), 'on_leave': len(leaves), 'leaves': leaves,
+                         'holiday': holidays.get(day.isoformat())})
+        return {'year': year, 'month': month, 'department': department, 'days': days}
+
+    def list_holidays(self, request: Request) -> dict:
+        year = _int_param(request.query, 'year', None)
+        holidays = sorted((holiday for holiday in self.data_manager.holidays
+                           if year is None or holiday['date'].startswith(f"{year:04d}-")),
+                          key=lambda holiday: holiday['date'])
+        return self._page(request, holidays, dict)
+
+    def feed_links(self, request: Request) -> dict:
+        """Subscription URLs of the caller's calendar feeds"""
+        user = request.user
+        return feed_urls(ICS_BASE_URL, user, self.signer.feed_token(user))
+
+    def _feed_response(self, request: Request, kind: str, name: str = "") -> Response:
+        if self.signer.verify_feed_token(request.query.get('token', ''), self.data_manager.users) is None:
+            raise ApiError(401, "Missing or invalid feed token")
+        feed = self.feeds.feed(kind, name)
+        headers = {'ETag': feed.etag, 'Cache-Control': f"private, max-age={ICS_MAX_AGE}"}
+        if_none_match = request.headers.get('if-none-match', '')
+        if if_none_match.strip() == '*' or feed.etag in (tag.strip() for tag in if_none_match.split(',')):
+            return Response(304, headers=headers)
+        return Response(200, feed.body, content_type="text/calendar; charset=utf-8", headers=headers)
+
+    def org_feed(self, request: Request) -> Response:
+        return self._feed_response(request, 'org')
+
+    def department_feed(self, request: Request) -> Response:
+        department = self.data_manager.departments.normalize(request.params['department'])
+        if department not in self.data_manager.departments.departments():
+            raise ApiError(404, f"Department '{department}' not found")
+        return self._feed_response(request, 'department', department)
+
+    def user_feed(self, request: Request) -> Response:
+        """A person's own feed, with reasons; only for them and admins"""
+        user = self.signer.verify_feed_token(request.query.get('token', ''), self.data_manager.users)
+        username = request.params['username']
+        if user is not None and not user.is_admin and user.username != username:
+            raise ApiError(403, "You can only subscribe to your own leave feed")
+        if username not in self.data_manager.users:
+            raise ApiError(404, f"User '{username}' not found")
+        return self._feed_response(request, 'user', username)
+
+async def serve(data_manager: DataManager, host: str = API_HOST, port: int = API_PORT):
+    server = await ApiServer(data_manager).start(host, port)
+    print(f"Leave Management API listening on http://{host}:{server.sockets[0].getsockname()[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--data-dir', help="Data directory (defaults to config.DATA_DIR)")
+    parser.add_argument('--tenant', default=DEFAULT_TENANT, help="Organization to serve")
+    args = parser.parse_args()
+
+    registry = TenantRegistry(args.data_dir)
+    if registry.get(args.tenant) is None:
+        parser.error(f"Unknown organization '{args.tenant}'")
+    data_manager = DataManager(registry.data_dir_for(args.tenant), tenant=args.tenant)
+    if 'admin' not in data_manager.users:
+        data_manager.add_user(create_admin_user())
+
+    # Queue notifications for API changes; the app's outbox worker delivers them
+    if SMTP_HOST:
+        from utils.notifications import LeaveNotifier, Outbox
+        LeaveNotifier(data_manager, Outbox(data_manager.data_dir / OUTBOX_DIR.name))
+
+    try:
+        asyncio.run(serve(data_manager, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
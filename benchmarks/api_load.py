@@ -0,0 +1,204 @@
+# app/benchmarks/api_load.py
+"""Requests per second of the JSON API service on one core.
+
+Starts the API server in a subprocess (pinned to one CPU where the platform
+allows) on a synthetic organisation, drives it with keep-alive connections
+issuing a mix of list, lookup, calendar and submit requests, and compares
+approving a batch of requests one call at a time with one bulk call. Run
+from the project root:
+
+    python -m benchmarks.api_load --users 1000 --leaves 20000 --connections 16 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Tuple
+from config import ADMIN_PASSWORD, ADMIN_USERNAME
+from utils.auth import create_admin_user
+from utils.data_manager import DataManager
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import generate_org
+
+class Client:
+    """One keep-alive HTTP/1.1 client connection"""
+
+    def __init__(self, port: int, token: str = None):
+        self.port = port
+        self.token = token
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        return self
+
+    async def request(self, method: str, path: str, payload: bytes = b"", headers: dict = None):
+        """Send one request; returns status, lower-cased response headers and body"""
+        lines = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(payload)}"]
+        if self.token:
+            lines.append(f"Authorization: Bearer {self.token}")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get("content-length", 0))
+        data = await self.reader.readexactly(length) if length else b""
+        return status, response_headers, data
+
+    async def call(self, method: str, path: str, body=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        status, _, data = await self.request(method, path, payload)
+        return status, json.loads(data) if data else None
+
+    def close(self):
+        self.writer.close()
+
+def request_mix(rng: random.Random, usernames, today: date):
+    """(label, method, path, body) for one request of the mix"""
+    kind = rng.choices(['users', 'leaves', 'pending', 'balance', 'calendar', 'submit'],
+                       weights=[15, 20, 15, 25, 15, 10])[0]
+    if kind == 'users':
+        return kind, 'GET', f"/api/users?page={rng.randint(1, 10)}&page_size=50&sort=department", None
+    if kind == 'leaves':
+        return kind, 'GET', f"/api/leaves?username={rng.choice(usernames)}", None
+    if kind == 'pending':
+        return kind, 'GET', f"/api/leaves?status=Pending&page={rng.randint(1, 5)}&page_size=50", None
+    if kind == 'balance':
+        return kind, 'GET', f"/api/users/{rng.choice(usernames)}/balance", None
+    if kind == 'calendar':
+        return kind, 'GET', f"/api/calendar?year={today.year}&month={rng.randint(1, 12)}", None
+    start = today + timedelta(days=rng.randint(7, 120))
+    return kind, 'POST', "/api/leaves", {
+        'username': rng.choice(usernames), 'start_date': start.isoformat(),
+        'end_date': start.isoformat(), 'leave_type': 'CL', 'reason': "Load test"}
+
+async def run_load(port: int, token: str, usernames, connections: int, requests: int, seed: int):
+    """Each connection sends `requests` requests back to back"""
+    latencies, statuses = {}, Counter()
+
+    async def connection(index):
+        rng = random.Random(seed + index)
+        client = await Client(port, token).connect()
+        try:
+            for _ in range(requests):
+                label, method, path, body = request_mix(rng, usernames, date.today())
+                start = time.perf_counter()
+                status, _ = await client.call(method, path, body)
+                latencies.setdefault(label, []).append(time.perf_counter() - start)
+                statuses[status] += 1
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(index) for index in range(connections)))
+    return latencies, statuses, time.perf_counter() - start
+
+async def approve_batches(port: int, token: str, batch: int):
+    """Seconds to approve `batch` requests one by one, then another `batch` in one bulk call"""
+    client = await Client(port, token).connect()
+    try:
+        _, page = await client.call('GET', f"/api/approvals?page_size={2 * batch}")
+        ids = [item['id'] for item in page['items']]
+        single, bulk = ids[:batch], ids[batch:2 * batch]
+
+        start = time.perf_counter()
+        for leave_id in single:
+            await client.call('POST', f"/api/approvals/{leave_id}/approve", {'comment': "ok"})
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        status, _ = await client.call('POST', "/api/approvals/bulk", {
+            'items': [{'id': leave_id, 'action': 'approve'} for leave_id in bulk]})
+        bulk_seconds = time.perf_counter() - start
+        assert status == 200, status
+        return len(single), single_seconds, len(bulk), bulk_seconds
+    finally:
+        client.close()
+
+def start_server(data_dir: str, cpu: int) -> Tuple[subprocess.Popen, int]:
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'api.server', '--port', '0', '--data-dir', data_dir],
+        stdout=subprocess.PIPE, text=True)
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(process.pid, {cpu})
+    line = process.stdout.readline()
+    if 'listening' not in line:
+        process.kill()
+        raise RuntimeError(f"API server did not start: {line!r}")
+    return process, int(line.rsplit(':', 1)[1])
+
+async def login(port: int, username: str, password: str) -> str:
+    client = await Client(port).connect()
+    try:
+        status, body = await client.call('POST', "/api/login", {'username': username, 'password': password})
+        assert status == 200, body
+        return body['token']
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--leaves', type=int, default=20000)
+    parser.add_argument('--connections', type=int, default=16, help="Concurrent keep-alive connections")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per connection")
+    parser.add_argument('--batch', type=int, default=100, help="Requests approved singly and in bulk")
+    parser.add_argument('--cpu', type=int, default=0, help="CPU the server is pinned to")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_manager = DataManager(data_dir)
+        generate_org(data_manager, args.users, args.leaves, args.seed)
+        data_manager.add_user(create_admin_user())
+        usernames = [name for name, user in data_manager.users.items() if not user.is_admin]
+
+        process, port = start_server(data_dir, args.cpu)
+        try:
+            token = asyncio.run(login(port, ADMIN_USERNAME, ADMIN_PASSWORD))
+            latencies, statuses, elapsed = asyncio.run(
+                run_load(port, token, usernames, args.connections, args.requests, args.seed))
+            single, single_seconds, bulk, bulk_seconds = asyncio.run(approve_batches(port, token, args.batch))
+        finally:
+            process.terminate()
+            process.wait()
+
+    total = sum(len(samples) for samples in latencies.values())
+    results = {
+        'config': vars(args),
+        'cpu_count': os.cpu_count(),
+        'requests': total,
+        'elapsed_s': elapsed,
+        'requests_per_s': total / elapsed if elapsed else 0.0,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'latency': summarize([sample for samples in latencies.values() for sample in samples]),
+        'by_endpoint': {label: summarize(samples) for label, samples in sorted(latencies.items())},
+        'approve_single': {'requests': single, 'seconds': single_seconds},
+        'approve_bulk': {'requests': bulk, 'seconds': bulk_seconds},
+    }
+
+    print(f"{total} requests over {args.connections} connections in {elapsed:.2f}s: "
+          f"{results['requests_per_s']:.0f} req/s  p50 {results['latency']['p50_ms']:.1f} ms  "
+          f"p95 {results['latency']['p95_ms']:.1f} ms  statuses {results['statuses']}")
+    for label, summary in results['by_endpoint'].items():
+        print(f"  {label:9} p50 {summary['p50_ms']:7.2f} ms  p95 {summary['p95_ms']:7.2f} ms")
+    print(f"approve {single} one by one: {single_seconds:.2f}s; {bulk} in one bulk call: {bulk_seconds:.2f}s")
+    print(f"Results written to {write_results('api_load', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
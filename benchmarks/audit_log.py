@@ -0,0 +1,99 @@
+# app/benchmarks/audit_log.py
+"""Append throughput, size and query latency of the audit log.
+
+Writes years of synthetic events (approvals, balance edits, submissions)
+in batches, as saves do, then times typical admin queries such as
+"everything that happened to user X last quarter". Run from the project
+root:
+
+    python -m benchmarks.audit_log --events 2000000 --users 5000 --years 3
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from utils.audit import AuditEvent, AuditLog
+from benchmarks.common import time_call, write_results
+
+ACTIONS = {'leave_submitted': 45, 'leave_status_changed': 35, 'leave_stage_approved': 10, 'user_updated': 10}
+
+def synthetic_events(rng: random.Random, count: int, users: int, admins: int, start: datetime, end: datetime):
+    """Events spread evenly over [start, end], oldest first"""
+    step = (end - start) / count
+    actions, weights = list(ACTIONS), list(ACTIONS.values())
+    for i in range(count):
+        action = rng.choices(actions, weights)[0]
+        target = f"user{rng.randrange(users):06d}"
+        actor = target if action == 'leave_submitted' else f"admin{rng.randrange(admins):02d}"
+        if action == 'user_updated':
+            details = {'leave_balance': [{'EL': 10, 'CL': 4}, {'EL': 9, 'CL': 4}]}
+        else:
+            details = {'leave_id': str(uuid.UUID(int=rng.getrandbits(128))), 'status': ['Pending', 'Approved']}
+        yield AuditEvent(action, target, details, actor=actor, timestamp=start + step * i)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--admins', type=int, default=20)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--batch', type=int, default=50, help="Events per append, i.e. per save")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    end = datetime.now()
+    start = end - timedelta(days=365 * args.years)
+    with tempfile.TemporaryDirectory() as directory:
+        log = AuditLog(directory)
+        batch, appended = [], time.perf_counter()
+        for event in synthetic_events(rng, args.events, args.users, args.admins, start, end):
+            batch.append(event)
+            if len(batch) == args.batch:
+                log.append(batch)
+                batch = []
+        log.append(batch)
+        append_seconds = time.perf_counter() - appended
+
+        quarter = (end - timedelta(days=91), end)
+        target, actor = "user000042", "admin03"
+        queries = {
+            'target_last_quarter': lambda: log.query(target=target, start=quarter[0], end=quarter[1]),
+            'target_all_time': lambda: log.query(target=target, limit=10 ** 6),
+            'actor_last_quarter': lambda: log.query(actor=actor, start=quarter[0], end=quarter[1]),
+            'actor_action_last_year': lambda: log.query(actor=actor, action='leave_status_changed',
+                                                        start=end - timedelta(days=365), end=end),
+            'latest_500': lambda: log.query(),
+        }
+        results = {
+            'config': vars(args),
+            'events': len(log),
+            'append_events_per_s': args.events / append_seconds if append_seconds else 0.0,
+            'bytes': {name: os.path.getsize(path) for name, path in
+                      (('log', log.log_file), ('index', log.index_file), ('names', log.names_file))},
+            'queries': {},
+        }
+        results['bytes_per_event'] = sum(results['bytes'].values()) / max(1, len(log))
+        # A fresh instance, like a new server process, opens the log first
+        reopen = time.perf_counter()
+        AuditLog(directory)
+        results['open_ms'] = (time.perf_counter() - reopen) * 1000
+        for name, query in queries.items():
+            results['queries'][name] = time_call(query, 10)
+            results['queries'][name]['matches'] = len(query())
+
+    print(f"{results['events']:,} events appended at {results['append_events_per_s']:,.0f}/s "
+          f"in batches of {args.batch}; {results['bytes_per_event']:.1f} bytes/event; "
+          f"open {results['open_ms']:.1f} ms")
+    for name, summary in results['queries'].items():
+        print(f"  {name:24} {summary['matches']:6d} matches  p50 {summary['p50_ms']:7.2f} ms  "
+              f"p95 {summary['p95_ms']:7.2f} ms")
+    print(f"Results written to {write_results('audit_log', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
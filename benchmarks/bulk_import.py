@@ -0,0 +1,72 @@
+# app/benchmarks/bulk_import.py
+"""Bulk user import time: plain passwords at the import cost vs pre-hashed.
+
+Writes a CSV of --users new users and imports it into an empty data
+directory through BulkImporter, once with plain passwords (hashed at
+PASSWORD_IMPORT_SCRYPT_N) and once with scrypt hashes exported from another
+installation. The first login of an imported user upgrades the hash to
+PASSWORD_SCRYPT_N; its cost is measured on --logins users. Run from the
+project root:
+
+    python -m benchmarks.bulk_import --users 50000
+"""
+
+import argparse
+import csv
+import io
+import tempfile
+import time
+from config import PASSWORD_IMPORT_SCRYPT_N, PASSWORD_SCRYPT_N
+from utils.auth import PasswordVerifier, hash_password
+from utils.bulk_import import BulkImporter, iter_csv_rows
+from utils.data_manager import DataManager
+from benchmarks.common import summarize, write_results
+
+def make_csv(users: int, hashed: bool) -> str:
+    # One exported hash stands in for all of them; hashing 50,000 at full cost is what is avoided
+    exported = hash_password("password") if hashed else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['username', 'password', 'email', 'department'])
+    for i in range(users):
+        writer.writerow([f"import{i:06d}", exported or "password", f"import{i:06d}@example.com",
+                         f"Dept {i % 20:02d}"])
+    return buffer.getvalue()
+
+def run(users: int, hashed: bool, logins: int) -> dict:
+    text = make_csv(users, hashed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_manager = DataManager(data_dir)
+        start = time.perf_counter()
+        result = BulkImporter(data_manager).run(iter_csv_rows(io.StringIO(text)), 'users')
+        elapsed = time.perf_counter() - start
+
+        verifier = PasswordVerifier()
+        samples, upgraded = [], 0
+        for username in sorted(data_manager.users)[:logins]:
+            begin = time.perf_counter()
+            valid, new_hash = verifier.verify(data_manager.users[username].password, "password")
+            samples.append(time.perf_counter() - begin)
+            upgraded += valid and new_hash is not None
+    return {'import_s': elapsed, 'imported': result.imported, 'errors': len(result.errors),
+            'users_per_s': result.imported / elapsed, 'first_login': summarize(samples),
+            'upgraded_at_login': upgraded}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--logins', type=int, default=20, help="Imported users logging in afterwards")
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    results = {'config': {**vars(args), 'import_scrypt_n': PASSWORD_IMPORT_SCRYPT_N,
+                          'scrypt_n': PASSWORD_SCRYPT_N}, 'modes': {}}
+    for mode in ('plain', 'hashed'):
+        result = results['modes'][mode] = run(args.users, mode == 'hashed', args.logins)
+        print(f"{mode:7} {result['imported']} users in {result['import_s']:6.2f}s "
+              f"({result['users_per_s']:8.0f}/s)  first login p50 {result['first_login']['p50_ms']:6.1f} ms, "
+              f"{result['upgraded_at_login']}/{args.logins} hashes upgraded")
+    print(f"Results written to {write_results('bulk_import', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
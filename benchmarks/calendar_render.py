@@ -0,0 +1,87 @@
+# app/benchmarks/calendar_render.py
+"""Calendar page rerun time and payload: HTML table vs Plotly figure.
+
+Builds a synthetic organisation and, for every month of the year and every
+department view, produces what a rerun of the calendar page sends: the
+Plotly table figure serialized to JSON the way st.plotly_chart does, or the
+HTML fragment with its stylesheet. Each view is rerun --repeat times in a
+row with unchanged data, through CalendarView.month_grid: cold clears the
+month cache before each rerun (leaves, table and fragment rebuilt), warm
+keeps it (only the first rerun of a view builds). The Plotly path also
+makes the browser load and run plotly.js, which is not counted here. Run
+from the project root:
+
+    python -m benchmarks.calendar_render --users 2000 --leaves 50000
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import date
+from components.calendar_view import CalendarView
+from components.calendar_html import CALENDAR_CSS, MONTH_CACHE
+from utils.data_manager import DataManager
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import generate_org
+
+def plotly_payload(calendar_view: CalendarView, view) -> int:
+    import plotly.io as pio
+
+    grid = calendar_view.month_grid(*view, renderer='plotly')
+    return len(pio.to_json(calendar_view._build_figure(*grid.table), validate=False).encode())
+
+def html_payload(calendar_view: CalendarView, view) -> int:
+    return len((CALENDAR_CSS + calendar_view.month_grid(*view, renderer='html').html).encode())
+
+def timed(func, calendar_view: CalendarView, views, repeat: int, cold: bool) -> tuple:
+    """Rerun each view repeat times in a row, as reruns of one page do"""
+    samples, sizes = [], []
+    for view in views:
+        for _ in range(repeat):
+            if cold:
+                MONTH_CACHE.clear()
+            start = time.perf_counter()
+            size = func(calendar_view, view)
+            samples.append(time.perf_counter() - start)
+        sizes.append(size)
+    return samples, sizes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--leaves', type=int, default=50000)
+    parser.add_argument('--year', type=int, default=date.today().year)
+    parser.add_argument('--repeat', type=int, default=5, help="Reruns of each view")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    results = {'config': vars(args), 'renderers': {}}
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_manager = DataManager(data_dir)
+        generate_org(data_manager, args.users, args.leaves, args.seed)
+        calendar_view = CalendarView(data_manager)
+        departments = [None] + data_manager.departments.departments()
+        views = [(args.year, month, department) for month in range(1, 13) for department in departments]
+        results['views'] = len(views)
+
+        plotly_payload(calendar_view, views[0])  # Import plotly outside the timings
+        for name, func in (('plotly', plotly_payload), ('html', html_payload)):
+            for cold in (True, False):
+                mode = f"{name}_{'cold' if cold else 'warm'}"
+                MONTH_CACHE.clear()
+                before = MONTH_CACHE.info()
+                samples, sizes = timed(func, calendar_view, views, args.repeat, cold)
+                cache = {stat: MONTH_CACHE.info()[stat] - before[stat] for stat in ('hits', 'misses')}
+                result = results['renderers'][mode] = {
+                    'render': summarize(samples), 'bytes_mean': sum(sizes) / len(sizes),
+                    'bytes_max': max(sizes), 'cache': cache}
+                print(f"{mode:11} rerun p50 {result['render']['p50_ms']:7.3f} ms  "
+                      f"p95 {result['render']['p95_ms']:7.3f} ms  "
+                      f"payload mean {result['bytes_mean'] / 1024:6.1f} KiB "
+                      f"max {result['bytes_max'] / 1024:6.1f} KiB  "
+                      f"cache {result['cache']['hits']} hits, {result['cache']['misses']} misses")
+    print(f"{len(views)} views; results written to {write_results('calendar_render', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# app/benchmarks/common.py
+
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+def percentile(samples, pct: float) -> float:
+    """Return the pct-th percentile of samples (nearest-rank)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(samples) -> dict:
+    """Summarize timing samples in milliseconds"""
+    return {
+        'runs': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'min_ms': min(samples) * 1000 if samples else 0.0,
+    }
+
+def time_call(func, repeat: int = 5) -> dict:
+    """Call func repeat times and summarize the wall-clock timings"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def write_results(name: str, results: dict, output: str = None) -> Path:
+    """Write benchmark results as JSON and return the file path"""
+    path = Path(output) if output else RESULTS_DIR / f"{name}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        'benchmark': name,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    path.write_text(json.dumps(payload, indent=2, default=str))
+    return path
@@ -0,0 +1,95 @@
+# app/benchmarks/compression.py
+"""On-disk size, save time and load time of the data files per storage codec.
+
+Builds a synthetic organisation, then for each codec and level writes its
+data files (users, holidays and the leave year partitions) the way
+DataManager saves them, reads them back the way it loads them, and takes a
+backup. Reads come from the page cache, so for network-mounted volumes the
+load time is also estimated with the transfer at --bandwidth MB/s plus
+--latency ms per file. Run from the project root:
+
+    python -m benchmarks.compression --users 2000 --leaves 50000 --bandwidth 50
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from config import STORAGE_LEVEL
+from utils.backup import BackupStore
+from utils.data_manager import BACKUP_KEYS, DataManager
+from utils.storage import read_pickle, write_pickle
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import generate_org
+
+# (codec, level) pairs compared by default
+CANDIDATES = [('none', 0), ('zlib', 1), ('zlib', 6), ('zlib', 9), ('bz2', 9), ('lzma', 0), ('lzma', 6)]
+
+def datasets(data_manager: DataManager) -> dict:
+    """What DataManager writes: file name -> object"""
+    files = {'users.pkl': data_manager.users, 'holidays.pkl': data_manager.holidays}
+    for leave in data_manager.leave_requests:
+        files.setdefault(f"leaves/{leave.start_date.year}.pkl", []).append(leave)
+    return files
+
+def measure(files: dict, directory: Path, codec: str, level: int, repeat: int) -> dict:
+    (directory / "leaves").mkdir(parents=True, exist_ok=True)
+    saves, loads, size = [], [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = sum(write_pickle(directory / name, obj, codec, level) for name, obj in files.items())
+        saves.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for name in files:
+            read_pickle(directory / name)
+        loads.append(time.perf_counter() - start)
+
+    records = {'users': list(files['users.pkl'].values()), 'holidays': files['holidays.pkl'],
+               'leaves': [leave for name, obj in files.items() if name.startswith("leaves/") for leave in obj]}
+    backup = BackupStore(directory / "backups", codec, level).create(records, BACKUP_KEYS)
+    return {'bytes': size, 'save': summarize(saves), 'load': summarize(loads), 'backup_bytes': backup.total_bytes}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--leaves', type=int, default=50000)
+    parser.add_argument('--codec', action='append', help="codec[:level] to compare, repeatable "
+                                                        "(default: a spread of zlib, bz2 and lzma levels)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--bandwidth', type=float, default=50.0, help="MB/s of the network volume")
+    parser.add_argument('--latency', type=float, default=2.0, help="ms per file opened on the network volume")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    candidates = CANDIDATES
+    if args.codec:
+        candidates = [(codec, int(level) if level else STORAGE_LEVEL)
+                      for codec, _, level in (spec.partition(':') for spec in args.codec)]
+
+    results = {'config': vars(args), 'codecs': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        data_manager = DataManager(Path(directory) / "source")
+        generate_org(data_manager, args.users, args.leaves, args.seed)
+        data_manager.load_years()
+        files = datasets(data_manager)
+
+        print(f"{'codec':10} {'size':>10} {'ratio':>6} {'save p50':>10} {'load p50':>10} "
+              f"{'net load':>10} {'backup':>10}")
+        baseline = None
+        for codec, level in candidates:
+            label = codec if codec == 'none' else f"{codec}:{level}"
+            result = measure(files, Path(directory) / label.replace(':', '_'), codec, level, args.repeat)
+            baseline = baseline or result['bytes']
+            result['ratio'] = baseline / result['bytes']
+            result['network_load_ms'] = (result['load']['p50_ms'] + result['bytes'] / (args.bandwidth * 1e6) * 1000
+                                         + len(files) * args.latency)
+            results['codecs'][label] = result
+            print(f"{label:10} {result['bytes'] / 1e6:8.2f}MB {result['ratio']:5.1f}x "
+                  f"{result['save']['p50_ms']:8.1f}ms {result['load']['p50_ms']:8.1f}ms "
+                  f"{result['network_load_ms']:8.1f}ms {result['backup_bytes'] / 1e6:8.2f}MB")
+
+    print(f"Results written to {write_results('compression', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
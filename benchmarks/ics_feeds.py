@@ -0,0 +1,136 @@
+# app/benchmarks/ics_feeds.py
+"""Cost of iCalendar feeds for many polling subscribers.
+
+In process: renders the org-wide, a department and a personal feed cold,
+then measures a cached hit, revalidation after an unrelated change and
+re-rendering after an approval. Over HTTP: subscribers poll the API
+service with If-None-Match, as calendar apps do, and get 304s while the
+data is unchanged. Run from the project root:
+
+    python -m benchmarks.ics_feeds --users 1000 --leaves 20000 --subscribers 200 --polls 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from urllib.parse import quote
+from models.leave import LeaveRequest
+from utils.auth import SessionSigner, create_admin_user, load_session_secret
+from utils.data_manager import DataManager
+from utils.ics import ICSFeeds
+from benchmarks.api_load import Client, start_server
+from benchmarks.common import summarize, time_call, write_results
+from benchmarks.synthetic import generate_org
+
+def _new_leave(username: str, status: str) -> LeaveRequest:
+    start = date.today() + timedelta(days=30)
+    return LeaveRequest(id="", username=username, start_date=start, end_date=start,
+                        leave_type='CL', reason="Benchmark", status=status)
+
+def in_process(data_manager: DataManager, username: str, department: str) -> dict:
+    feeds = ICSFeeds(data_manager)
+    targets = {'org': ('org', ""), 'department': ('department', department), 'user': ('user', username)}
+    results = {}
+    for label, (kind, name) in targets.items():
+        start = time.perf_counter()
+        feed = feeds.feed(kind, name)
+        results[label] = {'cold_ms': (time.perf_counter() - start) * 1000, 'bytes': len(feed.body),
+                          'hit': time_call(lambda: feeds.feed(kind, name), 1000)}
+
+    # A new pending request touches no feed: the version moves on, the ETag stays
+    etag = feeds.feed('org').etag
+    data_manager.add_leave_request(_new_leave(username, "Pending"))
+    renders = feeds.renders
+    results['revalidate_unrelated'] = time_call(lambda: feeds.feed('org'), 1)
+    results['revalidate_unrelated']['rendered'] = feeds.renders - renders
+    results['revalidate_unrelated']['etag_unchanged'] = feeds.feed('org').etag == etag
+
+    # An approval does: re-render, reusing the memoized events of the other leaves
+    data_manager.add_leave_request(_new_leave(username, "Approved"))
+    results['rerender_after_approval'] = time_call(lambda: feeds.feed('org'), 1)
+    results['rerender_after_approval']['etag_changed'] = feeds.feed('org').etag != etag
+    return results
+
+async def poll(port: int, paths, subscribers: int, polls: int, seed: int):
+    """Each subscriber fetches its feed once, then polls it with If-None-Match"""
+    latencies, statuses = [], Counter()
+
+    async def subscriber(index):
+        path = random.Random(seed + index).choice(paths)
+        client = await Client(port).connect()
+        etag = None
+        try:
+            for _ in range(polls + 1):
+                start = time.perf_counter()
+                status, headers, _ = await client.request('GET', path, headers={'If-None-Match': etag} if etag else None)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+                etag = headers.get('etag', etag)
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(subscriber(index) for index in range(subscribers)))
+    return latencies, statuses, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--leaves', type=int, default=20000)
+    parser.add_argument('--subscribers', type=int, default=200, help="Concurrent polling calendar apps")
+    parser.add_argument('--polls', type=int, default=10, help="Conditional polls per subscriber")
+    parser.add_argument('--cpu', type=int, default=0, help="CPU the server is pinned to")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_manager = DataManager(data_dir)
+        generate_org(data_manager, args.users, args.leaves, args.seed)
+        data_manager.add_user(create_admin_user())
+        users = [user for user in data_manager.users.values() if not user.is_admin]
+        user = users[0]
+        results = {'config': vars(args), 'cpu_count': os.cpu_count(),
+                   'in_process': in_process(data_manager, user.username, user.department)}
+
+        token = SessionSigner(load_session_secret(data_manager.data_dir)).feed_token(user)
+        paths = [f"/ics/org.ics?token={token}", f"/ics/user/{user.username}.ics?token={token}"] + [
+            f"/ics/department/{quote(name)}.ics?token={token}"
+            for name in data_manager.departments.departments()]
+        process, port = start_server(data_dir, args.cpu)
+        try:
+            latencies, statuses, elapsed = asyncio.run(poll(port, paths, args.subscribers, args.polls, args.seed))
+        finally:
+            process.terminate()
+            process.wait()
+
+    results['http'] = {
+        'requests': len(latencies),
+        'elapsed_s': elapsed,
+        'requests_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'latency': summarize(latencies),
+    }
+
+    for label in ('org', 'department', 'user'):
+        feed = results['in_process'][label]
+        print(f"{label:10} {feed['bytes']:9,d} bytes  cold {feed['cold_ms']:8.2f} ms  "
+              f"cached hit {feed['hit']['mean_ms'] * 1000:6.1f} us")
+    unrelated = results['in_process']['revalidate_unrelated']
+    approval = results['in_process']['rerender_after_approval']
+    print(f"org feed after an unrelated change: {unrelated['mean_ms']:.2f} ms, "
+          f"{unrelated['rendered']} renders, ETag unchanged: {unrelated['etag_unchanged']}")
+    print(f"org feed after an approval: {approval['mean_ms']:.2f} ms (memoized events)")
+    http = results['http']
+    print(f"HTTP: {http['requests']} polls from {args.subscribers} subscribers in {elapsed:.2f}s "
+          f"({http['requests_per_s']:.0f} req/s)  p50 {http['latency']['p50_ms']:.1f} ms  "
+          f"p95 {http['latency']['p95_ms']:.1f} ms  statuses {http['statuses']}")
+    print(f"Results written to {write_results('ics_feeds', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# app/benchmarks/import_time.py
+"""Cold-start benchmark based on ``python -X importtime``.
+
+Run from the project root:
+
+    python -m benchmarks.import_time [--repeat 5] [--output results.json]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.common import summarize, write_results
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules imported to reach each page, mirroring the lazy imports in main.py
+SCENARIOS = {
+    'login': ['config', 'utils.data_manager', 'utils.auth', 'components.login'],
+    'calendar': ['components.calendar_view', 'plotly.graph_objects'],
+    'user': ['components.user'],
+    'admin': ['components.admin'],
+    'reports': ['components.admin', 'plotly.express'],
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure_imports(modules) -> dict:
+    """Import modules in a fresh interpreter and parse -X importtime output"""
+    code = "import streamlit\n" + "\n".join(f"import {module}" for module in modules)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+
+    top_level = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            if len(indent) == 1:  # Only modules imported directly by the script
+                top_level[name] = int(cumulative)
+    return {'wall_s': wall, 'modules_us': top_level}
+
+def measure_first_render() -> float:
+    """Time a cold first render of main.py using Streamlit's headless test runner.
+
+    The app runs on an empty data directory of its own, so the installation's
+    data is neither read nor written.
+    """
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "AppTest.from_file('main.py', default_timeout=60).run()\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    with tempfile.TemporaryDirectory() as data_dir:
+        proc = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                              env={**os.environ, 'LMS_DATA_DIR': data_dir},
+                              capture_output=True, text=True, check=True)
+    return float(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    results = {}
+    for scenario, modules in SCENARIOS.items():
+        runs = [measure_imports(modules) for _ in range(args.repeat)]
+        slowest = sorted(runs[-1]['modules_us'].items(), key=lambda item: item[1], reverse=True)
+        results[scenario] = {
+            'cold_start': summarize([run['wall_s'] for run in runs]),
+            'slowest_imports_us': dict(slowest[:10]),
+        }
+        print(f"{scenario:10} p50 {results[scenario]['cold_start']['p50_ms']:.1f} ms")
+
+    results['first_render'] = summarize([measure_first_render() for _ in range(args.repeat)])
+    print(f"first render p50 {results['first_render']['p50_ms']:.1f} ms")
+
+    print(f"Results written to {write_results('import_time', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# app/benchmarks/load_test.py
+"""Concurrent-session load test against DataManager and the component logic.
+
+Simulates employees and admins without a browser, either as threads sharing
+one DataManager (as Streamlit sessions do within a server process) or as
+processes with their own DataManager (as separate replicas do). Run from the
+project root:
+
+    python -m benchmarks.load_test --mode threads --sessions 50 --actions 40
+    python -m benchmarks.load_test --mode processes --sessions 8 --actions 40
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from models.leave import LeaveRequest
+from utils.data_manager import DataManager
+from utils.storage import read_pickle
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import generate_org
+
+# Relative frequency of each simulated action
+ACTION_WEIGHTS = {
+    'submit': 30,
+    'approve': 15,
+    'calendar': 35,
+    'my_leaves': 12,
+    'report': 8,
+}
+
+class Session:
+    """One simulated user performing a random mix of actions"""
+
+    def __init__(self, data_manager: DataManager, session_id: int, seed: int, reload_each_action: bool):
+        from components.calendar_view import CalendarView
+        from components.admin import AdminComponent
+
+        self.data_manager = data_manager
+        self.session_id = session_id
+        self.rng = random.Random(seed + session_id)
+        self.reload_each_action = reload_each_action
+        self.calendar_view = CalendarView(data_manager)
+        self.admin = AdminComponent(data_manager)
+        self.usernames = [name for name, user in data_manager.users.items() if not user.is_admin]
+        self.submitted = []
+        self.approved = []
+        self.latencies = defaultdict(list)
+        self.errors = []
+        self.counter = 0
+
+    def submit(self):
+        self.counter += 1
+        marker = f"loadtest:{self.session_id}:{self.counter}"
+        start = date.today() + timedelta(days=self.rng.randint(7, 300))
+        self.data_manager.add_leave_request(LeaveRequest(
+            id="", username=self.rng.choice(self.usernames), start_date=start,
+            end_date=start + timedelta(days=self.rng.randint(0, 3)),
+            leave_type=self.rng.choice(['EL', 'CL', 'SL']), reason=marker))
+        self.submitted.append(marker)
+
+    def approve(self):
+        # Same steps as AdminComponent.show_pending_requests
+        pending = self.data_manager.get_pending_leaves()
+        if not pending:
+            return
+        leave = self.rng.choice(pending)
+        if self.data_manager.approvals.approve(leave.id, "admin") == "Approved":
+            self.approved.append(leave.id)
+
+    def calendar(self):
+        month = date.today() + timedelta(days=self.rng.randint(0, 365))
+        daily_leaves = self.calendar_view.get_month_leaves(month.year, month.month)
+        self.calendar_view.create_calendar_table(month.year, month.month, daily_leaves)
+
+    def my_leaves(self):
+        self.data_manager.get_user_leaves(self.rng.choice(self.usernames))
+
+    def report(self):
+        self.admin._leave_usage_data()
+
+    def run(self, actions: int) -> dict:
+        names, weights = list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values())
+        for _ in range(actions):
+            action = self.rng.choices(names, weights=weights)[0]
+            start = time.perf_counter()
+            try:
+                if self.reload_each_action:
+                    self.data_manager.load_data()
+                getattr(self, action)()
+            except Exception as e:
+                self.errors.append(f"{action}: {type(e).__name__}: {e}")
+            self.latencies[action].append(time.perf_counter() - start)
+        return {
+            'latencies': dict(self.latencies),
+            'submitted': self.submitted,
+            'approved': self.approved,
+            'errors': self.errors,
+        }
+
+def _process_session(data_dir, session_id, seed, actions):
+    # Every process is a separate replica that reloads on each rerun
+    data_manager = DataManager(data_dir)
+    return Session(data_manager, session_id, seed, reload_each_action=True).run(actions)
+
+def run_threads(data_dir, sessions: int, actions: int, seed: int, reload_each_action: bool):
+    data_manager = DataManager(data_dir)
+    workers = [Session(data_manager, i, seed, reload_each_action) for i in range(sessions)]
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        return list(pool.map(lambda session: session.run(actions), workers))
+
+def run_processes(data_dir, sessions: int, actions: int, seed: int):
+    with ProcessPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(_process_session, data_dir, i, seed, actions) for i in range(sessions)]
+        return [future.result() for future in futures]
+
+def check_integrity(data_dir, outcomes) -> dict:
+    """Reload from disk and look for corrupted files and lost updates"""
+    data_manager = DataManager(data_dir)
+    data_manager.load_years()
+    corrupted = []
+    for path in [*data_manager.data_dir.glob('*.pkl'), *data_manager.leaves_dir.glob('*.pkl')]:
+        try:
+            read_pickle(path)  # Decoded by content, whatever LMS_STORAGE_CODEC wrote it
+        except Exception as e:
+            corrupted.append(f"{path.name}: {type(e).__name__}: {e}")
+
+    reasons = {leave.reason for leave in data_manager.leave_requests}
+    statuses = {leave.id: leave.status for leave in data_manager.leave_requests}
+    submitted = [marker for outcome in outcomes for marker in outcome['submitted']]
+    approved = {leave_id for outcome in outcomes for leave_id in outcome['approved']}
+    return {
+        'corrupted_files': corrupted,
+        'submitted': len(submitted),
+        'lost_submissions': sum(1 for marker in submitted if marker not in reasons),
+        'approved': len(approved),
+        'lost_approvals': sum(1 for leave_id in approved if statuses.get(leave_id) != "Approved"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--actions', type=int, default=40, help="Actions per session")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--leaves', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reload-each-action', action='store_true',
+                        help="Threads mode: reload data before every action, like a per-rerun DataManager")
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate_org(DataManager(data_dir), args.users, args.leaves, args.seed)
+
+        start = time.perf_counter()
+        if args.mode == 'threads':
+            outcomes = run_threads(data_dir, args.sessions, args.actions, args.seed, args.reload_each_action)
+        else:
+            outcomes = run_processes(data_dir, args.sessions, args.actions, args.seed)
+        elapsed = time.perf_counter() - start
+
+        integrity = check_integrity(data_dir, outcomes)
+
+    latencies = defaultdict(list)
+    for outcome in outcomes:
+        for action, samples in outcome['latencies'].items():
+            latencies[action].extend(samples)
+    total_actions = sum(len(samples) for samples in latencies.values())
+    errors = [error for outcome in outcomes for error in outcome['errors']]
+
+    results = {
+        'config': vars(args),
+        'elapsed_s': elapsed,
+        'throughput_per_s': total_actions / elapsed if elapsed else 0.0,
+        'latency': {action: summarize(samples) for action, samples in latencies.items()},
+        'errors': len(errors),
+        'error_samples': errors[:20],
+        'integrity': integrity,
+    }
+
+    print(f"{args.mode}: {args.sessions} sessions, {total_actions} actions in {elapsed:.1f}s "
+          f"({results['throughput_per_s']:.1f} actions/s)")
+    for action, stats in results['latency'].items():
+        print(f"  {action:10} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms")
+    print(f"  errors: {len(errors)}  lost submissions: {integrity['lost_submissions']}/{integrity['submitted']}  "
+          f"lost approvals: {integrity['lost_approvals']}/{integrity['approved']}  "
+          f"corrupted files: {len(integrity['corrupted_files'])}")
+    print(f"Results written to {write_results('load_test', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
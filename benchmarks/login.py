@@ -0,0 +1,89 @@
+# app/benchmarks/login.py
+"""Login throughput with scrypt hashing on the bounded verification pool.
+
+Simulates a morning login spike: many sessions log in at once, each
+verification going through PasswordVerifier. Also reports the cost of one
+verification per hash format and of checking a session token on rerun.
+Run from the project root:
+
+    python -m benchmarks.login --sessions 64 --logins 5 --workers 4
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from models.user import User
+from utils.auth import (LoginBusyError, PasswordVerifier, SessionSigner, _legacy_hash,
+                        hash_password, verify_password)
+from config import AUTH_WORKERS, AUTH_QUEUE_LIMIT, PASSWORD_SCRYPT_N
+from benchmarks.common import summarize, time_call, write_results
+
+PASSWORD = "correct horse battery staple"
+
+def login_spike(verifier: PasswordVerifier, stored: str, sessions: int, logins: int):
+    """Each session logs in `logins` times; returns latencies, busy refusals and elapsed time"""
+    def session(_):
+        latencies, busy = [], 0
+        for _ in range(logins):
+            start = time.perf_counter()
+            try:
+                valid, _ = verifier.verify(stored, PASSWORD)
+                assert valid
+                latencies.append(time.perf_counter() - start)
+            except LoginBusyError:
+                busy += 1
+        return latencies, busy
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        outcomes = list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    latencies = [sample for samples, _ in outcomes for sample in samples]
+    return latencies, sum(busy for _, busy in outcomes), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=32, help="Concurrent sessions logging in")
+    parser.add_argument('--logins', type=int, default=5, help="Logins per session")
+    parser.add_argument('--workers', type=int, default=AUTH_WORKERS)
+    parser.add_argument('--queue-limit', type=int, default=AUTH_QUEUE_LIMIT)
+    parser.add_argument('--n', type=int, default=PASSWORD_SCRYPT_N, help="scrypt cost parameter")
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    scrypt_hash = hash_password(PASSWORD, n=args.n)
+    legacy_hash = _legacy_hash(PASSWORD)
+    user = User(username="user000001", password=scrypt_hash, email="u@example.com", department="")
+    signer = SessionSigner(os.urandom(32))
+    token = signer.issue(user)
+    users = {user.username: user}
+
+    verifier = PasswordVerifier(workers=args.workers, queue_limit=args.queue_limit)
+    latencies, busy, elapsed = login_spike(verifier, scrypt_hash, args.sessions, args.logins)
+
+    results = {
+        'config': vars(args),
+        'cpu_count': os.cpu_count(),
+        'verify_legacy_sha256': time_call(lambda: verify_password(legacy_hash, PASSWORD), 50),
+        'verify_scrypt': time_call(lambda: verify_password(scrypt_hash, PASSWORD), 10),
+        'session_token_check': time_call(lambda: signer.verify(token, users), 1000),
+        'spike': {
+            'logins': len(latencies),
+            'refused_busy': busy,
+            'elapsed_s': elapsed,
+            'logins_per_s': len(latencies) / elapsed if elapsed else 0.0,
+            'latency': summarize(latencies),
+        },
+    }
+
+    for name in ('verify_legacy_sha256', 'verify_scrypt', 'session_token_check'):
+        print(f"{name:22} mean {results[name]['mean_ms']:9.3f} ms")
+    spike = results['spike']
+    print(f"spike: {spike['logins']} logins from {args.sessions} sessions in {elapsed:.2f}s "
+          f"({spike['logins_per_s']:.1f} logins/s, {busy} refused as busy)  "
+          f"p50 {spike['latency']['p50_ms']:.1f} ms  p95 {spike['latency']['p95_ms']:.1f} ms")
+    print(f"Results written to {write_results('login', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# app/benchmarks/notifications.py
+"""Email notifications against a local SMTP stand-in.
+
+Measures how much queueing a notification adds to submitting a leave
+request, how long the outbox worker takes to deliver everything, and that
+transient SMTP failures are retried until delivered. Run from the project
+root:
+
+    python -m benchmarks.notifications --requests 500 --fail-first 20
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from models.leave import LeaveRequest
+from utils.auth import create_admin_user
+from utils.data_manager import DataManager
+from utils.notifications import SmtpSender, start_notifications
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import generate_org
+
+class SmtpStandIn:
+    """Minimal SMTP server that records messages.
+
+    The first fail_first MAIL commands get a temporary 451 error so the
+    worker's retry path is exercised.
+    """
+
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.messages = []
+        self.connections = 0
+        self.port = None
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True).start()
+        self._ready.wait()
+        return self
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+
+        def reply(line):
+            writer.write(f"{line}\r\n".encode())
+
+        reply("220 stand-in ESMTP")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                reply("250 stand-in")
+            elif command.startswith('MAIL'):
+                if self.fail_first > 0:
+                    self.fail_first -= 1
+                    reply("451 Try again later")
+                else:
+                    reply("250 OK")
+            elif command.startswith('DATA'):
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                    data.append(chunk)
+                self.messages.append(b"".join(data))
+                reply("250 Queued")
+            elif command.startswith('QUIT'):
+                reply("221 Bye")
+                await writer.drain()
+                break
+            else:  # RCPT, RSET, NOOP
+                reply("250 OK")
+            await writer.drain()
+        writer.close()
+
+def submit(data_manager, usernames, rng, count):
+    samples = []
+    start = date.today() + timedelta(days=30)
+    for _ in range(count):
+        leave = LeaveRequest(id="", username=rng.choice(usernames), start_date=start,
+                             end_date=start + timedelta(days=1), leave_type='CL', reason="Benchmark")
+        begin = time.perf_counter()
+        data_manager.add_leave_request(leave)
+        samples.append(time.perf_counter() - begin)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--leaves', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200, help="Leave requests submitted per run")
+    parser.add_argument('--fail-first', type=int, default=10, help="Temporary SMTP failures to inject")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Seconds to wait for delivery")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as baseline_dir, tempfile.TemporaryDirectory() as data_dir:
+        for directory in (baseline_dir, data_dir):
+            data_manager = DataManager(directory)
+            generate_org(data_manager, args.users, args.leaves, args.seed)
+            # New requests go to the HR stage, i.e. to the admins
+            data_manager.add_user(create_admin_user())
+
+        # Submission latency without notifications
+        data_manager = DataManager(baseline_dir)
+        usernames = [name for name, user in data_manager.users.items() if not user.is_admin]
+        baseline = submit(data_manager, usernames, random.Random(args.seed), args.requests)
+
+        # Submission latency with notifications queued and delivered in the background
+        smtp = SmtpStandIn(fail_first=args.fail_first).start()
+        data_manager = DataManager(data_dir)
+        worker = start_notifications(data_manager, SmtpSender('127.0.0.1', smtp.port),
+                                     poll_interval=0.2, retry_base=0.1)
+        start = time.perf_counter()
+        with_notifications = submit(data_manager, usernames, random.Random(args.seed), args.requests)
+
+        while worker.outbox.pending_count() and time.perf_counter() - start < args.timeout:
+            time.sleep(0.05)
+        delivery_s = time.perf_counter() - start
+        worker.stop()
+        undelivered = worker.outbox.pending_count()
+        failed = len(worker.outbox.failed())
+
+    results = {
+        'config': vars(args),
+        'submit_without_notifications': summarize(baseline),
+        'submit_with_notifications': summarize(with_notifications),
+        'delivered': len(smtp.messages),
+        'undelivered': undelivered,
+        'failed': failed,
+        'smtp_connections': smtp.connections,
+        'delivery_s': delivery_s,
+    }
+
+    for name in ('submit_without_notifications', 'submit_with_notifications'):
+        stats = results[name]
+        print(f"{name:30} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+    print(f"delivered {len(smtp.messages)}/{args.requests} in {delivery_s:.2f}s over "
+          f"{smtp.connections} connections ({undelivered} queued, {failed} failed)")
+    print(f"Results written to {write_results('notifications', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# app/benchmarks/offboarding.py
+"""Cost of deleting many users: immediate purge vs tombstones plus one compaction.
+
+Builds a synthetic organisation with several archived years and deletes
+--leavers users three ways: purging each one at once (delete then compact,
+a full pass per user, as deletion used to work), soft-deleting them one at
+a time, and soft-deleting them in one transaction; the soft deletes are
+then compacted in a single run. Run from the project root:
+
+    python -m benchmarks.offboarding --users 2000 --leaves 50000 --leavers 200
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import date
+from utils.data_manager import DataManager
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import generate_org
+
+def build(data_dir: str, users: int, leaves: int, years: int, seed: int) -> DataManager:
+    today = date.today()
+    data_manager = DataManager(data_dir)
+    generate_org(data_manager, users, leaves, seed, years=range(today.year - years, today.year + 2))
+    data_manager.archive_closed_years()
+    return data_manager
+
+def run(data_manager: DataManager, mode: str, leavers: int) -> dict:
+    usernames = sorted(name for name, user in data_manager.users.items() if not user.is_admin)[:leavers]
+    deletes = []
+    start = time.perf_counter()
+    if mode == 'batch':
+        data_manager.delete_users(usernames)
+    else:
+        for username in usernames:
+            begin = time.perf_counter()
+            data_manager.delete_user(username)
+            if mode == 'purge':
+                data_manager.compact()
+            deletes.append(time.perf_counter() - begin)
+    deleted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    purged = data_manager.compact()
+    compaction = time.perf_counter() - start
+    return {'delete_s': deleted, 'per_delete': summarize(deletes), 'compaction_s': compaction,
+            'compacted_users': len(purged), 'total_s': deleted + compaction}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--leaves', type=int, default=50000)
+    parser.add_argument('--years', type=int, default=4, help="Archived years before the current one")
+    parser.add_argument('--leavers', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    results = {'config': vars(args), 'modes': {}}
+    for mode in ('purge', 'soft', 'batch'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            data_manager = build(data_dir, args.users, args.leaves, args.years, args.seed)
+            result = run(data_manager, mode, args.leavers)
+        results['modes'][mode] = result
+        print(f"{mode:6} {args.leavers} deletions {result['delete_s']:7.2f}s "
+              f"(p50 {result['per_delete']['p50_ms']:7.1f} ms)  "
+              f"compaction {result['compaction_s']:6.2f}s  total {result['total_s']:7.2f}s")
+    print(f"Results written to {write_results('offboarding', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
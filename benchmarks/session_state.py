@@ -0,0 +1,125 @@
+# app/benchmarks/session_state.py
+"""Session state memory over a day of approvals: per-request keys vs namespaces.
+
+Simulates --sessions admins keeping the HR approval queue open through a
+working day. Every --tick minutes new requests arrive (and pass their
+manager's stage), each admin's page reruns, and the oldest requests are
+approved or rejected, rejections first being opened by one admin. In mode
+"keys" each rerun keeps a reject_<id> entry for every request shown, as the
+pending page used to; in mode "namespace" the state lives in a
+SessionNamespace that drops decided requests and is bounded by LRU. Memory
+held by the session states is their deep size (keys, values and the
+containers). Run from the project root:
+
+    python -m benchmarks.session_state --sessions 20 --requests 500
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from models.leave import LeaveRequest
+from utils.data_manager import DataManager
+from utils.session_state import SessionNamespace
+from benchmarks.common import write_results
+from benchmarks.synthetic import generate_org
+
+HR_QUEUE = "HR"
+
+def render_keys(state: dict, queue, approvals):
+    """The pending page before namespaces: one key per request ever shown"""
+    for leave in queue:
+        rejection_key = f"reject_{leave.id}"
+        if rejection_key not in state:
+            state[rejection_key] = {'show_comment': False, 'comment': ''}
+
+def render_namespace(state: dict, queue, approvals):
+    SessionNamespace(state, "rejections").prune(approvals.is_pending)
+
+def open_rejection(state: dict, mode: str, leave_id: str):
+    if mode == 'keys':
+        state.setdefault(f"reject_{leave_id}", {'show_comment': False, 'comment': ''})['show_comment'] = True
+    else:
+        SessionNamespace(state, "rejections").set(leave_id, {'show_comment': True})
+
+def deep_size(obj) -> int:
+    """Bytes held by obj and the keys and values it contains"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key) + deep_size(value) for key, value in obj.items())
+    return size
+
+def run(data_manager: DataManager, mode: str, sessions: int, requests: int, hours: float,
+        tick: int, reject_share: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    approvals = data_manager.approvals
+    render = render_keys if mode == 'keys' else render_namespace
+    usernames = [name for name, user in data_manager.users.items() if not user.is_admin]
+    ticks = int(hours * 60 / tick)
+    arrivals = requests / ticks
+    states = [{} for _ in range(sessions)]
+    decided, samples = 0, []
+
+    for step in range(ticks):
+        # New requests, passed on to HR by their managers
+        for _ in range(int(arrivals * (step + 1)) - int(arrivals * step)):
+            start = date.today() + timedelta(days=rng.randint(14, 120))
+            leave = LeaveRequest("", rng.choice(usernames), start, start + timedelta(days=rng.randint(0, 4)),
+                                 'CL', "Personal errand")
+            data_manager.add_leave_request(leave)
+            if approvals.current_stage(leave) != HR_QUEUE:
+                approvals.approve(leave.id, "manager")
+
+        for state in states:
+            render(state, approvals.queue(HR_QUEUE), approvals)
+
+        # Admins work through the queue at the pace requests arrive
+        for leave in approvals.queue(HR_QUEUE)[:max(1, round(arrivals))]:
+            if rng.random() < reject_share:
+                state = rng.choice(states)
+                open_rejection(state, mode, leave.id)
+                approvals.reject(leave.id, "admin", "Team coverage too low")
+                if mode == 'namespace':
+                    SessionNamespace(state, "rejections").pop(leave.id)
+            else:
+                approvals.approve(leave.id, "admin")
+            decided += 1
+
+        if step % max(1, ticks // 8) == 0 or step == ticks - 1:
+            samples.append({'hour': round((step + 1) * tick / 60, 2), 'bytes': sum(map(deep_size, states)),
+                            'keys': sum(len(state) for state in states),
+                            'entries': sum(len(state) if mode == 'keys' else
+                                           len(SessionNamespace(state, "rejections")) for state in states)})
+    peak = max(sample['bytes'] for sample in samples)
+    return {'decided': decided, 'pending_left': len(approvals.queue(HR_QUEUE)), 'end': samples[-1],
+            'peak_bytes': peak, 'timeline': samples}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--leaves', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=20, help="Admins with the pending page open")
+    parser.add_argument('--requests', type=int, default=500, help="Requests arriving during the day")
+    parser.add_argument('--hours', type=float, default=8.0)
+    parser.add_argument('--tick', type=int, default=5, help="Minutes between page reruns")
+    parser.add_argument('--reject-share', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    results = {'config': vars(args), 'modes': {}}
+    for mode in ('keys', 'namespace'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            data_manager = DataManager(data_dir)
+            generate_org(data_manager, args.users, args.leaves, args.seed)
+            result = run(data_manager, mode, args.sessions, args.requests, args.hours, args.tick,
+                         args.reject_share, args.seed)
+        results['modes'][mode] = result
+        print(f"{mode:9} {result['decided']} decided, {result['pending_left']} left  "
+              f"end of day {result['end']['entries']:6} entries in {result['end']['keys']:6} keys "
+              f"{result['end']['bytes'] / 1024:8.1f} KiB  peak {result['peak_bytes'] / 1024:8.1f} KiB")
+    print(f"Results written to {write_results('session_state', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# app/benchmarks/snapshots.py
+"""Approval latency while long reports run: snapshot reads vs locked reads.
+
+A reader thread computes a leave usage report over the whole organisation
+every --interval seconds while the main thread approves pending requests
+one at a time; --mode none runs the approvals without the reader. With
+--mode locked the reader holds the DataManager lock for each report, which
+is what consistent reads of the live lists would need; with --mode snapshot
+it reads a snapshot and takes no lock. Approval latency includes the save,
+so the time spent waiting for the lock is reported on its own. Run from the
+project root:
+
+    python -m benchmarks.snapshots --users 2000 --leaves 40000 --approvals 200
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from utils.data_manager import DataManager
+from benchmarks.common import summarize, write_results
+from benchmarks.synthetic import generate_org
+
+def usage_report(users, leaves):
+    """Approved days per user and leave type, and the balance left"""
+    used = defaultdict(int)
+    for leave in leaves:
+        if leave.status == "Approved":
+            used[(leave.username, leave.leave_type)] += (leave.end_date - leave.start_date).days + 1
+    return {(username, leave_type): (used[(username, leave_type)], balance)
+            for username, user in users.items() if not user.is_admin
+            for leave_type, balance in user.leave_balance.items()}
+
+def run(data_manager: DataManager, mode: str, approvals: int, interval: float):
+    stop = threading.Event()
+    reports = []
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            if mode == 'locked':
+                with data_manager._lock:
+                    usage_report(data_manager.users, data_manager.leave_requests)
+            else:
+                snapshot = data_manager.snapshot()
+                usage_report(snapshot.users, snapshot.leave_requests)
+            reports.append(time.perf_counter() - start)
+            stop.wait(interval)
+
+    pending = [leave.id for leave in data_manager.get_pending_leaves()][:approvals]
+    thread = threading.Thread(target=reader, daemon=True)
+    if mode != 'none':
+        thread.start()
+        time.sleep(0.2)  # Let the reader get going
+    latencies, waits = [], []
+    for leave_id in pending:
+        start = time.perf_counter()
+        with data_manager._lock:
+            waits.append(time.perf_counter() - start)
+            data_manager.approvals.approve(leave_id, 'admin', "ok")
+        latencies.append(time.perf_counter() - start)
+    stop.set()
+    if mode != 'none':
+        thread.join()
+    return latencies, waits, reports
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--leaves', type=int, default=40000)
+    parser.add_argument('--approvals', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.1, help="Seconds between reports")
+    parser.add_argument('--mode', choices=['none', 'locked', 'snapshot', 'all'], default='all')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    modes = ['none', 'locked', 'snapshot'] if args.mode == 'all' else [args.mode]
+    results = {'config': vars(args), 'modes': {}}
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            data_manager = DataManager(data_dir)
+            generate_org(data_manager, args.users, args.leaves, args.seed)
+            start = time.perf_counter()
+            snapshot = data_manager.snapshot()
+            snapshot.leave_requests
+            first_read = time.perf_counter() - start
+            latencies, waits, reports = run(data_manager, mode, args.approvals, args.interval)
+        results['modes'][mode] = {
+            'approve': summarize(latencies),
+            'lock_wait': summarize(waits),
+            'lock_wait_max_ms': max(waits, default=0.0) * 1000,
+            'report': summarize(reports),
+            'first_snapshot_read_ms': first_read * 1000,
+        }
+        print(f"{mode:8}  approve p50 {results['modes'][mode]['approve']['p50_ms']:7.2f} ms  "
+              f"p95 {results['modes'][mode]['approve']['p95_ms']:7.2f} ms  "
+              f"lock wait p95 {results['modes'][mode]['lock_wait']['p95_ms']:6.2f} ms "
+              f"max {results['modes'][mode]['lock_wait_max_ms']:6.2f} ms   "
+              f"report p50 {results['modes'][mode]['report']['p50_ms']:7.2f} ms "
+              f"({len(reports)} runs)")
+    print(f"Results written to {write_results('snapshots', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# app/benchmarks/suite.py
+"""Benchmark suite for the data layer, calendar and reports.
+
+Run from the project root:
+
+    python -m benchmarks.suite [--sizes 1000:10000 5000:100000] [--compare previous.json]
+"""
+
+import argparse
+import json
+import random
+import tempfile
+from datetime import date, timedelta
+from models.leave import LeaveRequest
+from utils.data_manager import DataManager
+from benchmarks.common import time_call, write_results
+from benchmarks.synthetic import generate_org
+
+DEFAULT_SIZES = ["1000:10000", "5000:100000"]
+REGRESSION_THRESHOLD = 1.2  # Flag operations that got 20% slower
+
+def bench_data_layer(data_dir, repeat: int) -> dict:
+    data_manager = DataManager(data_dir)
+    rng = random.Random(0)
+    usernames = [name for name, user in data_manager.users.items() if not user.is_admin]
+    leave_ids = [leave.id for leave in data_manager.leave_requests]
+    start = date.today() + timedelta(days=30)
+
+    def add_leave():
+        data_manager.add_leave_request(LeaveRequest(
+            id="", username=rng.choice(usernames), start_date=start,
+            end_date=start + timedelta(days=1), leave_type='CL', reason="Benchmark"))
+
+    return {
+        'load_data': time_call(data_manager.load_data, repeat),
+        'save_data': time_call(data_manager.save_data, repeat),
+        'add_leave_request': time_call(add_leave, repeat),
+        'update_leave_request': time_call(
+            lambda: data_manager.update_leave_request(rng.choice(leave_ids), "Approved"), repeat),
+        'get_user_leaves': time_call(lambda: data_manager.get_user_leaves(rng.choice(usernames)), repeat * 20),
+        'get_pending_leaves': time_call(data_manager.get_pending_leaves, repeat * 20),
+    }
+
+def bench_views(data_dir, repeat: int) -> dict:
+    # Components import streamlit; they are only benchmarked here, not rendered
+    from components.calendar_view import CalendarView
+    from components.admin import AdminComponent
+
+    data_manager = DataManager(data_dir)
+    calendar_view = CalendarView(data_manager)
+    admin = AdminComponent(data_manager)
+    today = date.today()
+    daily_leaves = calendar_view.get_month_leaves(today.year, today.month)
+
+    return {
+        'get_month_leaves': time_call(lambda: calendar_view.get_month_leaves(today.year, today.month), repeat),
+        'create_calendar_table': time_call(
+            lambda: calendar_view.create_calendar_table(today.year, today.month, daily_leaves), repeat),
+        'report_leave_usage': time_call(admin._leave_usage_data, repeat),
+        'report_department_analysis': time_call(admin._department_data, repeat),
+        'report_leave_patterns': time_call(admin._leave_pattern_data, repeat),
+    }
+
+def compare(results: dict, previous_path: str) -> list:
+    """Return (size, operation, previous p50, current p50) for regressions"""
+    with open(previous_path) as f:
+        previous = json.load(f)['results']
+    regressions = []
+    for size, operations in results.items():
+        for operation, stats in operations.items():
+            before = previous.get(size, {}).get(operation)
+            if before and before['p50_ms'] and stats['p50_ms'] > before['p50_ms'] * REGRESSION_THRESHOLD:
+                regressions.append((size, operation, before['p50_ms'], stats['p50_ms']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help="USERS:LEAVES pairs")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    parser.add_argument('--compare', help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        users, leaves = (int(value) for value in size.split(':'))
+        with tempfile.TemporaryDirectory() as data_dir:
+            generate_org(DataManager(data_dir), users, leaves, args.seed)
+            results[size] = {**bench_data_layer(data_dir, args.repeat),
+                             **bench_views(data_dir, args.repeat)}
+        for operation, stats in results[size].items():
+            print(f"{size:>14} {operation:28} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms")
+
+    print(f"Results written to {write_results('suite', results, args.output)}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        for size, operation, before, after in regressions:
+            print(f"REGRESSION {size} {operation}: {before:.2f} ms -> {after:.2f} ms")
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
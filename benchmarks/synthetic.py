@@ -0,0 +1,128 @@
+# app/benchmarks/synthetic.py
+"""Seeded generator of realistic organisations for benchmarks and demos.
+
+Run from the project root:
+
+    python -m benchmarks.synthetic --users 1000 --leaves 20000 --data-dir /tmp/lms
+"""
+
+import argparse
+import random
+from datetime import date, datetime, timedelta
+from config import DEFAULT_LEAVE_BALANCE
+from models.user import User
+from models.leave import LeaveRequest
+from utils.auth import hash_password
+from utils.data_manager import DataManager
+
+DEPARTMENTS = [
+    "Engineering", "Sales", "Operations", "Customer Support", "Marketing",
+    "Finance", "Human Resources", "Legal", "Research", "Administration",
+]
+
+# Leave type mix and typical durations in days (min, max)
+LEAVE_TYPE_WEIGHTS = {'EL': 35, 'CL': 35, 'SL': 25, 'OH': 5}
+LEAVE_DURATIONS = {'EL': (2, 10), 'CL': (1, 2), 'SL': (1, 3), 'OH': (1, 1)}
+
+# Busier months get more leaves (Jan..Dec)
+MONTH_WEIGHTS = [6, 5, 7, 9, 10, 9, 11, 11, 7, 8, 7, 12]
+
+# Status mix for leaves that already started vs. upcoming leaves
+PAST_STATUS_WEIGHTS = {'Approved': 85, 'Rejected': 10, 'Pending': 5}
+FUTURE_STATUS_WEIGHTS = {'Approved': 55, 'Pending': 40, 'Rejected': 5}
+
+REASONS = {
+    'EL': ["Family vacation", "Travel abroad", "Wedding in the family", "Moving house", "Personal time off"],
+    'CL': ["Personal errand", "Bank appointment", "Child's school event", "Home repairs"],
+    'SL': ["Fever", "Medical appointment", "Dental surgery", "Flu", "Migraine"],
+    'OH': ["Festival", "Religious observance"],
+}
+REJECTION_COMMENTS = ["Team coverage too low", "Overlaps with release", "Please reschedule"]
+
+HOLIDAYS = [
+    ('01-01', "New Year's Day"), ('01-26', "Republic Day"), ('03-25', "Holi"),
+    ('05-01', "Labour Day"), ('08-15', "Independence Day"), ('10-02', "Gandhi Jayanti"),
+    ('10-24', "Dussehra"), ('11-12', "Diwali"), ('12-25', "Christmas"),
+]
+
+def _weighted(rng: random.Random, weights: dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def generate_users(rng: random.Random, count: int, password_hash: str):
+    """Users spread across departments with a long-tailed size distribution"""
+    department_weights = [1 / (rank + 1) for rank in range(len(DEPARTMENTS))]
+    for i in range(count):
+        department = rng.choices(DEPARTMENTS, weights=department_weights)[0]
+        yield User(
+            username=f"user{i:06d}",
+            password=password_hash,
+            email=f"user{i:06d}@company.com",
+            department=department,
+            leave_balance={leave_type: rng.randint(0, days * 2)
+                           for leave_type, days in DEFAULT_LEAVE_BALANCE.items()}
+        )
+
+def generate_leaves(rng: random.Random, usernames, count: int, years, today: date):
+    """Leave requests with realistic types, durations, seasons and statuses"""
+    for _ in range(count):
+        leave_type = _weighted(rng, LEAVE_TYPE_WEIGHTS)
+        year = rng.choice(years)
+        month = rng.choices(range(1, 13), weights=MONTH_WEIGHTS)[0]
+        start_date = date(year, month, rng.randint(1, 28))
+        low, high = LEAVE_DURATIONS[leave_type]
+        end_date = start_date + timedelta(days=rng.randint(low, high) - 1)
+
+        status = _weighted(rng, PAST_STATUS_WEIGHTS if start_date <= today else FUTURE_STATUS_WEIGHTS)
+        request_date = datetime.combine(start_date - timedelta(days=rng.randint(7, 60)), datetime.min.time())
+        leave = LeaveRequest(
+            id="",
+            username=rng.choice(usernames),
+            start_date=start_date,
+            end_date=end_date,
+            leave_type=leave_type,
+            reason=rng.choice(REASONS[leave_type]),
+            status=status,
+            request_date=request_date,
+        )
+        if status != 'Pending':
+            leave.action_date = request_date + timedelta(days=rng.randint(0, 5))
+            if status == 'Rejected':
+                leave.admin_comment = rng.choice(REJECTION_COMMENTS)
+        yield leave
+
+def generate_holidays(years):
+    return [{'date': f"{year}-{month_day}", 'description': name}
+            for year in years for month_day, name in HOLIDAYS]
+
+def generate_org(data_manager: DataManager, users: int = 1000, leaves: int = 10000,
+                 seed: int = 42, years=None) -> DataManager:
+    """Populate data_manager with a synthetic organisation in one save"""
+    rng = random.Random(seed)
+    today = date.today()
+    years = list(years or range(today.year - 2, today.year + 2))
+    password_hash = hash_password("password")  # Hashing cost is not what we measure
+
+    with data_manager.transaction():
+        for user in generate_users(rng, users, password_hash):
+            data_manager.add_user(user)
+        usernames = [user.username for user in data_manager.users.values() if not user.is_admin]
+        for leave in generate_leaves(rng, usernames, leaves, years, today):
+            data_manager.add_leave_request(leave)
+        data_manager.add_holidays(generate_holidays(years))
+        data_manager.save_data()
+    return data_manager
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--leaves', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', required=True, help="Directory to write the data files to")
+    args = parser.parse_args()
+
+    data_manager = generate_org(DataManager(args.data_dir), args.users, args.leaves, args.seed)
+    print(f"Wrote {len(data_manager.users)} users, {len(data_manager.leave_requests)} leave requests "
+          f"and {len(data_manager.holidays)} holidays to {args.data_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# app/benchmarks/tenants.py
+"""Cost of hosting several organisations: sharded tenants vs one shared store.
+
+Creates --tenants synthetic organisations, each in its own shard, and the
+same data merged into a single data directory, then compares opening a
+tenant, a cached lookup and submitting one leave request (load and save
+touch only the tenant's own files). Run from the project root:
+
+    python -m benchmarks.tenants --tenants 8 --users 500 --leaves 5000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from models.leave import LeaveRequest
+from utils.data_manager import DataManager
+from utils.tenants import TenantManagers, TenantRegistry
+from benchmarks.common import summarize, time_call, write_results
+from benchmarks.synthetic import generate_org
+
+def submit_one(data_manager: DataManager, rng: random.Random):
+    username = rng.choice([name for name in data_manager.users if name != 'admin'])
+    start = date.today() + timedelta(days=rng.randint(7, 120))
+    data_manager.add_leave_request(LeaveRequest(id=str(uuid.uuid4()), username=username,
+                                                start_date=start, end_date=start,
+                                                leave_type='CL', reason="Benchmark"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=8)
+    parser.add_argument('--users', type=int, default=500, help="Users per tenant")
+    parser.add_argument('--leaves', type=int, default=5000, help="Leave requests per tenant")
+    parser.add_argument('--capacity', type=int, default=4, help="Tenants kept open at once")
+    parser.add_argument('--submits', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        registry = TenantRegistry(Path(directory) / "sharded")
+        ids = [f"org{i:02d}" for i in range(args.tenants)]
+        for i, tenant_id in enumerate(ids):
+            registry.add(tenant_id, f"Organization {i}")
+            generate_org(DataManager(registry.data_dir_for(tenant_id), tenant=tenant_id),
+                         args.users, args.leaves, args.seed + i)
+        shared = DataManager(Path(directory) / "shared")
+        generate_org(shared, args.users * args.tenants, args.leaves * args.tenants, args.seed)
+
+        managers = TenantManagers(registry, capacity=args.capacity)
+        opens = []
+        for tenant_id in ids:
+            start = time.perf_counter()
+            managers.get(tenant_id)
+            opens.append(time.perf_counter() - start)
+        cached = time_call(lambda: managers.get(ids[-1]), repeat=1000)
+        shared_open = time_call(lambda: DataManager(Path(directory) / "shared"), repeat=3)
+
+        tenant = managers.get(ids[-1])
+        tenant_submit = time_call(lambda: submit_one(tenant, rng), repeat=args.submits)
+        shared_submit = time_call(lambda: submit_one(shared, rng), repeat=args.submits)
+
+    results = {
+        'config': vars(args),
+        'tenant_open': summarize(opens),
+        'tenant_cached_get': cached,
+        'shared_open': shared_open,
+        'tenant_submit': tenant_submit,
+        'shared_submit': shared_submit,
+        'open_after_run': managers.open_tenants(),
+    }
+
+    print(f"{args.tenants} tenants of {args.users} users / {args.leaves} leaves, {args.capacity} kept open")
+    print(f"open tenant   p50 {results['tenant_open']['p50_ms']:8.2f} ms   "
+          f"shared store {shared_open['p50_ms']:8.2f} ms")
+    print(f"cached lookup p50 {cached['p50_ms'] * 1000:8.2f} µs")
+    print(f"submit leave  p50 {tenant_submit['p50_ms']:8.2f} ms   "
+          f"shared store {shared_submit['p50_ms']:8.2f} ms")
+    print(f"Results written to {write_results('tenants', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,45 @@
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-import plotly.express as px
+from datetime import datetime, timedelta
 from utils.data_manager import DataManager
 from utils.auth import hash_password
+from utils.bulk_import import BulkImporter, IMPORT_KINDS, iter_rows
+from utils.accrual import AccrualEngine
+from utils.audit import AUDIT_ACTIONS
+from utils.profiling import profiler, timed
+from utils.session_state import SessionNamespace
+from components.live_updates import watch_changes
 from models.user import User
-from config import LEAVE_TYPES, DEFAULT_LEAVE_BALANCE
+from config import (LEAVE_TYPES, DEFAULT_LEAVE_BALANCE, SMTP_HOST, OUTBOX_DIR, DEFAULT_TENANT,
+                    TOMBSTONE_MIN_AGE)
 import time
 
 class AdminComponent:
     def __init__(self, data_manager: DataManager):
         self.data_manager = data_manager
 
+    @timed()
     def show_pending_requests(self):
-        """Display and manage pending leave requests"""
+        """Display and manage the leave requests waiting on the current approver"""
         st.subheader("Pending Leave Requests")
-        
-        pending_leaves = self.data_manager.get_pending_leaves()
+        approvals = self.data_manager.approvals
+        approver = st.session_state['username']
+        is_admin = st.session_state['is_admin']
+
+        if is_admin:
+            self._show_queue_stats()
+
+        department = self._department_filter("pending_department")
+        pending_leaves = [leave for key in approvals.queue_keys_for(approver, is_admin)
+                          for leave in approvals.queue(key, department)]
+
+        # Rejections being written, by leave id; dropped once a request is decided
+        rejections = SessionNamespace(st.session_state, "rejections")
+        rejections.prune(approvals.is_pending)
+
+        # Rerun when requests are submitted, decided or reassigned
+        watch_changes(self.data_manager, "pending", self._affects_queue)
         
         if not pending_leaves:
             st.info("No pending leave requests.")
@@ -27,8 +49,9 @@ class AdminComponent:
         for leave in pending_leaves:
             # Calculate duration directly
             duration = (leave.end_date - leave.start_date).days + 1
+            stage = approvals.current_stage(leave)
             
-            with st.expander(f"{leave.username}: {leave.leave_type} ({leave.start_date} to {leave.end_date})"):
+            with st.expander(f"[{stage}] {leave.username}: {leave.leave_type} ({leave.start_date} to {leave.end_date})"):
                 st.write(f"**Duration:** {duration} days")
                 st.write(f"**Reason:** {leave.reason}")
                 
@@ -36,44 +59,110 @@ class AdminComponent:
                 user = self.data_manager.users[leave.username]
                 st.write(f"**Current {leave.leave_type} Balance:** {user.leave_balance[leave.leave_type]} days")
 
+                for transition in leave.transitions or []:
+                    st.caption(f"{transition['stage']}: {transition['action']} by {transition['by']} "
+                               f"on {transition['at']:%Y-%m-%d %H:%M}")
+
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("Approve", key=f"approve_{leave.id}"):
-                        # Update leave balance
-                        user.leave_balance[leave.leave_type] -= duration
-                        # Update leave status
-                        self.data_manager.update_leave_request(leave.id, "Approved")
-                        self.data_manager.save_data()
-                        st.success("Leave approved!")
-                        st.experimental_rerun()
+                        result = approvals.approve(leave.id, approver)
+                        rejections.pop(leave.id)
+                        if result == "Approved":
+                            st.success("Leave approved!")
+                        elif result == "Pending":
+                            st.success(f"Approved at {stage} stage, sent for "
+                                       f"{approvals.current_stage(leave)} approval.")
+                        st.rerun()
 
                 with col2:
-                    # Create a unique key for each leave's rejection section
-                    rejection_key = f"reject_{leave.id}"
-                    if rejection_key not in st.session_state:
-                        st.session_state[rejection_key] = {
-                            'show_comment': False,
-                            'comment': ''
-                        }
-
                     if st.button("Reject", key=f"reject_btn_{leave.id}"):
-                        st.session_state[rejection_key]['show_comment'] = True
+                        rejections.set(leave.id, {'show_comment': True})
 
                     # Show comment input if reject was clicked
-                    if st.session_state[rejection_key]['show_comment']:
+                    if leave.id in rejections and rejections.get(leave.id)['show_comment']:
                         comment = st.text_input(
                             "Rejection Reason",
                             key=f"comment_input_{leave.id}"
                         )
                         if st.button("Confirm Rejection", key=f"confirm_reject_{leave.id}"):
                             if comment.strip():
-                                self.data_manager.update_leave_request(leave.id, "Rejected", comment)
-                                self.data_manager.save_data()
+                                approvals.reject(leave.id, approver, comment)
+                                rejections.pop(leave.id)
                                 st.success("Leave rejected!")
-                                st.experimental_rerun()
+                                st.rerun()
                             else:
                                 st.error("Please provide a reason for rejection")
 
+    @staticmethod
+    def _affects_queue(change) -> bool:
+        """Whether a change can alter the pending queues"""
+        if change.event in ('leave_added', 'leaves_restored'):
+            return "Pending" in change.statuses
+        return change.event in ('leave_updated', 'leaves_removed', 'user_updated', 'user_deleted', 'reset')
+
+    def _show_queue_stats(self):
+        """Requests waiting and the oldest wait at each approval stage"""
+        stats = self.data_manager.approvals.stats()
+        st.dataframe(pd.DataFrame([
+            {
+                'Stage': stage,
+                'Pending': data['pending'],
+                'Oldest Wait (days)': round(data['oldest_seconds'] / 86400, 1),
+            }
+            for stage, data in stats.items()
+        ]), use_container_width=True, hide_index=True)
+
+    @timed()
+    def show_search(self):
+        """Search leave requests by keywords in reasons and admin comments"""
+        st.subheader("Search Leave Requests")
+
+        query = st.text_input("Keywords", placeholder="e.g. medical, wedd*", key="search_query")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            username = st.text_input("Username", key="search_username")
+        with col2:
+            statuses = st.multiselect("Status", ["Pending", "Approved", "Rejected"], key="search_status")
+        with col3:
+            leave_types = st.multiselect("Leave Type", list(LEAVE_TYPES), key="search_type")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            start = st.date_input("From", value=None, key="search_from")
+        with col2:
+            end = st.date_input("To", value=None, key="search_to")
+        with col3:
+            limit = st.number_input("Max results", min_value=10, max_value=1000, value=100, step=10,
+                                    key="search_limit")
+
+        if not (query.strip() or username or statuses or leave_types or start or end):
+            st.info("Enter keywords or choose a filter to search.")
+            return
+
+        started = time.perf_counter()
+        results = self.data_manager.search_index.search(
+            query, username=username.strip() or None, statuses=statuses,
+            leave_types=leave_types, start=start, end=end, limit=int(limit)
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        st.caption(f"{len(results)} results in {elapsed_ms:.1f} ms")
+        if results:
+            st.dataframe(pd.DataFrame([
+                {
+                    'Username': leave.username,
+                    'Type': leave.leave_type,
+                    'Start Date': leave.start_date,
+                    'End Date': leave.end_date,
+                    'Status': leave.status,
+                    'Reason': leave.reason,
+                    'Admin Comment': leave.admin_comment or ''
+                }
+                for leave in results
+            ]), use_container_width=True, hide_index=True)
+
+    @timed()
     def manage_users(self):
         """User management interface"""
         st.subheader("Manage Users")
@@ -85,6 +174,7 @@ class AdminComponent:
                 password = st.text_input("Password", type="password")
                 email = st.text_input("Email")
                 department = st.text_input("Department")
+                manager = st.text_input("Manager (username, optional)")
                 
                 # Add admin user option
                 is_admin = st.checkbox("Create as Admin User")
@@ -109,6 +199,13 @@ class AdminComponent:
                         if username in self.data_manager.users:
                             st.error("Username already exists!")
                             return
+                        if username in self.data_manager.tombstones:
+                            st.error("Username belongs to a deleted user! Restore it under "
+                                     "Deleted Users, or wait until deleted users are purged.")
+                            return
+                        if manager and manager not in self.data_manager.users:
+                            st.error(f"Manager '{manager}' does not exist!")
+                            return
 
                         # Create user object
                         user = User(
@@ -117,7 +214,8 @@ class AdminComponent:
                             email=email,
                             department=department,
                             leave_balance=leave_balance,
-                            is_admin=is_admin
+                            is_admin=is_admin,
+                            manager=manager or None
                         )
 
                         if self.data_manager.add_user(user):
@@ -126,150 +224,299 @@ class AdminComponent:
                             st.error("Error adding user!")
                     else:
                         st.error("Please fill all required fields!")
-         # Edit user section
-        with st.expander("Edit User"):
-            users_to_edit = [username for username in self.data_manager.users.keys()]
-            if users_to_edit:
-                selected_user = st.selectbox("Select user to edit", options=users_to_edit)
-                user = self.data_manager.users[selected_user]
-
-                with st.form("edit_user_form"):
-                    email = st.text_input("Email", value=user.email)
-                    department = st.text_input("Department", value=user.department)
-                    new_password = st.text_input("New Password (leave blank to keep current)", type="password")
-                    
-                    # Show leave balance only for non-admin users
-                    leave_balance = user.leave_balance.copy() if not user.is_admin else None
-                    if not user.is_admin:
-                        st.write("Leave Balance")
-                        cols = st.columns(len(DEFAULT_LEAVE_BALANCE))
-                        for i, leave_type in enumerate(DEFAULT_LEAVE_BALANCE.keys()):
-                            with cols[i]:
-                                leave_balance[leave_type] = st.number_input(
-                                    leave_type,
-                                    min_value=0,
-                                    value=user.leave_balance.get(leave_type, 0)
-                                )
-
-                    if st.form_submit_button("Update User"):
-                        # Update user information
-                        user.email = email
-                        user.department = department
-                        if new_password:
-                            user.password = hash_password(new_password)
-                        if leave_balance:
-                            user.leave_balance = leave_balance
-
-                        self.data_manager.users[selected_user] = user
-                        self.data_manager.save_data()
-                        st.success("User updated successfully!")
-                        st.experimental_rerun()
-            else:
-                st.info("No users to edit.")
 
-        # User list and management
+        # Bulk import section
+        with st.expander("Bulk Import"):
+            self._show_bulk_import()
+
+        # Departments section
+        with st.expander("Departments"):
+            self._show_departments()
+
+        # Deleted users can be restored until they are purged
+        tombstones = self.data_manager.tombstones
+        if tombstones:
+            with st.expander(f"Deleted Users ({len(tombstones)})"):
+                self._show_deleted_users()
+
+        # User directory
         st.subheader("Existing Users")
+        self._show_user_directory()
+
+    @timed()
+    def _show_user_directory(self):
+        """Searchable, paginated user list with a detail pane for the selected user"""
+        directory = self.data_manager.user_directory
 
-        # Create separate tables for regular users and admins
-        users_data = {
-            'regular': [],
-            'admin': []
-        }
+        col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+        with col1:
+            query = st.text_input("Search username, email or department", key="user_dir_query")
+        with col2:
+            role = st.selectbox("Type", options=["All", "Regular Users", "Admin Users"], key="user_dir_role")
+        with col3:
+            sort_by = st.selectbox("Sort by", options=["username", "email", "department"],
+                                   format_func=str.title, key="user_dir_sort")
+        with col4:
+            page_size = st.selectbox("Per page", options=[25, 50, 100], key="user_dir_page_size")
+        descending = st.checkbox("Descending", key="user_dir_desc")
+
+        is_admin = {"All": None, "Regular Users": False, "Admin Users": True}[role]
+        page_number = st.session_state.get("user_dir_page", 1)
+        result = directory.search(query, sort_by=sort_by, descending=descending,
+                                  page=page_number, page_size=page_size, is_admin=is_admin)
+        if page_number > result.page_count:
+            result = directory.search(query, sort_by=sort_by, descending=descending,
+                                      page=result.page_count, page_size=page_size, is_admin=is_admin)
+            st.session_state["user_dir_page"] = result.page
+
+        if not result.usernames:
+            st.info("No users found.")
+            return
 
-        for username, user in self.data_manager.users.items():
-            user_data = {
+        rows = []
+        for username in result.usernames:
+            user = self.data_manager.users[username]
+            rows.append({
                 'Username': username,
                 'Email': user.email,
-                'Department': user.department
-            }
-            
-            if user.is_admin:
-                users_data['admin'].append(user_data)
-            else:
-                users_data['regular'].append({**user_data, **user.leave_balance})
+                'Department': user.department,
+                'Type': 'Admin' if user.is_admin else 'Regular User',
+                **({} if user.is_admin else user.leave_balance),
+            })
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
 
-        # Display admin users
-        st.write("### Admin Users")
-        if users_data['admin']:
-            admin_df = pd.DataFrame(users_data['admin'])
-            st.dataframe(admin_df)
-        else:
-            st.info("No additional admin users.")
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            st.number_input("Page", min_value=1, max_value=result.page_count, key="user_dir_page")
+        with col2:
+            st.caption(f"{result.total} users, page {result.page} of {result.page_count}")
+
+        # Only the selected user's details are rendered
+        selected_user = st.selectbox("Select user", options=result.usernames, key="user_dir_selected")
+        if selected_user:
+            self._show_user_details(selected_user)
+
+        with st.expander("Delete Several Users"):
+            self._show_bulk_delete(result.usernames)
+
+    def _show_bulk_delete(self, usernames):
+        """Offboard several users of the current page with one save"""
+        candidates = [username for username in usernames if username != st.session_state['username']]
+        with st.form("bulk_delete_form", clear_on_submit=True):
+            selected = st.multiselect("Users to delete", options=candidates)
+            confirm = st.checkbox("I confirm that I want to delete these users")
+            if not st.form_submit_button("Delete Selected Users") or not selected:
+                return
 
-        # Display regular users
-        st.write("### Regular Users")
-        if users_data['regular']:
-            users_df = pd.DataFrame(users_data['regular'])
-            st.dataframe(users_df)
-        else:
-            st.info("No regular users.")
+        if not confirm:
+            st.warning("Please confirm deletion by checking the box above")
+            return
+        admins = sum(1 for username in selected if self.data_manager.users[username].is_admin)
+        if admins and self.data_manager.user_directory.admin_count <= admins:
+            st.error("Cannot delete the last admin user!")
+            return
 
-        # User deletion
-        st.write("### Delete User")
-        deletable_users = [username for username, user in self.data_manager.users.items() 
-                    if username != st.session_state['username']]
+        deleted = self.data_manager.delete_users(selected)
+        st.success(f"{deleted} users deleted! They can be restored under Deleted Users "
+                   f"until deleted users are purged.")
+        time.sleep(0.5)  # Small delay before refresh
+        st.rerun()
 
-        if not deletable_users:
-            st.info("No users available to delete.")
-            return  # Exit the function if no users to delete
+    def _show_user_details(self, selected_user: str):
+        """Edit and delete controls for one user"""
+        user = self.data_manager.users.get(selected_user)
+        if user is None:
+            return
 
-        # Only proceed if there are deletable users
-        col1, col2 = st.columns([3, 1])
+        with st.expander(f"Edit {selected_user}"):
+            with st.form(f"edit_user_form_{selected_user}"):
+                email = st.text_input("Email", value=user.email)
+                department = st.text_input("Department", value=user.department)
+                manager = st.text_input("Manager (username, optional)", value=user.manager or "")
+                new_password = st.text_input("New Password (leave blank to keep current)", type="password")
 
-        with col1:
-            selected_user = st.selectbox(
-                "Select user to delete",
-                options=deletable_users,
-                key="delete_user_select"
-            )
+                # Show leave balance only for non-admin users
+                leave_balance = user.leave_balance.copy() if not user.is_admin else None
+                if not user.is_admin:
+                    st.write("Leave Balance")
+                    cols = st.columns(len(DEFAULT_LEAVE_BALANCE))
+                    for i, leave_type in enumerate(DEFAULT_LEAVE_BALANCE.keys()):
+                        with cols[i]:
+                            leave_balance[leave_type] = st.number_input(
+                                leave_type,
+                                min_value=0,
+                                value=user.leave_balance.get(leave_type, 0)
+                            )
 
-            # Show user details in col1
-            if selected_user:
-                user = self.data_manager.users[selected_user]
-                st.write(f"**Email:** {user.email}")
-                st.write(f"**Department:** {user.department}")
-                st.write(f"**Type:** {'Admin' if user.is_admin else 'Regular User'}")
+                if st.form_submit_button("Update User"):
+                    if manager and (manager == selected_user or manager not in self.data_manager.users):
+                        st.error(f"Manager '{manager}' is not a valid user!")
+                        return
 
-        with col2:
-            confirm = st.checkbox("I confirm that I want to delete this user", 
-                                key=f"confirm_delete_{selected_user}")
+                    user_data = {'email': email, 'department': department, 'manager': manager}
+                    if new_password:
+                        user_data['password'] = hash_password(new_password)
+                    if leave_balance:
+                        user_data['leave_balance'] = leave_balance
 
-        # Delete button in col2
-        if st.button("Delete User", key=f"delete_btn_{selected_user}"):
-            if not confirm:
-                st.warning("Please confirm deletion by checking the box above")
-                return
+                    if self.data_manager.update_user(selected_user, user_data):
+                        st.success("User updated successfully!")
+                        st.rerun()
+                    else:
+                        st.error("Error updating user!")
+
+        if selected_user == st.session_state['username']:
+            return
 
-            # Check if trying to delete the last admin
-            if user.is_admin:
-                admin_count = sum(1 for u in self.data_manager.users.values() if u.is_admin)
-                if admin_count <= 1:
+        with st.expander(f"Delete {selected_user}"):
+            confirm = st.checkbox("I confirm that I want to delete this user",
+                                  key=f"confirm_delete_{selected_user}")
+
+            if st.button("Delete User", key=f"delete_btn_{selected_user}"):
+                if not confirm:
+                    st.warning("Please confirm deletion by checking the box above")
+                    return
+
+                # Check if trying to delete the last admin
+                if user.is_admin and self.data_manager.user_directory.admin_count <= 1:
                     st.error("Cannot delete the last admin user!")
                     return
-            
-            # Perform deletion
-            if self.data_manager.delete_user(selected_user):
-                st.success(f"User {selected_user} deleted successfully!")
-                time.sleep(0.5)  # Small delay before refresh
-                st.rerun()
+
+                # Perform deletion
+                if self.data_manager.delete_user(selected_user):
+                    st.success(f"User {selected_user} deleted! They can be restored under "
+                               f"Deleted Users until deleted users are purged.")
+                    time.sleep(0.5)  # Small delay before refresh
+                    st.rerun()
+                else:
+                    st.error("Failed to delete user!")
+
+    def _show_deleted_users(self):
+        """Deleted users awaiting compaction, with restore and purge actions"""
+        tombstones = self.data_manager.tombstones
+        st.dataframe(pd.DataFrame([{
+            'Username': username,
+            'Department': tombstone['user'].department,
+            'Deleted': tombstone['deleted_at'].strftime('%Y-%m-%d %H:%M'),
+        } for username, tombstone in sorted(tombstones.items())]), hide_index=True)
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            username = st.selectbox("Deleted user", options=sorted(tombstones), key="restore_user_select")
+        with col2:
+            st.write("")
+            if st.button("Restore", key="restore_user_button"):
+                if self.data_manager.restore_user(username):
+                    st.success(f"User {username} restored!")
+                    st.rerun()
+                else:
+                    st.error("Failed to restore user!")
+
+        st.caption(f"Deleted users are purged automatically once deleted for "
+                   f"{TOMBSTONE_MIN_AGE // 86400} days.")
+        if st.button("Purge All Now", key="compact_button"):
+            purged = self.data_manager.compact()
+            st.success(f"Purged {len(purged)} deleted users and their leave requests.")
+            st.rerun()
+
+    def _show_departments(self):
+        """List departments with member counts; add or remove empty departments"""
+        registry = self.data_manager.departments
+        counts = registry.member_counts()
+        if counts:
+            st.dataframe(pd.DataFrame([{'Department': name, 'Members': count}
+                                       for name, count in counts.items()]),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("No departments yet.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            with st.form("add_department_form", clear_on_submit=True):
+                name = st.text_input("New Department")
+                if st.form_submit_button("Add Department"):
+                    if registry.add_department(name):
+                        st.success(f"Department {name.strip()} added!")
+                        st.rerun()
+                    else:
+                        st.error("Department name is empty or already exists!")
+        with col2:
+            empty = [name for name, count in counts.items() if count == 0]
+            if empty:
+                name = st.selectbox("Empty department", options=empty, key="remove_department_select")
+                if st.button("Remove Department", key="remove_department_button"):
+                    registry.remove_department(name)
+                    st.rerun()
+
+    def _show_bulk_import(self):
+        """Import users, balances, holidays or leaves from a CSV/XLSX file"""
+        st.write("Columns: users `username, password, email, department, is_admin, manager, EL, CL, SL, OH`; "
+                 "balances `username, EL, CL, SL, OH`; holidays `date, description`; "
+                 "leaves `username, start_date, end_date, leave_type, reason, status, admin_comment`")
+        st.caption("Passwords may be plain text or scrypt hashes exported from this system. Plain "
+                   "passwords are stored with a quick hash that is strengthened at the user's first login.")
+        kind = st.selectbox("Import type", options=list(IMPORT_KINDS), key="bulk_import_kind")
+        uploaded = st.file_uploader("CSV or XLSX file", type=["csv", "xlsx"], key="bulk_import_file")
+        atomic = st.checkbox("Import nothing if any row is invalid", key="bulk_import_atomic")
+
+        if uploaded is not None and st.button("Import", key="bulk_import_button"):
+            importer = BulkImporter(self.data_manager)
+            result = importer.run(iter_rows(uploaded, uploaded.name), kind, atomic=atomic)
+
+            if result.committed:
+                st.success(f"Imported {result.imported} of {result.total_rows} rows.")
             else:
-                st.error("Failed to delete user!")
+                st.error(f"Nothing imported: {len(result.errors)} invalid rows.")
+
+            if result.errors:
+                st.warning(f"{len(result.errors)} errors found.")
+                st.dataframe(pd.DataFrame([vars(error) for error in result.errors[:100]]))
+                st.download_button(
+                    "Download Error Report",
+                    data=result.error_report_csv(),
+                    file_name=f"{kind}_import_errors.csv",
+                    mime="text/csv"
+                )
 
+    @timed()
     def show_reports(self):
         """Generate and display various reports"""
         st.subheader("Leave Reports")
 
+        department = self._department_filter("report_department")
+        snapshot = self._report_snapshot()
+
         # Create tabs for different reports
         tab1, tab2, tab3 = st.tabs(["Leave Usage", "Department Analysis", "Leave Patterns"])
 
         with tab1:
-            self._show_leave_usage_report()
+            self._show_leave_usage_report(department, snapshot)
 
         with tab2:
-            self._show_department_analysis()
+            self._show_department_analysis(department, snapshot)
 
         with tab3:
-            self._show_leave_patterns()
+            self._show_leave_patterns(department, snapshot)
+
+    def _report_snapshot(self):
+        """Snapshot covering every year; archived partitions are read for it, not loaded"""
+        return self.data_manager.snapshot(self.data_manager.partition_years())
+
+    def _department_filter(self, key: str) -> str:
+        """Department selectbox; returns None for all departments"""
+        department = st.selectbox("Department",
+                                  ["All Departments"] + self.data_manager.departments.departments(),
+                                  key=key)
+        return None if department == "All Departments" else department
+
+    def _report_users(self, snapshot, department: str = None):
+        """(username, user) pairs of non-admin users, optionally in one department"""
+        if department:
+            usernames = sorted(snapshot.members(department))
+        else:
+            usernames = list(snapshot.users)
+        users = snapshot.users
+        return [(username, users[username]) for username in usernames if not users[username].is_admin]
     
     def show_data_management(self):
         """Display data management options"""
@@ -282,7 +529,37 @@ class AdminComponent:
                 st.success("Backup created successfully!")
             else:
                 st.error("Failed to create backup!")
+
+        self._show_backups()
+
+        # Year-end section
+        st.write("### Year-End Accrual")
+        self._show_year_end_accrual()
+
+        # Archive section
+        st.write("### Archive")
+        st.caption(f"Loaded years: {', '.join(map(str, sorted(self.data_manager.loaded_years))) or 'none'}")
+        if st.button("Archive Closed Years"):
+            archived = self.data_manager.archive_closed_years()
+            if archived:
+                st.success(f"Archived {', '.join(map(str, archived))}.")
+            else:
+                st.info("No closed years to archive.")
         
+        # Audit section
+        st.write("### Audit Log")
+        self._show_audit_log()
+
+        # Hosted organizations are managed from the default one
+        if self.data_manager.tenant == DEFAULT_TENANT:
+            st.write("### Organizations")
+            self._show_tenants()
+
+        # Notifications section
+        if SMTP_HOST:
+            st.write("### Notifications")
+            self._show_outbox()
+
         # Danger zone for data purge
         st.write("### ⚠️ Danger Zone")
         with st.expander("Purge All Data"):
@@ -322,120 +599,297 @@ class AdminComponent:
                     else:
                         st.error("Please type 'CONFIRM' to proceed with data purge")
 
-    def _show_leave_usage_report(self):
+    def show_performance(self):
+        """Display recent timings and write sizes per operation"""
+        st.subheader("Performance")
+
+        enabled = st.checkbox("Enable profiling", value=profiler.enabled, key="profiling_enabled")
+        if enabled != profiler.enabled:
+            profiler.enabled = enabled
+            st.rerun()
+
+        if st.button("Reset Statistics"):
+            profiler.reset()
+
+        stats = profiler.stats()
+        if not stats:
+            st.info("No samples collected yet. Enable profiling and use the app to collect timings.")
+            return
+
+        st.caption(f"Based on the last {profiler.window} samples per operation.")
+        st.dataframe(pd.DataFrame(stats), use_container_width=True, hide_index=True)
+
+    @timed()
+    def _show_audit_log(self):
+        """Query recorded changes by target user, actor, action and date"""
+        audit = self.data_manager.audit
+        st.caption(f"{len(audit):,} events recorded.")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            target = st.text_input("User affected", key="audit_target").strip()
+        with col2:
+            actor = st.text_input("Changed by", key="audit_actor").strip()
+        with col3:
+            actions = sorted(name for name in audit.names() if name in AUDIT_ACTIONS)
+            action = st.selectbox("Action", ["All Actions"] + actions, key="audit_action")
+        with col4:
+            today = datetime.now().date()
+            period = st.date_input("Between", value=(today - timedelta(days=90), today), key="audit_period")
+        if len(period) != 2:
+            return
+
+        events = audit.query(
+            actor=actor or None, target=target or None,
+            action=None if action == "All Actions" else action,
+            start=datetime.combine(period[0], datetime.min.time()),
+            end=datetime.combine(period[1] + timedelta(days=1), datetime.min.time()),
+        )
+        if not events:
+            st.info("No matching events.")
+            return
+        st.dataframe(pd.DataFrame([{
+            'Time': event.timestamp,
+            'Action': event.action,
+            'User': event.target,
+            'By': event.actor,
+            'Details': ", ".join(f"{name}: {value}" for name, value in event.details.items()),
+        } for event in events]), use_container_width=True, hide_index=True)
+        if len(events) == 500:
+            st.caption("Showing the 500 most recent matching events.")
+
+    def _show_tenants(self):
+        """List hosted organizations and add new ones"""
+        from utils.tenants import TenantRegistry
+
+        registry = TenantRegistry(self.data_manager.data_dir)
+        st.dataframe(pd.DataFrame([{
+            'Id': tenant.id,
+            'Name': tenant.name,
+            'Created': None if tenant.id == DEFAULT_TENANT else tenant.created_at,
+        } for tenant in registry.tenants()]), use_container_width=True, hide_index=True)
+
+        with st.form("add_tenant_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                tenant_id = st.text_input("Organization Id", help="Lowercase letters, digits and dashes")
+            with col2:
+                name = st.text_input("Organization Name")
+            if st.form_submit_button("Add Organization"):
+                try:
+                    tenant = registry.add(tenant_id, name)
+                    st.success(f"Organization '{tenant.name}' added. Its admin logs in with the "
+                               f"default admin credentials; please change the password.")
+                except ValueError as e:
+                    st.error(str(e))
+
+    def _show_outbox(self):
+        """Queued and failed email notifications"""
+        from utils.notifications import Outbox
+
+        outbox = Outbox(self.data_manager.data_dir / OUTBOX_DIR.name)
+        failed = outbox.failed()
+        st.caption(f"{outbox.pending_count()} queued, {len(failed)} failed.")
+        if failed:
+            st.dataframe(pd.DataFrame([{
+                'Created': message.created_at,
+                'To': ", ".join(message.to),
+                'Subject': message.subject,
+                'Attempts': message.attempts,
+                'Error': message.last_error,
+            } for message in failed[:200]]), use_container_width=True, hide_index=True)
+            if st.button("Retry Failed", key="outbox_retry"):
+                st.success(f"Requeued {outbox.requeue_failed()} messages.")
+
+    @timed()
+    def _show_year_end_accrual(self):
+        """Preview and apply carry-forward, lapse and accrual for all users"""
+        engine = AccrualEngine(self.data_manager)
+        today = datetime.now()
+        year = st.number_input("Year to close", min_value=2000, max_value=today.year,
+                               value=today.year - 1 if today.month <= 6 else today.year,
+                               key="accrual_year")
+
+        if engine.has_run(year):
+            run = self.data_manager.meta['accrual_runs'][year]
+            st.info(f"Year-end accrual for {year} was applied on {run['applied_at']:%Y-%m-%d %H:%M} "
+                    f"to {run['users']} users.")
+            return
+
+        preview = engine.preview(year)
+        st.write("**Preview (dry run)**")
+        st.dataframe(pd.DataFrame(preview.totals()), use_container_width=True, hide_index=True)
+        with st.expander(f"Per-user changes ({len(preview.usernames)} users)"):
+            st.dataframe(pd.DataFrame(preview.rows(limit=500)), use_container_width=True, hide_index=True)
+
+        confirm = st.checkbox(f"Apply year-end accrual for {year} to all users", key="accrual_confirm")
+        if st.button("Apply Accrual", type="primary", key="accrual_button"):
+            if not confirm:
+                st.warning("Please confirm by checking the box above")
+                return
+            try:
+                engine.apply(year)
+                st.success(f"Balances updated for {len(preview.usernames)} users.")
+            except ValueError as e:
+                st.error(str(e))
+
+    def _show_backups(self):
+        """List backups and allow verifying or restoring one"""
+        backups = self.data_manager.list_backups()
+        if not backups:
+            st.info("No backups yet.")
+            return
+
+        st.dataframe(pd.DataFrame([
+            {
+                'Backup': info.id,
+                'Created': info.created[:19].replace('T', ' '),
+                'Users': info.records.get('users', 0),
+                'Leave Requests': info.records.get('leaves', 0),
+                'Holidays': info.records.get('holidays', 0),
+                'Size (KB)': round(info.total_bytes / 1024, 1),
+                'Stored (KB)': round(info.new_bytes / 1024, 1),
+            }
+            for info in backups
+        ]), use_container_width=True, hide_index=True)
+
+        with st.expander("Restore Backup"):
+            backup_id = st.selectbox(
+                "Backup to restore",
+                options=[info.id for info in backups],
+                format_func=lambda backup_id: backup_id[:15],
+                key="restore_backup_select"
+            )
+
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Verify Backup", key="verify_backup_button"):
+                    problems = self.data_manager.verify_backup(backup_id)
+                    if problems:
+                        st.error("Backup is damaged:\n" + "\n".join(f"- {problem}" for problem in problems))
+                    else:
+                        st.success("All checksums match.")
+
+            with col2:
+                confirm = st.checkbox("I understand current data will be replaced", key="restore_confirm")
+                if st.button("Restore", type="primary", key="restore_backup_button"):
+                    if not confirm:
+                        st.warning("Please confirm the restore by checking the box above")
+                    elif self.data_manager.create_backup() and self.data_manager.restore_backup(backup_id):
+                        st.success(f"Data restored from backup {backup_id[:15]}!")
+                    else:
+                        st.error("Failed to restore backup!")
+
+    @timed()
+    def _leave_usage_data(self, department: str = None, snapshot=None) -> pd.DataFrame:
+        """Days used and balance per user and leave type"""
+        # Reports read one snapshot, so approvals meanwhile neither wait nor skew them
+        snapshot = snapshot or self._report_snapshot()
+        usage_data = []
+        for username, user in self._report_users(snapshot, department):
+            user_leaves = snapshot.user_leaves(username)
+            approved_leaves = [leave for leave in user_leaves if leave.status == "Approved"]
+            
+            for leave_type in LEAVE_TYPES:
+                total_days = sum((leave.end_date - leave.start_date).days + 1 
+                                for leave in approved_leaves 
+                                if leave.leave_type == leave_type)
+                usage_data.append({
+                    'Username': username,
+                    'Leave Type': leave_type,
+                    'Days Used': total_days,
+                    'Balance': user.leave_balance[leave_type]
+                })
+
+        return pd.DataFrame(usage_data)
+
+    def _show_leave_usage_report(self, department: str = None, snapshot=None):
         """Display leave usage report"""
+        import plotly.express as px  # Only needed on the Reports page
+
         # Calculate leave usage for each user
-        usage_data = []
-        for username, user in self.data_manager.users.items():
-            if not user.is_admin:
-                user_leaves = self.data_manager.get_user_leaves(username)
-                approved_leaves = [leave for leave in user_leaves if leave.status == "Approved"]
-                
-                for leave_type in LEAVE_TYPES:
-                    total_days = sum((leave.end_date - leave.start_date).days + 1 
-                                    for leave in approved_leaves 
-                                    if leave.leave_type == leave_type)
-                    usage_data.append({
-                        'Username': username,
-                        'Leave Type': leave_type,
-                        'Days Used': total_days,
-                        'Balance': user.leave_balance[leave_type]
-                    })
-
-        if usage_data:
-            df = pd.DataFrame(usage_data)
+        df = self._leave_usage_data(department, snapshot)
+
+        if not df.empty:
             fig = px.bar(df, x='Username', y=['Days Used', 'Balance'],
                         barmode='group', title='Leave Usage vs Balance')
             st.plotly_chart(fig)
         else:
             st.info("No leave data available.")
     
-    def show_data_management(self):
-        """Display data management options"""
-        st.subheader("Data Management")
+    @timed()
+    def _department_data(self, department: str = None, snapshot=None) -> pd.DataFrame:
+        """Average approved leave days per user in each department"""
+        # Users without a department are grouped under ""
+        snapshot = snapshot or self._report_snapshot()
+        departments = [department] if department else snapshot.departments() + [""]
+        dept_data = {}
+        for dept in departments:
+            usernames = [username for username in snapshot.members(dept)
+                         if not snapshot.users[username].is_admin]
+            if not usernames:
+                continue
+
+            approved_leaves = snapshot.leaves_for(usernames, "Approved")
+            dept_data[dept] = {
+                'total_days': sum((leave.end_date - leave.start_date).days + 1
+                                  for leave in approved_leaves),
+                'users': len(usernames),
+            }
 
-        with st.expander("⚠️ Danger Zone"):
-            st.warning("""
-            Warning: This action will permanently delete all data except the admin account.
-            This includes:
-            - All user accounts
-            - All leave requests
-            - All holiday records
-            
-            This action cannot be undone!
-            """)
-            
-            # Create two columns for confirmation
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                confirm_text = st.text_input(
-                    "Type 'CONFIRM' to proceed with data purge",
-                    key="purge_confirm"
-                )
-            
-            with col2:
-                if st.button("Purge All Data", type="primary", key="purge_button"):
-                    if confirm_text == "CONFIRM":
-                        if self.data_manager.purge_data():
-                            st.success("All data has been purged successfully!")
-                            # Add a rerun button to refresh the page
-                            if st.button("Refresh Page"):
-                                st.experimental_rerun()
-                        else:
-                            st.error("Error occurred while purging data!")
-                    else:
-                        st.error("Please type 'CONFIRM' to proceed with data purge")
+        return pd.DataFrame([
+            {
+                'Department': dept,
+                'Average Days': data['total_days'] / data['users'],
+                'Total Users': data['users']
+            }
+            for dept, data in dept_data.items()
+        ])
 
-    def _show_department_analysis(self):
+    def _show_department_analysis(self, department: str = None, snapshot=None):
         """Display department-wise leave analysis"""
-        dept_data = {}
-        for username, user in self.data_manager.users.items():
-            if not user.is_admin:
-                if user.department not in dept_data:
-                    dept_data[user.department] = {'total_days': 0, 'users': 0}
-                dept_data[user.department]['users'] += 1
-                
-                user_leaves = self.data_manager.get_user_leaves(username)
-                approved_leaves = [leave for leave in user_leaves if leave.status == "Approved"]
-                total_days = sum((leave.end_date - leave.start_date).days + 1 
-                                for leave in approved_leaves)
-                dept_data[user.department]['total_days'] += total_days
+        import plotly.express as px
 
-        if dept_data:
-            df = pd.DataFrame([
-                {
-                    'Department': dept,
-                    'Average Days': data['total_days'] / data['users'],
-                    'Total Users': data['users']
-                }
-                for dept, data in dept_data.items()
-            ])
-            
+        df = self._department_data(department, snapshot)
+
+        if not df.empty:
             fig = px.bar(df, x='Department', y='Average Days',
                         title='Average Leave Days by Department')
             st.plotly_chart(fig)
         else:
             st.info("No department data available.")
 
-    def _show_leave_patterns(self):
+    @timed()
+    def _leave_pattern_data(self, department: str = None, snapshot=None) -> pd.DataFrame:
+        """Approved leave days summed by starting month"""
+        snapshot = snapshot or self._report_snapshot()
+        if department:
+            all_leaves = snapshot.leaves_for(snapshot.members(department), "Approved")
+        else:
+            all_leaves = [leave for leave in snapshot.leave_requests
+                        if leave.status == "Approved"]
+        
+        if not all_leaves:
+            return pd.DataFrame()
+
+        # Create monthly pattern
+        monthly_data = []
+        for leave in all_leaves:
+            duration = (leave.end_date - leave.start_date).days + 1
+            monthly_data.append({
+                'Month': leave.start_date.strftime('%B'),
+                'Days': duration
+            })
+        
+        df = pd.DataFrame(monthly_data)
+        return df.groupby('Month')['Days'].sum().reset_index()
+
+    def _show_leave_patterns(self, department: str = None, snapshot=None):
         """Display leave patterns analysis"""
-        all_leaves = [leave for leave in self.data_manager.leave_requests 
-                    if leave.status == "Approved"]
+        import plotly.express as px
+
+        monthly_summary = self._leave_pattern_data(department, snapshot)
         
-        if all_leaves:
-            # Create monthly pattern
-            monthly_data = []
-            for leave in all_leaves:
-                duration = (leave.end_date - leave.start_date).days + 1
-                monthly_data.append({
-                    'Month': leave.start_date.strftime('%B'),
-                    'Days': duration
-                })
-            
-            df = pd.DataFrame(monthly_data)
-            monthly_summary = df.groupby('Month')['Days'].sum().reset_index()
-            
+        if not monthly_summary.empty:
             fig = px.line(monthly_summary, x='Month', y='Days',
                         title='Monthly Leave Patterns')
             st.plotly_chart(fig)
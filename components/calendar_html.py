@@ -0,0 +1,70 @@
+# app/components/calendar_html.py
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+from config import CALENDAR_CACHE_SIZE
+
+# Shared by every month, so fragments only carry the cells
+CALENDAR_CSS = """<style>
+.lms-cal{width:100%;border-collapse:collapse;table-layout:fixed;font-size:12px}
+.lms-cal th{background:paleturquoise;height:40px;font-size:14px;color:#000}
+.lms-cal td{height:80px;text-align:center;vertical-align:middle;border:1px solid #e6e6e6;padding:2px}
+.lms-cal td.we{background:#FFFFD4}
+.lms-cal td.pad{background:#fff}
+</style>"""
+
+def _cell(date_text: str, leave_text: str, color: str) -> str:
+    if not date_text:
+        return '<td class="pad"></td>'
+    css = ' class="we"' if color != 'white' else ''
+    body = f"{date_text}<br>{leave_text}" if leave_text else date_text
+    return f"<td{css}>{body}</td>"
+
+def render_month(header, dates, leaves, colors) -> str:
+    """HTML table for the output of CalendarView.create_calendar_table"""
+    rows = "".join(
+        "<tr>" + "".join(_cell(*cell) for cell in zip(week_dates, week_leaves, week_colors)) + "</tr>"
+        for week_dates, week_leaves, week_colors in zip(dates, leaves, colors)
+    )
+    head = "".join(f"<th>{day}</th>" for day in header)
+    return f'<table class="lms-cal"><tr>{head}</tr>{rows}</table>'
+
+class MonthCache:
+    """Built months shared by every session of the process.
+
+    Keys carry the data version (see CalendarView.month_grid), so an entry
+    is never stale: a saved change moves the pages to a new key and the old
+    ones age out, least recently used first.
+    """
+
+    def __init__(self, max_entries: int = CALENDAR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], object]):
+        """Cached value of key, built outside the lock on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> dict:
+        """Hits and misses since the process started, and the entries held"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+MONTH_CACHE = MonthCache()
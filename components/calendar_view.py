@@ -4,35 +4,50 @@ import streamlit as st
 import pandas as pd
 import calendar
 from datetime import datetime, date, timedelta
-import plotly.graph_objects as go
 from utils.data_manager import DataManager
+from utils.profiling import timed, track
+from components.live_updates import watch_changes
 from collections import defaultdict
-from config import LEAVE_TYPE_COLORS
+from dataclasses import dataclass
+from html import escape
+from typing import Optional, Set
+from config import LEAVE_TYPE_COLORS, ICS_BASE_URL, CALENDAR_RENDERER
+
+@dataclass(frozen=True)
+class MonthGrid:
+    """A month as the calendar page shows it"""
+    daily_leaves: dict
+    table: tuple  # header, dates, leaves, colors
+    html: Optional[str] = None  # Only built for the HTML renderer
 
 class CalendarView:
     def __init__(self, data_manager: DataManager):
         self.data_manager = data_manager
 
-    def get_month_leaves(self, year: int, month: int):
-        """Get all leaves and holidays for the month"""
+    @timed()
+    def get_month_leaves(self, year: int, month: int, department: str = None):
+        """Get all leaves and holidays for the month, optionally for one department"""
         daily_leaves = defaultdict(list)
-        
+        first_day = date(year, month, 1)
+        last_day = date(year, month, calendar.monthrange(year, month)[1])
+
+        # Leaves and holidays come from one snapshot, so the month is consistent
+        snapshot = self.data_manager.snapshot([year])
+
         # Add approved leaves
-        for leave in self.data_manager.leave_requests:
-            if leave.status == "Approved":
-                current = leave.start_date
-                while current <= leave.end_date:
-                    if current.year == year and current.month == month:
-                        daily_leaves[current].append({
-                            'username': leave.username,
-                            'type': leave.leave_type,
-                            'start_date': leave.start_date,
-                            'end_date': leave.end_date
-                        })
-                    current += timedelta(days=1)
+        for leave in snapshot.approved_leaves(first_day, last_day, department):
+            current = max(leave.start_date, first_day)
+            while current <= min(leave.end_date, last_day):
+                daily_leaves[current].append({
+                    'username': leave.username,
+                    'type': leave.leave_type,
+                    'start_date': leave.start_date,
+                    'end_date': leave.end_date
+                })
+                current += timedelta(days=1)
 
         # Add holidays
-        for holiday in self.data_manager.holidays:
+        for holiday in snapshot.holidays:
             holiday_date = datetime.strptime(holiday['date'], '%Y-%m-%d').date()
             if holiday_date.year == year and holiday_date.month == month:
                 daily_leaves[holiday_date].append({
@@ -42,6 +57,7 @@ class CalendarView:
 
         return daily_leaves
 
+    @timed()
     def create_calendar_table(self, year: int, month: int, daily_leaves):
         """Create calendar table data"""
         # Get the calendar for the specified month
@@ -80,7 +96,7 @@ class CalendarView:
                         for leave in daily_leaves[current_date]:
                             if leave.get('type') == 'Holiday':
                                 color = LEAVE_TYPE_COLORS['Holiday']
-                                holiday_text = f"<span style='background-color: {color}; padding: 2px 4px; border-radius: 3px;'>🏖️ {leave['description']}</span>"
+                                holiday_text = f"<span style='background-color: {color}; padding: 2px 4px; border-radius: 3px;'>🏖️ {escape(leave['description'])}</span>"
                             else:
                                 leave_count[leave['type']] += 1
                         
@@ -103,12 +119,14 @@ class CalendarView:
             colors.append(week_colors)
         
         return header, dates, leaves, colors
+
+    @timed()
     def show_calendar(self):
         """Display the calendar view"""
         st.subheader("Leave Calendar")
 
-        # Date selection
-        col1, col2 = st.columns(2)
+        # Date and department selection
+        col1, col2, col3 = st.columns(3)
         with col1:
             selected_year = st.selectbox("Year", 
                                     range(date.today().year, date.today().year + 2),
@@ -118,12 +136,15 @@ class CalendarView:
                                         range(1, 13),
                                         index=date.today().month - 1,
                                         format_func=lambda x: calendar.month_name[x])
+        with col3:
+            department = st.selectbox("Department",
+                                      ["All Departments"] + self.data_manager.departments.departments(),
+                                      key="calendar_department")
+        if department == "All Departments":
+            department = None
 
-        # Get leave data
-        daily_leaves = self.get_month_leaves(selected_year, selected_month)
-
-        # Create calendar data
-        header, dates, leaves, colors = self.create_calendar_table(selected_year, selected_month, daily_leaves)
+        # Leave data and calendar table, rebuilt only when the data changes
+        grid = self.month_grid(selected_year, selected_month, department)
 
         # # Debug output
         # if st.checkbox("Show Debug Information"):
@@ -133,7 +154,103 @@ class CalendarView:
         #     st.write("Leaves:", leaves)
         #     st.write("Colors:", colors)
 
-        # Create calendar visualization
+        # Display calendar
+        self._show_grid(grid)
+
+        # Show legend
+        st.write("### Legend")
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("**Calendar Colors:**")
+            st.markdown("⬜ Weekdays")
+            st.markdown('<span style="background-color: #FFFFD4; padding: 2px 8px;">Weekends</span>', 
+                    unsafe_allow_html=True)
+            st.markdown("🏖️ Holidays")
+        
+        with col2:
+            st.markdown("**Leave Types:**")
+            for leave_type, color in LEAVE_TYPE_COLORS.items():
+                st.markdown(
+                    f'<span style="background-color: {color}; padding: 2px 8px; border-radius: 3px;">{leave_type}</span>',
+                    unsafe_allow_html=True
+                )
+
+        # Show month summary
+        self._show_month_summary(grid.daily_leaves)
+        self._show_subscription()
+
+        # Rerun when an approval or holiday touches the visible month
+        first_day = date(selected_year, selected_month, 1)
+        last_day = date(selected_year, selected_month, calendar.monthrange(selected_year, selected_month)[1])
+        members = self.data_manager.departments.members(department) if department else None
+        watch_changes(self.data_manager, "calendar",
+                      lambda change: CalendarView._affects_month(change, first_day, last_day, members))
+
+    def _show_subscription(self):
+        """Feed URLs for calendar apps, served by the API service"""
+        user = self.data_manager.get_user(st.session_state.get('username'))
+        if user is None:
+            return
+        from utils.auth import SessionSigner, load_session_secret
+        from utils.ics import feed_urls
+
+        token = SessionSigner(load_session_secret(self.data_manager.data_dir)).feed_token(user)
+        with st.expander("Subscribe in your calendar app"):
+            st.caption("Add these URLs as internet calendars. They keep working until you change "
+                       "your password; keep them private.")
+            labels = {'user': "My leave", 'department': "My department", 'org': "Everyone"}
+            for kind, url in feed_urls(ICS_BASE_URL, user, token).items():
+                st.text(labels[kind])
+                st.code(url, language=None)
+
+    @staticmethod
+    def _affects_month(change, first_day: date, last_day: date, members: Set[str] = None) -> bool:
+        """Whether a change can alter the calendar shown for [first_day, last_day] (for members only, if given)"""
+        if change.event in ('reset', 'holidays_added'):
+            return change.touches(first_day, last_day)
+        if "Approved" not in change.statuses or not change.touches(first_day, last_day):
+            return False
+        return members is None or bool(change.usernames & members)
+
+    def month_grid(self, year: int, month: int, department: str = None,
+                   renderer: str = CALENDAR_RENDERER) -> MonthGrid:
+        """The month for the calendar page, built once per data version.
+
+        Every saved change bumps the version of the manager's change feed,
+        so reruns of an unchanged page skip get_month_leaves,
+        create_calendar_table and the HTML rendering.
+        """
+        from components.calendar_html import MONTH_CACHE
+
+        key = (self.data_manager.changes.id, self.data_manager.version, year, month, department, renderer)
+        return MONTH_CACHE.get(key, lambda: self._build_month(year, month, department, renderer))
+
+    def _build_month(self, year: int, month: int, department: str, renderer: str) -> MonthGrid:
+        daily_leaves = self.get_month_leaves(year, month, department)
+        table = self.create_calendar_table(year, month, daily_leaves)
+        if renderer == 'plotly':
+            return MonthGrid(daily_leaves, table)
+        from components.calendar_html import render_month
+
+        with track('CalendarView.html'):
+            return MonthGrid(daily_leaves, table, render_month(*table))
+
+    def _show_grid(self, grid: MonthGrid):
+        """Draw the calendar grid as an HTML table or a Plotly table figure"""
+        if grid.html is None:
+            with track('CalendarView.figure'):
+                fig = self._build_figure(*grid.table)
+            st.plotly_chart(fig, use_container_width=True)
+            return
+        from components.calendar_html import CALENDAR_CSS
+
+        st.markdown(CALENDAR_CSS + grid.html, unsafe_allow_html=True)
+
+    def _build_figure(self, header, dates, leaves, colors):
+        """Build the Plotly table figure for the calendar grid"""
+        import plotly.graph_objects as go  # Deferred until a calendar is rendered
+
         fig = go.Figure()
 
         # Combine dates and leaves data
@@ -180,30 +297,7 @@ class CalendarView:
             showlegend=False
         )
 
-        # Display calendar
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Show legend
-        st.write("### Legend")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("**Calendar Colors:**")
-            st.markdown("⬜ Weekdays")
-            st.markdown('<span style="background-color: #FFFFD4; padding: 2px 8px;">Weekends</span>', 
-                    unsafe_allow_html=True)
-            st.markdown("🏖️ Holidays")
-        
-        with col2:
-            st.markdown("**Leave Types:**")
-            for leave_type, color in LEAVE_TYPE_COLORS.items():
-                st.markdown(
-                    f'<span style="background-color: {color}; padding: 2px 8px; border-radius: 3px;">{leave_type}</span>',
-                    unsafe_allow_html=True
-                )
-
-        # Show month summary
-        self._show_month_summary(daily_leaves)
+        return fig
 
     def _show_month_summary(self, daily_leaves):
         """Display month summary information"""
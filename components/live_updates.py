@@ -0,0 +1,36 @@
+# app/components/live_updates.py
+
+import streamlit as st
+from typing import Callable
+from utils.data_manager import DataManager
+from utils.changes import Change
+from config import CHANGE_POLL_INTERVAL
+
+def watch_changes(data_manager: DataManager, key: str, is_relevant: Callable[[Change], bool]):
+    """Rerun the page when a relevant change happens after it was rendered.
+
+    Call at the end of a page. A small fragment polls the change feed every
+    CHANGE_POLL_INTERVAL seconds; irrelevant changes cost only the poll.
+    is_relevant should not hold on to the page's DataManager, which may be
+    evicted while the page stays open.
+    """
+    st.session_state[f"seen_version_{key}"] = (data_manager.changes.id, data_manager.version)
+    _poll_changes(data_manager.tenant, key, is_relevant)
+
+@st.fragment(run_every=CHANGE_POLL_INTERVAL)
+def _poll_changes(tenant: str, key: str, is_relevant: Callable[[Change], bool]):
+    # Looked up on every poll: the tenant may have been evicted and reopened
+    data_manager = st.session_state['tenant_managers'].get(tenant)
+    # Saves of other processes, e.g. the API service, become changes here
+    data_manager.reload_if_changed()
+    state_key = f"seen_version_{key}"
+    feed, version = st.session_state.get(state_key, (data_manager.changes.id, data_manager.version))
+    if feed != data_manager.changes.id:
+        # Rendered from a manager that has been replaced since; its versions mean nothing here
+        st.rerun(scope="app")
+    changes = data_manager.changes_since(version)
+    if not changes:
+        return
+    st.session_state[state_key] = (feed, changes[-1].version)
+    if any(is_relevant(change) for change in changes):
+        st.rerun(scope="app")
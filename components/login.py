@@ -1,17 +1,100 @@
 # app/components/login.py
 
+import json
 import streamlit as st
-from utils.auth import verify_password
+from models.user import User
+from utils.auth import LoginBusyError, PasswordVerifier, session_signer
 from utils.data_manager import DataManager
+from utils.tenants import TenantRegistry
+from config import DEFAULT_TENANT
+from utils.profiling import timed
+from utils.metrics import LOGIN_ATTEMPTS
+
+SESSION_PARAM = "session"  # Where tokens used to be kept; dropped from old links
+SESSION_COOKIE = "lms_session"
+TENANT_PARAM = "org"
+
+@st.cache_resource
+def get_password_verifier() -> PasswordVerifier:
+    """One bounded verification pool per server process"""
+    return PasswordVerifier()
 
 class LoginComponent:
-    def __init__(self, data_manager: DataManager):
+    def __init__(self, data_manager: DataManager, tenants: TenantRegistry = None):
         self.data_manager = data_manager
+        self.tenants = tenants
+        self.signer = session_signer(data_manager.data_dir)
+
+    @property
+    def _cookie_name(self) -> str:
+        return f"{SESSION_COOKIE}_{self.data_manager.tenant}"
+
+    def _start_session(self, user: User):
+        """Log the user in and keep a signed token so reloads skip the password check"""
+        st.session_state['logged_in'] = True
+        st.session_state['username'] = user.username
+        st.session_state['is_admin'] = user.is_admin
+        st.session_state['tenant'] = self.data_manager.tenant
+        token = self.signer.issue(user)
+        st.session_state['session_token'] = token
+        # The token goes in a cookie, not the URL, so it stays out of
+        # history, Referer headers and shared links
+        st.session_state['session_cookie'] = token
+        if self.data_manager.tenant != DEFAULT_TENANT:
+            st.query_params[TENANT_PARAM] = self.data_manager.tenant
+
+    def restore_session(self) -> bool:
+        """Log in from a valid session cookie, if there is one"""
+        st.query_params.pop(SESSION_PARAM, None)
+        token = st.context.cookies.get(self._cookie_name)
+        # Cookies are read when the page loads, so a token ended since is still offered
+        if not token or token == st.session_state.get('ended_session_token'):
+            return False
+        user = self.signer.verify(token, self.data_manager.users)
+        if user is None:
+            st.session_state['ended_session_token'] = token
+            st.session_state['session_cookie'] = ""
+            return False
+        st.session_state['logged_in'] = True
+        st.session_state['username'] = user.username
+        st.session_state['is_admin'] = user.is_admin
+        st.session_state['tenant'] = self.data_manager.tenant
+        st.session_state['session_token'] = token
+        return True
+
+    def end_session(self):
+        """Revoke the session token, so a copied cookie stops working too"""
+        token = st.session_state.pop('session_token', None)
+        if token:
+            self.signer.revoke(token, self.data_manager.users)
+            st.session_state['ended_session_token'] = token
+        st.session_state['session_cookie'] = ""
 
+    def write_cookie(self):
+        """Set or clear the session cookie in the browser, once per change"""
+        token = st.session_state.pop('session_cookie', None)
+        if token is None:
+            return
+        import streamlit.components.v1 as components
+
+        max_age = self.signer.ttl if token else 0
+        cookie = json.dumps(f"{self._cookie_name}={token}; Max-Age={max_age}; Path=/; SameSite=Strict")
+        components.html("<script>parent.document.cookie = " + cookie
+                        + ' + (parent.location.protocol === "https:" ? "; Secure" : "");</script>', height=0)
+
+    @timed()
     def show_login(self):
         """Display login form and handle authentication"""
         st.title("Leave Management System")
-        
+
+        # The app loads the picked organization's data on the rerun this triggers
+        tenants = self.tenants.tenants() if self.tenants else []
+        if len(tenants) > 1:
+            ids = [tenant.id for tenant in tenants]
+            names = {tenant.id: tenant.name for tenant in tenants}
+            st.selectbox("Organization", ids, index=ids.index(self.data_manager.tenant),
+                         format_func=names.get, key="login_tenant")
+
         # Create login form
         with st.form("login_form"):
             username = st.text_input("Username")
@@ -21,16 +104,26 @@ class LoginComponent:
             if submit:
                 if username in self.data_manager.users:
                     user = self.data_manager.users[username]
-                    if verify_password(user.password, password):
+                    try:
+                        valid, upgraded_hash = get_password_verifier().verify(user.password, password)
+                    except LoginBusyError as e:
+                        LOGIN_ATTEMPTS.inc(result="busy")
+                        st.error(str(e))
+                        return
+
+                    if valid:
+                        LOGIN_ATTEMPTS.inc(result="success")
+                        if upgraded_hash:
+                            self.data_manager.update_user(username, {'password': upgraded_hash})
                         # Set session state
-                        st.session_state['logged_in'] = True
-                        st.session_state['username'] = username
-                        st.session_state['is_admin'] = user.is_admin
+                        self._start_session(self.data_manager.users[username])
                         st.success("Login successful!")
-                        st.experimental_rerun()
+                        st.rerun()
                     else:
+                        LOGIN_ATTEMPTS.inc(result="invalid_password")
                         st.error("Invalid password!")
                 else:
+                    LOGIN_ATTEMPTS.inc(result="unknown_user")
                     st.error("Username not found!")
 
         # Add some basic information about the system
@@ -41,4 +134,4 @@ class LoginComponent:
             - Track leave status
             - View leave calendar
             - Check leave balance
-            """)
\ No newline at end of file
+            """)
@@ -4,6 +4,8 @@ import streamlit as st
 from datetime import date, timedelta
 import pandas as pd
 from utils.data_manager import DataManager
+from utils.profiling import timed
+from utils.session_state import SessionNamespace
 from models.leave import LeaveRequest
 from config import LEAVE_TYPES
 
@@ -11,6 +13,7 @@ class UserComponent:
     def __init__(self, data_manager: DataManager):
         self.data_manager = data_manager
 
+    @timed()
     def show_leave_request_form(self):
         """Display leave request form"""
         st.subheader("Request Leave")
@@ -29,13 +32,14 @@ class UserComponent:
         min_date = today + timedelta(days=7)  # Minimum 7 days in advance
         max_date = today + timedelta(days=365)  # Maximum 1 year in advance
 
-        # Date selection outside the form
+        # Date selection outside the form; the chosen dates survive reruns
+        form_state = SessionNamespace(st.session_state, "leave_form")
         col1, col2 = st.columns(2)
 
         with col1:
             start_date = st.date_input(
                 "Start Date",
-                value=min_date if 'leave_start_date' not in st.session_state else st.session_state.leave_start_date,
+                value=max(min_date, form_state.get('start_date', lambda: min_date)),
                 min_value=min_date,
                 max_value=max_date,
                 key='start_date_input'  # Remove the on_change parameter
@@ -44,15 +48,15 @@ class UserComponent:
         with col2:
             end_date = st.date_input(
                 "End Date",
-                value=max(start_date, min_date if 'leave_end_date' not in st.session_state else st.session_state.leave_end_date),
+                value=max(start_date, form_state.get('end_date', lambda: min_date)),
                 min_value=start_date,
                 max_value=max_date,
                 key='end_date_input'  # Remove the on_change parameter
             )
 
         # Update session state
-        st.session_state.leave_start_date = start_date
-        st.session_state.leave_end_date = end_date
+        form_state.set('start_date', start_date)
+        form_state.set('end_date', end_date)
 
         # Calculate duration
         duration = (end_date - start_date).days + 1
@@ -107,8 +111,7 @@ class UserComponent:
                     st.write(f"End Date: {end_date}")
                     
                     # Reset form
-                    st.session_state.leave_start_date = min_date
-                    st.session_state.leave_end_date = min_date
+                    form_state.clear()
                     
                     # Add a refresh button
                     if st.button("Submit Another Request"):
@@ -123,14 +126,16 @@ class UserComponent:
         """Callback function to handle date changes"""
         st.rerun()
 
+    @timed()
     def show_my_leaves(self):
         """Display user's leave history"""
         st.subheader("My Leaves")
 
-        # Get user's leaves
+        # Get user's leaves from the loaded (current and upcoming) years
         leaves = self.data_manager.get_user_leaves(st.session_state['username'])
+        years = self.data_manager.partition_years()
 
-        if not leaves:
+        if not leaves and not years:
             st.info("No leave requests found.")
             return
 
@@ -146,6 +151,9 @@ class UserComponent:
                     duration = (leave.end_date - leave.start_date).days + 1
                     with st.expander(f"{leave.leave_type}: {leave.start_date} to {leave.end_date} ({duration} days)"):
                         st.write(f"**Status:** {leave.status}")
+                        if leave.status == "Pending":
+                            stage = self.data_manager.approvals.current_stage(leave)
+                            st.write(f"**Awaiting:** {stage} approval")
                         st.write(f"**Reason:** {leave.reason}")
                         if leave.admin_comment:
                             st.write(f"**Admin Comment:** {leave.admin_comment}")
@@ -153,7 +161,13 @@ class UserComponent:
                 st.info("No active leave requests.")
 
         with tab2:
-            if leaves:
+            # Older years are read from disk only when selected here, without loading them
+            year = st.selectbox("Year", options=sorted(years, reverse=True),
+                                index=sorted(years, reverse=True).index(date.today().year)
+                                if date.today().year in years else 0,
+                                key="leave_history_year")
+            history = self.data_manager.get_user_leaves(st.session_state['username'], years=[year])
+            if history:
                 leaves_df = pd.DataFrame([
                     {
                         'Start Date': leave.start_date,
@@ -164,7 +178,7 @@ class UserComponent:
                         'Reason': leave.reason,
                         'Comment': leave.admin_comment or ''
                     }
-                    for leave in leaves
+                    for leave in history
                 ])
                 
                 st.dataframe(
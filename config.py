@@ -19,18 +19,56 @@ PAGE_CONFIG = {
 # Base directory
 BASE_DIR = Path(__file__).parent.parent
 
-# Data directory
-DATA_DIR = BASE_DIR / "data"
-
-# Create data directory if it doesn't exist
-if not DATA_DIR.exists():
-    DATA_DIR.mkdir(parents=True)
+# Data directory (LMS_DATA_DIR points a run, e.g. a benchmark, somewhere else)
+DATA_DIR = Path(os.environ.get("LMS_DATA_DIR", BASE_DIR / "data"))
 
 # Data file paths
 USERS_FILE = DATA_DIR / "users.pkl"
 LEAVES_FILE = DATA_DIR / "leaves.pkl"
 HOLIDAYS_FILE = DATA_DIR / "holidays.pkl"
 
+# Leave requests are partitioned by the year they start in (leaves/<year>.pkl).
+# Only the hot years (current and next) plus years with pending requests are
+# loaded at startup; older partitions are loaded when a report asks for them.
+LEAVES_DIR = DATA_DIR / "leaves"
+HOT_LEAVE_YEARS = 2
+
+# Bookkeeping such as which year-end jobs have run
+META_FILE = DATA_DIR / "meta.pkl"
+
+# Held by a writer while it reloads, changes and saves, so the app and the
+# API server never save over each other's changes
+WRITE_LOCK_FILE = DATA_DIR / ".write.lock"
+
+# Compression of data files and backup chunks: "none", "zlib", "bz2" or
+# "lzma", at level 0-9. Files are decoded by their content, so the codec can
+# be changed at any time; existing files are recompressed as they are saved.
+STORAGE_CODEC = os.environ.get("LMS_STORAGE_CODEC", "none")
+STORAGE_LEVEL = int(os.environ.get("LMS_STORAGE_LEVEL", "6"))
+
+# Hosted organisations (tenants). The default tenant uses DATA_DIR itself;
+# others get their own shard under tenants/<id>. At most TENANT_CACHE_SIZE
+# tenants are kept in memory, least recently used first out.
+TENANTS_DIR = DATA_DIR / "tenants"
+TENANTS_FILE = DATA_DIR / "tenants.pkl"
+DEFAULT_TENANT = "default"
+DEFAULT_TENANT_NAME = os.environ.get("LMS_ORGANIZATION", "Main Organization")
+TENANT_CACHE_SIZE = int(os.environ.get("LMS_TENANT_CACHE_SIZE", "8"))
+
+# Deleted users are hidden at once and kept, restorable, as tombstones; a
+# background compaction purges them with their leave requests every
+# COMPACTION_INTERVAL seconds (0 disables it) once TOMBSTONE_MIN_AGE old
+COMPACTION_INTERVAL = int(os.environ.get("LMS_COMPACTION_INTERVAL", "3600"))
+TOMBSTONE_MIN_AGE = int(os.environ.get("LMS_TOMBSTONE_MIN_AGE", str(7 * 86400)))  # seconds
+
+# Append-only audit log of changes (who changed what, when)
+AUDIT_DIR = DATA_DIR / "audit"
+
+def ensure_data_dir(data_dir: Path = DATA_DIR) -> Path:
+    """Create the data directory if it doesn't exist"""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
 # Leave types
 LEAVE_TYPES = {
 'EL': 'Earned Leave',
@@ -47,6 +85,22 @@ DEFAULT_LEAVE_BALANCE = {
 'OH': 2
 }
 
+# Year-end policy per leave type:
+# - accrual: days credited for the new year
+# - carry_forward_cap: most unused days carried over (None = no cap); the rest lapses
+# - max_balance: ceiling on the balance after accrual (None = no ceiling)
+LEAVE_POLICIES = {
+'EL': {'accrual': 12, 'carry_forward_cap': 30, 'max_balance': 45},
+'CL': {'accrual': 12, 'carry_forward_cap': 0, 'max_balance': None},
+'SL': {'accrual': 12, 'carry_forward_cap': 24, 'max_balance': 36},
+'OH': {'accrual': 2, 'carry_forward_cap': 0, 'max_balance': None}
+}
+
+# Approval stages a leave request passes through, in order. "Manager" is the
+# requester's manager (skipped when they have none); other stages are shared
+# queues handled by admins.
+APPROVAL_CHAIN = ["Manager", "HR"]
+
 # Add these color configurations
 LEAVE_TYPE_COLORS = {
 'EL': '#FFE6E6',  # Light red
@@ -56,6 +110,11 @@ LEAVE_TYPE_COLORS = {
 'Holiday': '#FFF2E6'  # Light orange
 }
 
+# Calendar grid renderer: "html" (a plain HTML/CSS table, month fragments
+# memoized) or "plotly" (an interactive Plotly table figure)
+CALENDAR_RENDERER = os.environ.get("LMS_CALENDAR_RENDERER", "html")
+CALENDAR_CACHE_SIZE = 128  # Built calendar months kept per process
+
 # Add theme configuration
 STREAMLIT_THEME = {
 "theme": {
@@ -68,6 +127,68 @@ STREAMLIT_THEME = {
 }
 }
 
+# Performance instrumentation (can also be toggled from the admin Performance page)
+PROFILING_ENABLED = os.environ.get("LMS_PROFILING", "0") == "1"
+PROFILING_WINDOW = 500  # Recent samples kept per operation
+
+# Prometheus metrics: serve on a local port and/or write a textfile-collector file
+METRICS_PORT = int(os.environ.get("LMS_METRICS_PORT", "0"))  # 0 disables the endpoint
+METRICS_ADDR = os.environ.get("LMS_METRICS_ADDR", "127.0.0.1")
+METRICS_TEXTFILE = os.environ.get("LMS_METRICS_TEXTFILE", "")  # e.g. /var/lib/node_exporter/lms.prom
+METRICS_TEXTFILE_INTERVAL = 15  # seconds
+
+# Per-item UI state (e.g. a rejection being written) kept per session and
+# namespace; older items are dropped first
+SESSION_NAMESPACE_SIZE = 100
+
+# Change feed: recent changes kept for polling pages, and how often they poll
+CHANGE_FEED_SIZE = 1000
+CHANGE_POLL_INTERVAL = 10  # seconds
+
+# Email notifications: events are queued in the outbox and delivered by a
+# background worker. Leaving LMS_SMTP_HOST empty disables notifications.
+SMTP_HOST = os.environ.get("LMS_SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("LMS_SMTP_PORT", "25"))
+SMTP_USERNAME = os.environ.get("LMS_SMTP_USERNAME", "")
+SMTP_PASSWORD = os.environ.get("LMS_SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.environ.get("LMS_SMTP_STARTTLS", "0") == "1"
+MAIL_FROM = os.environ.get("LMS_MAIL_FROM", "leave-manager@localhost")
+OUTBOX_DIR = DATA_DIR / "outbox"
+OUTBOX_BATCH_SIZE = 50  # Messages sent per SMTP connection
+OUTBOX_POLL_INTERVAL = 5  # seconds
+OUTBOX_BATCH_WINDOW = 1.0  # seconds to collect messages after a wake before sending
+OUTBOX_MAX_ATTEMPTS = 6  # Then the message is moved to outbox/failed
+OUTBOX_RETRY_BASE = 30  # seconds, doubled after every failed attempt
+
+# Password hashing (scrypt). Raising N makes hashes slower to compute and to
+# crack; existing hashes are upgraded at the user's next login.
+PASSWORD_SCRYPT_N = int(os.environ.get("LMS_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+# Passwords from bulk imports are hashed at this low cost, so 50,000 users take
+# seconds instead of an hour; each is upgraded at the user's first login
+PASSWORD_IMPORT_SCRYPT_N = int(os.environ.get("LMS_IMPORT_SCRYPT_N", str(2 ** 4)))
+AUTH_WORKERS = 4  # Password verifications running at once
+AUTH_QUEUE_LIMIT = 64  # Logins waiting beyond this are asked to try again
+
+# Signed session tokens let reloads skip password verification
+SESSION_TTL = 12 * 3600  # seconds
+SESSION_SECRET = os.environ.get("LMS_SESSION_SECRET", "")  # Generated in the data directory if empty
+
+# JSON API service (python -m api.server)
+API_HOST = os.environ.get("LMS_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("LMS_API_PORT", "8502"))
+API_PAGE_SIZE = 50  # Default page size of list endpoints
+API_MAX_PAGE_SIZE = 500
+API_MAX_BODY = 4 * 1024 * 1024  # bytes; bulk requests must fit
+API_MAX_BULK = 5000  # Items per bulk request
+
+# iCalendar feeds of approved leaves and holidays, served by the API service
+ICS_BASE_URL = os.environ.get("LMS_ICS_BASE_URL", f"http://{API_HOST}:{API_PORT}")  # As seen by calendar apps
+ICS_PAST_DAYS = 90  # Feeds cover this many days back...
+ICS_FUTURE_DAYS = 365  # ...and this many days ahead
+ICS_MAX_AGE = 300  # seconds calendar apps may reuse a feed before asking again
+
 # Admin credentials
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin@123"  # In production, use environment variables
\ No newline at end of file
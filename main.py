@@ -1,13 +1,18 @@
 # app/main.py
 
 import streamlit as st
-from config import STREAMLIT_THEME, PAGE_CONFIG
+from config import (STREAMLIT_THEME, PAGE_CONFIG, METRICS_PORT, METRICS_ADDR,
+                    METRICS_TEXTFILE, METRICS_TEXTFILE_INTERVAL, SMTP_HOST, DEFAULT_TENANT)
 from utils.data_manager import DataManager
-from components.login import LoginComponent
-from components.calendar_view import CalendarView
-from components.user import UserComponent
-from components.admin import AdminComponent
+from utils.tenants import TenantManagers
 from utils.auth import create_admin_user
+from utils.audit import acting_as
+from utils.profiling import track
+from utils.session_state import clear_namespaces
+from utils import metrics
+
+# Components are imported on first use so that the login page does not pay
+# for pandas/plotly imports it never needs.
 
 # Set page configuration
 st.set_page_config(**PAGE_CONFIG)
@@ -46,35 +51,112 @@ def init_session_state():
     session_state_vars = {
         'logged_in': False,
         'username': None,
-        'is_admin': False
+        'is_admin': False,
+        'tenant': DEFAULT_TENANT
     }
 
     for var, default_value in session_state_vars.items():
         if var not in st.session_state:
             st.session_state[var] = default_value
 
+# Background workers by tenant, stopped when the tenant is closed
+_tenant_workers = {}
+
+def _open_tenant(data_manager: DataManager):
+    """Prepare a tenant's data the first time it is loaded into this process"""
+    # Create admin user if not exists
+    if 'admin' not in data_manager.users:
+        data_manager.add_user(create_admin_user())
+
+    workers = _tenant_workers.setdefault(data_manager.tenant, [])
+
+    # Queue email notifications and deliver them in the background
+    if SMTP_HOST:
+        from utils.notifications import start_notifications
+        workers.append(start_notifications(data_manager))
+
+    # Purge deleted users in the background
+    from utils.compaction import start_compaction
+    worker = start_compaction(data_manager)
+    if worker is not None:
+        workers.append(worker)
+
+def _close_tenant(data_manager: DataManager):
+    for worker in _tenant_workers.pop(data_manager.tenant, []):
+        worker.stop()
+
+@st.cache_resource
+def get_tenants() -> TenantManagers:
+    """Load each tenant's data once per server process instead of on every rerun"""
+    tenants = TenantManagers(on_open=_open_tenant, on_close=_close_tenant)
+
+    # Start metrics exporters once per process
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT, METRICS_ADDR)
+    if METRICS_TEXTFILE:
+        metrics.start_textfile_writer(METRICS_TEXTFILE, METRICS_TEXTFILE_INTERVAL)
+
+    return tenants
+
+def current_tenant(tenants: TenantManagers) -> str:
+    """The logged-in tenant, or the one picked on (or linked to) the login page"""
+    if st.session_state['logged_in']:
+        return st.session_state['tenant']
+    tenant = st.session_state.get('login_tenant') or st.query_params.get('org') or DEFAULT_TENANT
+    return tenant if tenants.registry.get(tenant) else DEFAULT_TENANT
+
 class LeaveManagementApp:
     def __init__(self):
         # Initialize session state
         init_session_state()
         
-        # Initialize data manager
-        self.data_manager = DataManager()
-        
-        # Create admin user if not exists
-        if 'admin' not in self.data_manager.users:
-            self.data_manager.add_user(create_admin_user())
-            self.data_manager.save_data()
+        # Each organization has its own data manager
+        self.tenants = get_tenants()
+        # Fragments rerun on their own and look their tenant up here
+        st.session_state['tenant_managers'] = self.tenants
+        self.data_manager = self.tenants.get(current_tenant(self.tenants))
 
-        # Initialize components
-        self.login_component = LoginComponent(self.data_manager)
-        self.calendar_view = CalendarView(self.data_manager)
-        self.user_component = UserComponent(self.data_manager)
-        self.admin_component = AdminComponent(self.data_manager)
+        # Components are created lazily by the properties below
+        self._components = {}
+
+    def _component(self, name: str):
+        """Import and instantiate a component the first time it is needed"""
+        if name not in self._components:
+            if name == 'login':
+                from components.login import LoginComponent as component_class
+            elif name == 'calendar':
+                from components.calendar_view import CalendarView as component_class
+            elif name == 'user':
+                from components.user import UserComponent as component_class
+            else:
+                from components.admin import AdminComponent as component_class
+            if name == 'login':
+                self._components[name] = component_class(self.data_manager, self.tenants.registry)
+            else:
+                self._components[name] = component_class(self.data_manager)
+        return self._components[name]
+
+    @property
+    def login_component(self):
+        return self._component('login')
+
+    @property
+    def calendar_view(self):
+        return self._component('calendar')
+
+    @property
+    def user_component(self):
+        return self._component('user')
+
+    @property
+    def admin_component(self):
+        return self._component('admin')
 
     def show_logout_button(self):
         """Display logout button in sidebar"""
         if st.sidebar.button("Logout"):
+            self.login_component.end_session()
+            clear_namespaces(st.session_state)
             st.session_state['logged_in'] = False
             st.session_state['username'] = None
             st.session_state['is_admin'] = False
@@ -83,16 +165,22 @@ class LeaveManagementApp:
     def run(self):
         """Run the main application"""
         try:
-            if not st.session_state['logged_in']:
-                self.login_component.show_login()
-            else:
-                self.show_logout_button()
-                
-                # Show different views based on user type
-                if st.session_state['is_admin']:
-                    self.show_admin_view()
+            with track('LeaveManagementApp.run'), acting_as(st.session_state['username']):
+                # Pick up changes saved by another process, e.g. the API service
+                self.data_manager.reload_if_changed()
+
+                # A signed session token in a cookie survives page reloads
+                if not st.session_state['logged_in'] and not self.login_component.restore_session():
+                    self.login_component.show_login()
                 else:
-                    self.show_user_view()
+                    self.show_logout_button()
+
+                    # Show different views based on user type
+                    if st.session_state['is_admin']:
+                        self.show_admin_view()
+                    else:
+                        self.show_user_view()
+                self.login_component.write_cookie()
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
             init_session_state()
@@ -104,28 +192,35 @@ class LeaveManagementApp:
 
         menu = st.sidebar.selectbox(
             "Menu",
-            ["Calendar", "Pending Requests", "Manage Users", "Reports", "Data Management"]
+            ["Calendar", "Pending Requests", "Search Requests", "Manage Users", "Reports",
+             "Data Management", "Performance"]
         )
 
         if menu == "Calendar":
             self.calendar_view.show_calendar()
         elif menu == "Pending Requests":
             self.admin_component.show_pending_requests()
+        elif menu == "Search Requests":
+            self.admin_component.show_search()
         elif menu == "Manage Users":
             self.admin_component.manage_users()
         elif menu == "Reports":
             self.admin_component.show_reports()
         elif menu == "Data Management":
             self.admin_component.show_data_management()
+        elif menu == "Performance":
+            self.admin_component.show_performance()
 
     def show_user_view(self):
         """Display user dashboard"""
         st.title(f"Welcome, {st.session_state['username']}")
         
-        menu = st.sidebar.selectbox(
-            "Menu",
-            ["Calendar", "Request Leave", "My Leaves"]
-        )
+        # Managers also approve their reports' requests
+        options = ["Calendar", "Request Leave", "My Leaves"]
+        if self.data_manager.approvals.is_manager(st.session_state['username']):
+            options.append("Team Approvals")
+
+        menu = st.sidebar.selectbox("Menu", options)
 
         if menu == "Calendar":
             self.calendar_view.show_calendar()
@@ -133,6 +228,8 @@ class LeaveManagementApp:
             self.user_component.show_leave_request_form()
         elif menu == "My Leaves":
             self.user_component.show_my_leaves()
+        elif menu == "Team Approvals":
+            self.admin_component.show_pending_requests()
 
 if __name__ == "__main__":
     app = LeaveManagementApp()
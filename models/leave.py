@@ -16,6 +16,11 @@ class LeaveRequest:
     admin_comment: str = ""
     request_date: datetime = None
     action_date: datetime = None
+    # Approval stage awaiting action (None: first stage of the chain), when it
+    # was entered, and the history as [{'stage', 'action', 'by', 'at', 'comment'}]
+    stage: Optional[str] = None
+    stage_since: datetime = None
+    transitions: list = None
 
     def __post_init__(self):
         if self.request_date is None:
@@ -10,6 +10,7 @@ class User:
     department: str
     leave_balance: Dict[str, int] = None
     is_admin: bool = False
+    manager: str = None  # Username of the approving manager
     
 
     def __post_init__(self):
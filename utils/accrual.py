@@ -0,0 +1,120 @@
+# app/utils/accrual.py
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from config import LEAVE_POLICIES
+
+@dataclass
+class LeavePolicy:
+    accrual: int
+    carry_forward_cap: Optional[int] = None
+    max_balance: Optional[int] = None
+
+def load_policies(config: Dict[str, dict] = LEAVE_POLICIES) -> Dict[str, LeavePolicy]:
+    """Build policies from the LEAVE_POLICIES configuration"""
+    return {leave_type: LeavePolicy(**settings) for leave_type, settings in config.items()}
+
+@dataclass
+class AccrualPreview:
+    """Balances before and after the year-end run, one row per user"""
+    year: int
+    usernames: List[str]
+    leave_types: List[str]
+    before: np.ndarray
+    carried: np.ndarray
+    lapsed: np.ndarray
+    after: np.ndarray
+
+    def rows(self, limit: int = None) -> List[dict]:
+        """Per-user rows suitable for a DataFrame"""
+        rows = []
+        for i, username in enumerate(self.usernames[:limit]):
+            row = {'Username': username}
+            for j, leave_type in enumerate(self.leave_types):
+                row[f"{leave_type} Before"] = int(self.before[i, j])
+                row[f"{leave_type} Lapsed"] = int(self.lapsed[i, j])
+                row[f"{leave_type} After"] = int(self.after[i, j])
+            rows.append(row)
+        return rows
+
+    def totals(self) -> List[dict]:
+        """Org-wide totals per leave type"""
+        return [{
+            'Leave Type': leave_type,
+            'Before': int(self.before[:, j].sum()),
+            'Carried': int(self.carried[:, j].sum()),
+            'Lapsed': int(self.lapsed[:, j].sum()),
+            'After': int(self.after[:, j].sum()),
+        } for j, leave_type in enumerate(self.leave_types)]
+
+class AccrualEngine:
+    """Apply year-end carry-forward, lapse and accrual to every balance at once"""
+
+    def __init__(self, data_manager, policies: Dict[str, LeavePolicy] = None):
+        self.data_manager = data_manager
+        self.policies = policies or load_policies()
+
+    def has_run(self, year: int) -> bool:
+        """Whether the year-end run for this year was already applied"""
+        return year in self.data_manager.meta.get('accrual_runs', {})
+
+    def preview(self, year: int) -> AccrualPreview:
+        """Compute the new balances without changing anything (dry run)"""
+        leave_types = list(self.policies)
+        users = [user for user in self.data_manager.users.values() if not user.is_admin]
+        before = np.array(
+            [[user.leave_balance.get(leave_type, 0) for leave_type in leave_types] for user in users],
+            dtype=np.int64
+        ).reshape(len(users), len(leave_types))
+
+        no_limit = np.iinfo(np.int64).max
+        accrual = np.array([self.policies[t].accrual for t in leave_types], dtype=np.int64)
+        caps = np.array([no_limit if self.policies[t].carry_forward_cap is None
+                         else self.policies[t].carry_forward_cap for t in leave_types], dtype=np.int64)
+        ceilings = np.array([no_limit if self.policies[t].max_balance is None
+                             else self.policies[t].max_balance for t in leave_types], dtype=np.int64)
+
+        # Negative balances (overdrawn leave) carry over in full
+        carried = np.minimum(before, caps)
+        lapsed = before - carried
+        after = np.minimum(carried + accrual, ceilings)
+
+        return AccrualPreview(
+            year=year,
+            usernames=[user.username for user in users],
+            leave_types=leave_types,
+            before=before,
+            carried=carried,
+            lapsed=lapsed,
+            after=after,
+        )
+
+    def apply(self, year: int) -> AccrualPreview:
+        """Apply the year-end run for a year in a single save.
+
+        Raises ValueError if the run for that year was already applied.
+        """
+        # Checked before the transaction, so a repeated run does not roll back and reload
+        self.data_manager.reload_if_changed()
+        if self.has_run(year):
+            raise ValueError(f"Year-end accrual for {year} has already been applied")
+        with self.data_manager.transaction():
+            if self.has_run(year):  # Applied by another process meanwhile
+                raise ValueError(f"Year-end accrual for {year} has already been applied")
+
+            preview = self.preview(year)
+            for i, username in enumerate(preview.usernames):
+                balance = dict(self.data_manager.users[username].leave_balance)
+                balance.update(zip(preview.leave_types, preview.after[i].tolist()))
+                self.data_manager.update_user(username, {'leave_balance': balance})
+
+            self.data_manager.meta.setdefault('accrual_runs', {})[year] = {
+                'applied_at': datetime.now(),
+                'users': len(preview.usernames),
+                'totals': preview.totals(),
+            }
+            self.data_manager.record_audit('accrual_applied', year=year, users=len(preview.usernames))
+            self.data_manager.save_data()
+        return preview
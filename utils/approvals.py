@@ -0,0 +1,240 @@
+# app/utils/approvals.py
+
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from models.leave import LeaveRequest
+from config import APPROVAL_CHAIN
+
+MANAGER_STAGE = "Manager"
+
+class ApprovalQueues:
+    """Pending leave requests grouped by the approver who must act next.
+
+    Each queue is an insertion-ordered dict of leave id to request, keyed by
+    the manager's username for the Manager stage and by the stage name for
+    shared stages (handled by admins). Moving a request between stages is a
+    delete and an insert, and the first entry of a queue is its oldest.
+    Queues are kept in sync through DataManager change events.
+    """
+
+    def __init__(self, data_manager, chain: List[str] = None):
+        self.data_manager = data_manager
+        self.chain = list(chain or APPROVAL_CHAIN)
+        self._lock = threading.RLock()
+        self._queues: Dict[str, Dict[str, LeaveRequest]] = defaultdict(dict)
+        self._queue_of: Dict[str, str] = {}
+        self._reports: Dict[str, Set[str]] = defaultdict(set)
+        self._manager_of: Dict[str, str] = {}
+        self._unsorted: Set[str] = set()  # Queues that got a request older than their tail
+        self._rebuild()
+        data_manager.add_listener(self._on_change)
+
+    def _rebuild(self):
+        with self._lock:
+            self._queues = defaultdict(dict)
+            self._queue_of = {}
+            self._reports = defaultdict(set)
+            self._manager_of = {}
+            self._unsorted = set()
+            for user in self.data_manager.users.values():
+                self._set_manager(user.username, user.manager)
+            # Oldest first, so the head of each queue is its oldest request
+            pending = [leave for leave in self.data_manager.visible_leaves() if leave.status == "Pending"]
+            for leave in sorted(pending, key=self.waiting_since):
+                self._place(leave)
+
+    def _set_manager(self, username: str, manager: Optional[str]):
+        old = self._manager_of.pop(username, None)
+        if old is not None:
+            self._reports[old].discard(username)
+            if not self._reports[old]:
+                del self._reports[old]
+        if manager:
+            self._manager_of[username] = manager
+            self._reports[manager].add(username)
+
+    def _unplace(self, leave_id: str):
+        key = self._queue_of.pop(leave_id, None)
+        if key is not None:
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.pop(leave_id, None)
+                if not queue:
+                    del self._queues[key]
+
+    def _place(self, leave: LeaveRequest):
+        """Move a request to the queue of its current approver"""
+        key = self.queue_key(leave)
+        if key is not None and self._queue_of.get(leave.id) == key:
+            # Same approver, same wait: keep its place
+            self._queues[key][leave.id] = leave
+            return
+        self._unplace(leave.id)
+        if key is not None:
+            queue = self._queues[key]
+            if queue and self.waiting_since(next(reversed(queue.values()))) > self.waiting_since(leave):
+                self._unsorted.add(key)
+            queue[leave.id] = leave
+            self._queue_of[leave.id] = key
+
+    def _resort(self):
+        """Put queues that got an older request back in oldest-first order"""
+        for key in self._unsorted:
+            queue = self._queues.get(key)
+            if queue:
+                self._queues[key] = dict(sorted(queue.items(), key=lambda item: self.waiting_since(item[1])))
+        self._unsorted.clear()
+
+    def _replace_reports(self, usernames):
+        for username in list(usernames):
+            for leave in self.data_manager.leave_index.leaves(username):
+                self._place(leave)
+
+    def _on_change(self, event: str, payload):
+        with self._lock:
+            if event == 'reset':
+                self._rebuild()
+            elif event in ('leave_added', 'leave_updated'):
+                self._place(payload)
+            elif event in ('leaves_loaded', 'leaves_restored'):
+                for leave in payload:
+                    self._place(leave)
+            elif event in ('leaves_removed', 'leaves_unloaded'):
+                for leave in payload:
+                    self._unplace(leave.id)
+            elif event in ('user_added', 'user_updated'):
+                if self._manager_of.get(payload.username) != payload.manager:
+                    self._set_manager(payload.username, payload.manager)
+                    self._replace_reports([payload.username])
+                if event == 'user_added':
+                    # Reports may name a manager before the account exists
+                    self._replace_reports(self.reports(payload.username))
+            elif event == 'user_deleted':
+                self._set_manager(payload.username, None)
+                # Requests waiting on the deleted manager skip the Manager stage
+                self._replace_reports(self.reports(payload.username))
+            self._resort()
+
+    def stages_for(self, username: str) -> List[str]:
+        """Approval stages for a requester; Manager is skipped without a valid manager"""
+        manager = self._manager_of.get(username)
+        has_manager = manager in self.data_manager.users and manager != username
+        return [stage for stage in self.chain if stage != MANAGER_STAGE or has_manager]
+
+    def current_stage(self, leave: LeaveRequest) -> Optional[str]:
+        if leave.status != "Pending":
+            return None
+        stages = self.stages_for(leave.username)
+        if leave.stage in stages:
+            return leave.stage
+        return stages[0] if stages else None
+
+    def queue_key(self, leave: LeaveRequest) -> Optional[str]:
+        stage = self.current_stage(leave)
+        if stage == MANAGER_STAGE:
+            return self._manager_of.get(leave.username)
+        return stage
+
+    def waiting_since(self, leave: LeaveRequest) -> datetime:
+        return leave.stage_since or leave.request_date
+
+    def queue_keys_for(self, username: str, is_admin: bool) -> List[str]:
+        """Queues an approver acts on: their reports, plus shared stages for admins"""
+        keys = [username] if username in self._reports else []
+        if is_admin:
+            keys.extend(stage for stage in self.chain if stage != MANAGER_STAGE)
+        return keys
+
+    def is_pending(self, leave_id: str) -> bool:
+        """Whether a request is waiting in any queue"""
+        return leave_id in self._queue_of
+
+    def is_manager(self, username: str) -> bool:
+        return bool(self._reports.get(username))
+
+    def reports(self, username: str) -> Set[str]:
+        return set(self._reports.get(username, ()))
+
+    def queue(self, key: str, department: str = None) -> List[LeaveRequest]:
+        """Requests waiting in one queue, oldest first"""
+        with self._lock:
+            leaves = list(self._queues.get(key, {}).values())
+        if department:
+            department_of = self.data_manager.departments.department_of
+            leaves = [leave for leave in leaves if department_of(leave.username) == department]
+        return leaves
+
+    def can_act(self, leave: LeaveRequest, username: str, is_admin: bool) -> bool:
+        return self.queue_key(leave) in self.queue_keys_for(username, is_admin)
+
+    def stats(self) -> Dict[str, dict]:
+        """Depth and oldest wait per stage, from the head of each queue"""
+        now = datetime.now()
+        stats = {stage: {'pending': 0, 'oldest_seconds': 0.0} for stage in self.chain}
+        with self._lock:
+            for key, queue in self._queues.items():
+                if not queue:
+                    continue
+                stage = key if key in stats else MANAGER_STAGE
+                oldest = next(iter(queue.values()))
+                stats[stage]['pending'] += len(queue)
+                stats[stage]['oldest_seconds'] = max(
+                    stats[stage]['oldest_seconds'], (now - self.waiting_since(oldest)).total_seconds())
+        return stats
+
+    def _record(self, leave: LeaveRequest, stage: str, action: str, actor: str, comment: str, at: datetime):
+        leave.transitions = (leave.transitions or []) + [
+            {'stage': stage, 'action': action, 'by': actor, 'at': at, 'comment': comment}
+        ]
+
+    def approve(self, leave_id: str, actor: str, comment: str = "") -> Optional[str]:
+        """Approve a request at its current stage.
+
+        Returns "Pending" if it moved on to the next stage, "Approved" once the
+        last stage approved it (the leave balance is deducted then), or None if
+        the request is not pending.
+        """
+        with self.data_manager.transaction():
+            leave = self.data_manager._find_leave(leave_id)
+            stage = self.current_stage(leave) if leave else None
+            if stage is None:
+                return None
+
+            now = datetime.now()
+            self._record(leave, stage, "Approved", actor, comment, now)
+            stages = self.stages_for(leave.username)
+            next_stages = stages[stages.index(stage) + 1:]
+            if next_stages:
+                leave.stage = next_stages[0]
+                leave.stage_since = now
+                self.data_manager.record_audit('leave_stage_approved', leave.username, leave_id=leave_id,
+                                               stage=stage, next_stage=leave.stage, comment=comment)
+                self.data_manager._notify('leave_updated', leave)
+                self.data_manager.save_data()
+                return "Pending"
+
+            user = self.data_manager.users[leave.username]
+            balance = dict(user.leave_balance)
+            balance[leave.leave_type] = balance.get(leave.leave_type, 0) - (
+                (leave.end_date - leave.start_date).days + 1)
+            self.data_manager.update_user(leave.username, {'leave_balance': balance})
+            leave.stage = None
+            leave.stage_since = now
+            self.data_manager.update_leave_request(leave_id, "Approved", comment)
+            return "Approved"
+
+    def reject(self, leave_id: str, actor: str, comment: str) -> bool:
+        """Reject a request at its current stage"""
+        with self.data_manager.transaction():
+            leave = self.data_manager._find_leave(leave_id)
+            stage = self.current_stage(leave) if leave else None
+            if stage is None:
+                return False
+
+            now = datetime.now()
+            self._record(leave, stage, "Rejected", actor, comment, now)
+            leave.stage = None
+            leave.stage_since = now
+            return self.data_manager.update_leave_request(leave_id, "Rejected", comment)
@@ -0,0 +1,253 @@
+# app/utils/audit.py
+
+import json
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single writer
+    fcntl = None
+
+SYSTEM_ACTOR = "system"
+
+AUDIT_ACTIONS = (
+    'user_added', 'user_updated', 'user_deleted', 'leave_submitted', 'leave_stage_approved',
+    'leave_status_changed', 'holidays_added', 'accrual_applied', 'backup_restored', 'data_purged',
+    'user_restored', 'users_compacted',
+)
+
+# Who is making changes in the current session thread or API request
+_current_actor: ContextVar[str] = ContextVar('audit_actor', default=SYSTEM_ACTOR)
+
+# Log record: payload length, then timestamp, actor, target and action name
+# ids, then the details as compact JSON
+RECORD_HEADER = struct.Struct('<I')
+RECORD_FIELDS = struct.Struct('<dIII')
+# Index entry per record: timestamp, log offset, actor, target, action
+INDEX_ENTRY = struct.Struct('<dQIII')
+INDEX_DTYPE = [('ts', '<f8'), ('offset', '<u8'), ('actor', '<u4'), ('target', '<u4'), ('action', '<u4')]
+
+def current_actor() -> str:
+    return _current_actor.get()
+
+@contextmanager
+def acting_as(username: Optional[str]):
+    """Attribute changes made inside the block to username"""
+    token = _current_actor.set(username or SYSTEM_ACTOR)
+    try:
+        yield
+    finally:
+        _current_actor.reset(token)
+
+@dataclass
+class AuditEvent:
+    action: str
+    target: str  # Username the change is about, "" for organisation-wide changes
+    details: Dict = field(default_factory=dict)
+    actor: str = field(default_factory=current_actor)
+    timestamp: datetime = field(default_factory=datetime.now)
+
+class AuditLog:
+    """Append-only log of changes in compact binary records.
+
+    events.log holds the records and is only ever appended to. index.bin
+    has one fixed-size entry per record (time, offset, actor, target,
+    action) and names.jsonl interns the strings those ids refer to, so a
+    query is a binary search on time plus a vectorized filter over the
+    index, reading only the matching records. Timestamps never go
+    backwards, which keeps the index sorted by time. Appends take a file
+    lock, so the app and the API service can share one log.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log_file = self.directory / "events.log"
+        self.index_file = self.directory / "index.bin"
+        self.names_file = self.directory / "names.jsonl"
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._names_size = 0  # Bytes of names.jsonl read so far
+        with self._locked():
+            self._recover()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(self.directory / "lock", 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh_names(self):
+        """Read names interned since the last call, possibly by another process"""
+        size = self.names_file.stat().st_size if self.names_file.exists() else 0
+        if size <= self._names_size:
+            return
+        with open(self.names_file, 'rb') as names:
+            names.seek(self._names_size)
+            data = names.read(size - self._names_size)
+        complete = data[:data.rfind(b'\n') + 1]
+        for line in complete.decode('utf-8').splitlines():
+            name = json.loads(line)
+            self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        self._names_size += len(complete)
+
+    def _recover(self):
+        """Bring names and index in line with the log after a crash"""
+        self._refresh_names()
+        if self.names_file.exists() and self.names_file.stat().st_size > self._names_size:
+            # A torn last name; no record refers to it yet
+            with open(self.names_file, 'rb+') as names:
+                names.truncate(self._names_size)
+
+        log_size = self.log_file.stat().st_size if self.log_file.exists() else 0
+        index_size = self.index_file.stat().st_size if self.index_file.exists() else 0
+        entries = index_size // INDEX_ENTRY.size
+        offset = 0
+        with open(self.index_file, 'ab+') as index:
+            index.truncate(entries * INDEX_ENTRY.size)
+            # Drop index entries whose record did not make it to the log
+            while entries:
+                index.seek((entries - 1) * INDEX_ENTRY.size)
+                offset = INDEX_ENTRY.unpack(index.read(INDEX_ENTRY.size))[1]
+                if offset < log_size:
+                    offset = self._record_end(offset)
+                    break
+                offset = 0
+                entries -= 1
+                index.truncate(entries * INDEX_ENTRY.size)
+            # Index records that were logged but not indexed, and cut a torn tail
+            if offset < log_size:
+                with open(self.log_file, 'rb+') as log:
+                    log.seek(offset)
+                    while offset < log_size:
+                        header = log.read(RECORD_HEADER.size)
+                        if len(header) < RECORD_HEADER.size:
+                            break
+                        (length,) = RECORD_HEADER.unpack(header)
+                        payload = log.read(length)
+                        if len(payload) < length:
+                            break
+                        ts, actor, target, action = RECORD_FIELDS.unpack_from(payload)
+                        index.write(INDEX_ENTRY.pack(ts, offset, actor, target, action))
+                        offset += RECORD_HEADER.size + length
+                    log.truncate(offset)
+
+    def _record_end(self, offset: int) -> int:
+        with open(self.log_file, 'rb') as log:
+            log.seek(offset)
+            (length,) = RECORD_HEADER.unpack(log.read(RECORD_HEADER.size))
+        return offset + RECORD_HEADER.size + length
+
+    def _last_timestamp(self) -> float:
+        size = self.index_file.stat().st_size if self.index_file.exists() else 0
+        if size < INDEX_ENTRY.size:
+            return 0.0
+        with open(self.index_file, 'rb') as index:
+            index.seek(size - INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(index.read(INDEX_ENTRY.size))[0]
+
+    def _name_id(self, name: str, new_names: List[str]) -> int:
+        if name not in self._name_ids:
+            self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            new_names.append(name)
+        return self._name_ids[name]
+
+    def append(self, events: List[AuditEvent]):
+        """Append events with one write (and fsync) per file"""
+        if not events:
+            return
+        with self._locked():
+            self._refresh_names()
+            last_ts = self._last_timestamp()
+            new_names, records, entries = [], [], []
+            offset = self.log_file.stat().st_size if self.log_file.exists() else 0
+            for event in events:
+                ts = last_ts = max(event.timestamp.timestamp(), last_ts)
+                ids = (self._name_id(event.actor, new_names), self._name_id(event.target, new_names),
+                       self._name_id(event.action, new_names))
+                payload = RECORD_FIELDS.pack(ts, *ids) + json.dumps(
+                    event.details, separators=(',', ':'), default=str).encode()
+                records.append(RECORD_HEADER.pack(len(payload)) + payload)
+                entries.append(INDEX_ENTRY.pack(ts, offset, *ids))
+                offset += RECORD_HEADER.size + len(payload)
+
+            # Names first, then records, then the index that points at them
+            if new_names:
+                data = ''.join(json.dumps(name) + '\n' for name in new_names).encode('utf-8')
+                self._write(self.names_file, data)
+                self._names_size += len(data)
+            self._write(self.log_file, b''.join(records))
+            self._write(self.index_file, b''.join(entries))
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        with open(path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __len__(self) -> int:
+        return self.index_file.stat().st_size // INDEX_ENTRY.size if self.index_file.exists() else 0
+
+    def names(self) -> List[str]:
+        with self._locked():
+            self._refresh_names()
+            return list(self._names)
+
+    def query(self, actor: str = None, target: str = None, action: str = None,
+              start: datetime = None, end: datetime = None, limit: int = 500) -> List[AuditEvent]:
+        """Events matching every given filter within [start, end), newest first"""
+        import numpy as np  # Imported lazily, only needed for queries
+
+        with self._locked():
+            self._refresh_names()
+            ids = {}
+            for column, name in (('actor', actor), ('target', target), ('action', action)):
+                if name is not None:
+                    if name not in self._name_ids:
+                        return []
+                    ids[column] = self._name_ids[name]
+            if not len(self):
+                return []
+            index = np.memmap(self.index_file, dtype=np.dtype(INDEX_DTYPE), mode='r',
+                              shape=(len(self),))
+
+        timestamps = index['ts']
+        first = int(np.searchsorted(timestamps, start.timestamp(), 'left')) if start else 0
+        last = int(np.searchsorted(timestamps, end.timestamp(), 'left')) if end else len(index)
+        window = index[first:last]
+        mask = np.ones(len(window), dtype=bool)
+        for column, name_id in ids.items():
+            mask &= window[column] == name_id
+        offsets = window['offset'][mask][::-1][:limit]
+        return self._read(int(offset) for offset in offsets)
+
+    def _read(self, offsets) -> List[AuditEvent]:
+        events = []
+        with open(self.log_file, 'rb') as log:
+            for offset in offsets:
+                log.seek(offset)
+                (length,) = RECORD_HEADER.unpack(log.read(RECORD_HEADER.size))
+                payload = log.read(length)
+                ts, actor, target, action = RECORD_FIELDS.unpack_from(payload)
+                events.append(AuditEvent(
+                    action=self._names[action], target=self._names[target],
+                    details=json.loads(payload[RECORD_FIELDS.size:]),
+                    actor=self._names[actor], timestamp=datetime.fromtimestamp(ts)))
+        return events
@@ -1,11 +1,62 @@
 # app/utils/auth.py
 
+import base64
 import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
 from models.user import User
-from config import ADMIN_USERNAME, ADMIN_PASSWORD
+from config import (ADMIN_USERNAME, ADMIN_PASSWORD, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R,
+                    PASSWORD_SCRYPT_P, AUTH_WORKERS, AUTH_QUEUE_LIMIT, SESSION_TTL, SESSION_SECRET)
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single writer
+    fcntl = None
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+# The revocation list is rewritten without its expired entries once it has this many
+REVOKED_COMPACT_AT = 1000
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=HASH_BYTES)
+
+def hash_password(password: str, n: int = PASSWORD_SCRYPT_N, r: int = PASSWORD_SCRYPT_R,
+                  p: int = PASSWORD_SCRYPT_P) -> str:
+    """Hash password with scrypt and a random salt.
+
+    Stored as 'scrypt$n$r$p$salt$hash' so the cost can be raised later.
+    """
+    salt = os.urandom(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(_scrypt(password, salt, n, r, p))}"
+
+def is_password_hash(value: str) -> bool:
+    """Whether value is a hash made by hash_password, e.g. exported from another system"""
+    parts = value.split("$")
+    if len(parts) != 6 or parts[0] != "scrypt":
+        return False
+    try:
+        n, r, p = (int(part) for part in parts[1:4])
+        return n > 1 and n & (n - 1) == 0 and r > 0 and p > 0 and len(_b64decode(parts[5])) == HASH_BYTES
+    except ValueError:
+        return False
+
+def _legacy_hash(password: str) -> str:
+    # Unsalted SHA-256 used before scrypt; still accepted until the next login upgrades it
     return hashlib.sha256(password.encode()).hexdigest()
 
 def create_admin_user() -> User:
@@ -20,4 +71,209 @@ def create_admin_user() -> User:
 
 def verify_password(stored_password: str, provided_password: str) -> bool:
     """Verify if provided password matches stored password"""
-    return stored_password == hash_password(provided_password)
\ No newline at end of file
+    if stored_password.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, expected = stored_password.split("$")
+            computed = _scrypt(provided_password, _b64decode(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(computed, _b64decode(expected))
+    return hmac.compare_digest(stored_password, _legacy_hash(provided_password))
+
+def needs_rehash(stored_password: str) -> bool:
+    """Whether a hash is legacy or uses other scrypt parameters than configured"""
+    return not stored_password.startswith(
+        f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$")
+
+class LoginBusyError(Exception):
+    """Too many logins are waiting for password verification"""
+
+class PasswordVerifier:
+    """Verify passwords on a bounded thread pool.
+
+    scrypt is memory- and CPU-hard, so at most `workers` verifications run at
+    once and at most `queue_limit` wait; further logins are refused with
+    LoginBusyError instead of piling up. hashlib releases the GIL while
+    hashing, so waiting script threads stay responsive.
+    """
+
+    def __init__(self, workers: int = AUTH_WORKERS, queue_limit: int = AUTH_QUEUE_LIMIT):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def _check(self, stored_password: str, provided_password: str) -> Tuple[bool, Optional[str]]:
+        if not verify_password(stored_password, provided_password):
+            return False, None
+        # Upgrade legacy or outdated hashes while the plain password is at hand
+        return True, hash_password(provided_password) if needs_rehash(stored_password) else None
+
+    def submit(self, stored_password: str, provided_password: str) -> Future:
+        """Start a verification; the future yields (valid, upgraded hash or None)"""
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusyError("Too many login attempts in progress, please try again")
+        future = self._pool.submit(self._check, stored_password, provided_password)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def verify(self, stored_password: str, provided_password: str,
+               timeout: float = None) -> Tuple[bool, Optional[str]]:
+        return self.submit(stored_password, provided_password).result(timeout)
+
+def load_session_secret(data_dir: Path) -> bytes:
+    """SESSION_SECRET, or a random key kept in data_dir/session.key"""
+    if SESSION_SECRET:
+        return SESSION_SECRET.encode()
+    path = Path(data_dir) / "session.key"
+    if not path.exists():
+        # Written aside and linked into place, so no process reads a partial key
+        tmp_path = path.with_name(f".session.key.{secrets.token_hex(4)}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secrets.token_bytes(32))
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass  # Another process (the app or the API) created it first
+        finally:
+            os.unlink(tmp_path)
+    return path.read_bytes()
+
+class RevokedSessions:
+    """Sessions ended before they expire, shared by every process on a data directory.
+
+    Kept in a text file of 'session_id expiry' lines that is appended to on
+    logout and re-read when it changes, so checking a token costs a stat.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, int] = {}
+        self._stamp = None
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(self.path.with_name(self.path.name + ".lock"), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._revoked, self._stamp = {}, None
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        revoked = {}
+        for line in self.path.read_text().splitlines():
+            session_id, _, expires = line.partition(" ")
+            if expires.isdigit():
+                revoked[session_id] = int(expires)
+        self._revoked, self._stamp = revoked, stamp
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return session_id in self._revoked
+
+    def add(self, session_id: str, expires: int):
+        with self._locked():
+            with open(self.path, 'a') as f:
+                f.write(f"{session_id} {expires}\n")
+            self._refresh()
+            now = time.time()
+            if sum(1 for until in self._revoked.values() if until < now) >= REVOKED_COMPACT_AT:
+                tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+                tmp_path.write_text("".join(f"{sid} {until}\n" for sid, until in self._revoked.items()
+                                            if until >= now))
+                os.replace(tmp_path, self.path)
+                self._refresh()
+
+class SessionSigner:
+    """HMAC-signed session tokens: 'username.expiry.session_id.signature'.
+
+    The signature also covers the user's password hash, so changing the
+    password invalidates existing tokens. Checking a token is one HMAC,
+    not a password verification, plus a lookup in the revoked sessions
+    when there is a revocation list.
+    """
+
+    def __init__(self, secret: bytes, ttl: int = SESSION_TTL, revoked: RevokedSessions = None):
+        self.secret = secret
+        self.ttl = ttl
+        self.revoked = revoked
+
+    def _signature(self, username: str, expires: int, session_id: str, password_hash: str) -> str:
+        message = f"{username}\n{expires}\n{session_id}\n{password_hash}".encode()
+        return _b64encode(hmac.new(self.secret, message, hashlib.sha256).digest())
+
+    def issue(self, user: User) -> str:
+        expires = int(time.time()) + self.ttl
+        session_id = secrets.token_urlsafe(12)
+        username = _b64encode(user.username.encode())
+        return (f"{username}.{expires}.{session_id}."
+                f"{self._signature(user.username, expires, session_id, user.password)}")
+
+    def _parse(self, token: str, users: dict) -> Optional[Tuple[User, int, str]]:
+        try:
+            username, expires, session_id, signature = token.split(".")
+            username, expires = _b64decode(username).decode(), int(expires)
+        except (ValueError, UnicodeDecodeError):
+            return None
+        user = users.get(username)
+        if user is None or expires < time.time():
+            return None
+        if not hmac.compare_digest(signature, self._signature(username, expires, session_id, user.password)):
+            return None
+        return user, expires, session_id
+
+    def verify(self, token: str, users: dict) -> Optional[User]:
+        """The user a valid, unexpired and not revoked token belongs to, else None"""
+        parsed = self._parse(token, users)
+        if parsed is None or (self.revoked is not None and parsed[2] in self.revoked):
+            return None
+        return parsed[0]
+
+    def revoke(self, token: str, users: dict) -> bool:
+        """End a session before it expires, e.g. at logout"""
+        parsed = self._parse(token, users)
+        if parsed is None or self.revoked is None:
+            return False
+        self.revoked.add(parsed[2], parsed[1])
+        return True
+
+    def _feed_signature(self, username: str, password_hash: str) -> str:
+        message = f"feed\n{username}\n{password_hash}".encode()
+        return _b64encode(hmac.new(self.secret, message, hashlib.sha256).digest())
+
+    def feed_token(self, user: User) -> str:
+        """Token for calendar subscriptions: 'username.signature'.
+
+        It does not expire, since calendar apps cannot log in again, but
+        changing the password revokes it like a session token.
+        """
+        username = _b64encode(user.username.encode())
+        return f"{username}.{self._feed_signature(user.username, user.password)}"
+
+    def verify_feed_token(self, token: str, users: dict) -> Optional[User]:
+        """The user a valid feed token belongs to, else None"""
+        try:
+            username, signature = token.split(".")
+            username = _b64decode(username).decode()
+        except (ValueError, UnicodeDecodeError):
+            return None
+        user = users.get(username)
+        if user is None or not hmac.compare_digest(signature, self._feed_signature(username, user.password)):
+            return None
+        return user
+
+def session_signer(data_dir: Path) -> SessionSigner:
+    """Signer for the sessions of a data directory, with its shared revocation list"""
+    return SessionSigner(load_session_secret(data_dir), revoked=RevokedSessions(Path(data_dir) / "sessions.revoked"))
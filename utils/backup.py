@@ -0,0 +1,227 @@
+# app/utils/backup.py
+
+import hashlib
+import json
+import lzma
+import os
+import pickle
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.storage import compress, decompress
+
+# Fixed protocol so identical records produce identical chunks across Python versions
+PICKLE_PROTOCOL = 4
+
+# A chunk ends after a record whose key hash has these low bits clear, giving
+# chunks of ~256 records on average. Boundaries depend only on the records
+# themselves, so adding or editing a record changes only the chunk it is in.
+CHUNK_MASK = 0xFF
+MAX_CHUNK_RECORDS = 4096
+
+@dataclass
+class BackupInfo:
+    id: str
+    created: str
+    records: Dict[str, int] = field(default_factory=dict)
+    total_bytes: int = 0
+    new_bytes: int = 0
+
+def _chunk_records(records: list, key: Callable) -> List[list]:
+    """Split records into content-defined chunks"""
+    chunks, current = [], []
+    for record in records:
+        current.append(record)
+        boundary = (zlib.crc32(str(key(record)).encode()) & CHUNK_MASK) == 0
+        if boundary or len(current) >= MAX_CHUNK_RECORDS:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _kind(name: str) -> str:
+    """Dataset a part belongs to: "leaves/2021" is part of "leaves"."""
+    return name.partition('/')[0]
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class BackupStore:
+    """Incremental backups stored as content-addressed, deduplicated chunks.
+
+    Each backup is a JSON manifest listing the SHA-256 of the chunks making
+    up every dataset. Chunks are shared between backups, so a new backup
+    only writes the chunks that changed since any earlier one. Chunk files
+    are compressed with the storage codec; the hash is of the pickled
+    chunk, so deduplication holds across codec changes.
+    """
+
+    def __init__(self, backup_dir: Path, codec: str = None, level: int = None):
+        self.backup_dir = Path(backup_dir)
+        self.codec = codec
+        self.level = level
+        self.chunks_dir = self.backup_dir / 'chunks'
+        self.manifests_dir = self.backup_dir / 'manifests'
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunks_dir / digest[:2] / digest
+
+    def _manifest_path(self, backup_id: str) -> Path:
+        return self.manifests_dir / f"{backup_id}.json"
+
+    def create(self, datasets: Dict[str, list], keys: Dict[str, Callable],
+               sources: Dict[str, Tuple[list, Callable[[], list]]] = None) -> BackupInfo:
+        """Back up datasets ({name: records}) using keys ({name: record -> key}).
+
+        sources ({name: (stamp, read)}) are datasets stored in files, named
+        "<kind>/<part>" and keyed like <kind>. When a source's stamp is the
+        one the latest backup recorded, its chunks are reused without
+        calling read(), so unchanged files cost nothing to back up.
+        """
+        now = datetime.now()
+        backup_id = now.strftime('%Y%m%d_%H%M%S_%f')
+        manifest = {'id': backup_id, 'created': now.isoformat(), 'datasets': {}, 'stamps': {}}
+        total_bytes = new_bytes = 0
+        previous = self._latest_manifest() if sources else None
+        reused = {}
+
+        for name, (stamp, read) in (sources or {}).items():
+            manifest['stamps'][name] = stamp
+            entries = self._reusable_entries(previous, name, stamp)
+            if entries is None:
+                datasets = {**datasets, name: read()}
+            else:
+                reused[name] = entries
+                total_bytes += sum(entry['size'] for entry in entries)
+
+        for name, records in datasets.items():
+            entries = []
+            for chunk in _chunk_records(records, keys[_kind(name)]):
+                data = pickle.dumps(chunk, protocol=PICKLE_PROTOCOL)
+                digest = hashlib.sha256(data).hexdigest()
+                path = self._chunk_path(digest)
+                if path.exists():
+                    size = path.stat().st_size
+                else:
+                    stored = compress(data, self.codec, self.level)
+                    _write_atomic(path, stored)
+                    size = len(stored)
+                    new_bytes += size
+                total_bytes += size
+                entries.append({'hash': digest, 'size': size, 'records': len(chunk)})
+            manifest['datasets'][name] = entries
+        manifest['datasets'].update(reused)
+
+        manifest['total_bytes'] = total_bytes
+        manifest['new_bytes'] = new_bytes
+        # The manifest is written last, so a crash never leaves a partial backup listed
+        _write_atomic(self._manifest_path(backup_id), json.dumps(manifest).encode())
+        return self._info(manifest)
+
+    def _latest_manifest(self) -> Optional[dict]:
+        if not self.manifests_dir.exists():
+            return None
+        latest = max(self.manifests_dir.glob('*.json'), default=None)
+        return self._load_manifest(latest.stem) if latest else None
+
+    def _reusable_entries(self, previous: Optional[dict], name: str, stamp: list) -> Optional[list]:
+        """Chunks of a source in the previous backup, if the source is unchanged and they still exist"""
+        if previous is None or previous.get('stamps', {}).get(name) != stamp:
+            return None
+        entries = previous['datasets'].get(name)
+        if entries is None or not all(self._chunk_path(entry['hash']).exists() for entry in entries):
+            return None
+        return entries
+
+    def _info(self, manifest: dict) -> BackupInfo:
+        records = {}
+        for name, entries in manifest['datasets'].items():
+            records[_kind(name)] = records.get(_kind(name), 0) + sum(entry['records'] for entry in entries)
+        return BackupInfo(
+            id=manifest['id'],
+            created=manifest['created'],
+            records=records,
+            total_bytes=manifest['total_bytes'],
+            new_bytes=manifest['new_bytes'],
+        )
+
+    def _load_manifest(self, backup_id: str) -> dict:
+        with open(self._manifest_path(backup_id)) as f:
+            return json.load(f)
+
+    def list_backups(self) -> List[BackupInfo]:
+        """All backups, newest first"""
+        if not self.manifests_dir.exists():
+            return []
+        manifests = sorted(self.manifests_dir.glob('*.json'), reverse=True)
+        return [self._info(self._load_manifest(path.stem)) for path in manifests]
+
+    def find_backup(self, at: datetime) -> Optional[BackupInfo]:
+        """Latest backup taken at or before the given time"""
+        for info in self.list_backups():
+            if datetime.fromisoformat(info.created) <= at:
+                return info
+        return None
+
+    def verify(self, backup_id: str) -> List[str]:
+        """Check every chunk of a backup; returns a list of problems"""
+        problems = []
+        for name, entries in self._load_manifest(backup_id)['datasets'].items():
+            for entry in entries:
+                path = self._chunk_path(entry['hash'])
+                if not path.exists():
+                    problems.append(f"{name}: missing chunk {entry['hash'][:12]}")
+                elif self._read_chunk(path, entry['hash']) is None:
+                    problems.append(f"{name}: corrupt chunk {entry['hash'][:12]}")
+        return problems
+
+    @staticmethod
+    def _read_chunk(path: Path, digest: str) -> Optional[bytes]:
+        """The pickled chunk, or None if it does not match its hash"""
+        try:
+            data = decompress(path.read_bytes())
+        except (OSError, ValueError, EOFError, zlib.error, lzma.LZMAError):
+            return None
+        return data if hashlib.sha256(data).hexdigest() == digest else None
+
+    def restore(self, backup_id: str) -> Dict[str, list]:
+        """Return the datasets of a backup after verifying their checksums"""
+        datasets = {}
+        for name, entries in self._load_manifest(backup_id)['datasets'].items():
+            records = []
+            for entry in entries:
+                data = self._read_chunk(self._chunk_path(entry['hash']), entry['hash'])
+                if data is None:
+                    raise ValueError(f"Checksum mismatch in {name} chunk {entry['hash'][:12]}")
+                records.extend(pickle.loads(data))
+            datasets.setdefault(_kind(name), []).extend(records)
+        return datasets
+
+    def prune(self, keep: int) -> int:
+        """Keep the newest backups and delete chunks no longer referenced.
+
+        Returns the number of bytes freed.
+        """
+        backups = self.list_backups()
+        for info in backups[keep:]:
+            self._manifest_path(info.id).unlink()
+
+        referenced = set()
+        for info in backups[:keep]:
+            for entries in self._load_manifest(info.id)['datasets'].values():
+                referenced.update(entry['hash'] for entry in entries)
+
+        freed = 0
+        if self.chunks_dir.exists():
+            for path in self.chunks_dir.glob('*/*'):
+                if path.name not in referenced:
+                    freed += path.stat().st_size
+                    path.unlink()
+        return freed
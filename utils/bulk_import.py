@@ -0,0 +1,273 @@
+# app/utils/bulk_import.py
+
+import csv
+import functools
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List
+from config import LEAVE_TYPES, DEFAULT_LEAVE_BALANCE, PASSWORD_IMPORT_SCRYPT_N
+from models.user import User
+from models.leave import LeaveRequest
+from utils.auth import hash_password, is_password_hash
+
+IMPORT_KINDS = ('users', 'balances', 'holidays', 'leaves')
+LEAVE_STATUSES = ('Pending', 'Approved', 'Rejected')
+BATCH_SIZE = 1000
+HASH_WORKERS = 4
+
+REQUIRED_COLUMNS = {
+    'users': ['username', 'password', 'email'],
+    'balances': ['username'],
+    'holidays': ['date', 'description'],
+    'leaves': ['username', 'start_date', 'end_date', 'leave_type'],
+}
+
+@dataclass
+class RowError:
+    row: int
+    column: str
+    message: str
+
+@dataclass
+class ImportResult:
+    kind: str
+    total_rows: int = 0
+    imported: int = 0
+    errors: List[RowError] = field(default_factory=list)
+    committed: bool = False
+
+    def error_report_csv(self) -> str:
+        """Return the per-row error report as CSV text"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['row', 'column', 'message'])
+        for error in self.errors:
+            writer.writerow([error.row, error.column, error.message])
+        return buffer.getvalue()
+
+def _cell(value) -> str:
+    """Normalize a CSV/XLSX cell to a stripped string"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def iter_csv_rows(file) -> Iterator[Dict[str, str]]:
+    """Stream rows from a CSV file object (binary or text)"""
+    if not isinstance(file, io.TextIOBase):
+        file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield {(key or '').strip().lower(): _cell(value) for key, value in row.items()}
+
+def iter_xlsx_rows(file) -> Iterator[Dict[str, str]]:
+    """Stream rows from the first sheet of an XLSX workbook"""
+    from openpyxl import load_workbook  # Imported lazily, only needed for XLSX
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_cell(name).lower() for name in next(rows, ())]
+        for values in rows:
+            yield {name: _cell(value) for name, value in zip(header, values) if name}
+    finally:
+        workbook.close()
+
+def iter_rows(file, filename: str) -> Iterator[Dict[str, str]]:
+    """Stream rows from a CSV or XLSX file based on its extension"""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return iter_xlsx_rows(file)
+    return iter_csv_rows(file)
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in ('1', 'true', 'yes', 'y')
+
+class BulkImporter:
+    """Validate and import users, balances, holidays and leaves in one save"""
+
+    def __init__(self, data_manager, batch_size: int = BATCH_SIZE,
+                 hash_workers: int = HASH_WORKERS):
+        self.data_manager = data_manager
+        self.batch_size = batch_size
+        self.hash_workers = hash_workers
+
+    def run(self, rows: Iterable[Dict[str, str]], kind: str,
+            atomic: bool = False) -> ImportResult:
+        """Import rows of the given kind.
+
+        Valid rows are committed in a single transaction. With atomic=True,
+        nothing is committed if any row fails validation.
+        """
+        if kind not in IMPORT_KINDS:
+            raise ValueError(f"Unknown import kind: {kind}")
+
+        result = ImportResult(kind=kind)
+        validate = getattr(self, f"_validate_{kind}")
+        staged = []
+        seen = self._existing_keys(kind)
+        batch = []
+
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as pool:
+            for row_number, row in enumerate(rows, start=2):  # Row 1 is the header
+                result.total_rows += 1
+                batch.append((row_number, row))
+                if len(batch) >= self.batch_size:
+                    staged.extend(self._process_batch(batch, kind, validate, seen, result, pool))
+                    batch = []
+            if batch:
+                staged.extend(self._process_batch(batch, kind, validate, seen, result, pool))
+
+        if atomic and result.errors:
+            return result
+
+        with self.data_manager.transaction():
+            getattr(self, f"_commit_{kind}")(staged)
+            self.data_manager.save_data()
+        result.imported = len(staged)
+        result.committed = True
+        return result
+
+    def _existing_keys(self, kind: str) -> set:
+        """Keys already present in the data, used to reject duplicates"""
+        if kind == 'holidays':
+            return {holiday['date'] for holiday in self.data_manager.holidays}
+        return set()
+
+    def _process_batch(self, batch, kind, validate, seen, result, pool) -> list:
+        """Validate a batch of rows and hash any passwords in the worker pool.
+
+        Passwords are hashed at PASSWORD_IMPORT_SCRYPT_N, which logins upgrade
+        to the full cost; values that already are scrypt hashes are kept.
+        """
+        valid = []
+        for row_number, row in batch:
+            missing = [column for column in REQUIRED_COLUMNS[kind] if not row.get(column)]
+            if missing:
+                for column in missing:
+                    result.errors.append(RowError(row_number, column, "Required value is missing"))
+                continue
+            try:
+                record = validate(row, seen)
+            except ValueError as e:
+                column, _, message = str(e).partition(': ')
+                result.errors.append(RowError(row_number, column, message))
+                continue
+            valid.append(record)
+
+        plain = [user for user in valid if kind == 'users' and not is_password_hash(user.password)]
+        if plain:
+            hashes = pool.map(functools.partial(hash_password, n=PASSWORD_IMPORT_SCRYPT_N),
+                              [user.password for user in plain])
+            for user, hashed in zip(plain, hashes):
+                user.password = hashed
+        return valid
+
+    def _parse_balance(self, row: Dict[str, str], base: Dict[str, int]) -> Dict[str, int]:
+        balance = dict(base)
+        for leave_type in DEFAULT_LEAVE_BALANCE:
+            value = row.get(leave_type.lower(), '')
+            if value:
+                try:
+                    days = int(value)
+                except ValueError:
+                    raise ValueError(f"{leave_type.lower()}: Balance must be a whole number")
+                if days < 0:
+                    raise ValueError(f"{leave_type.lower()}: Balance cannot be negative")
+                balance[leave_type] = days
+        return balance
+
+    def _validate_users(self, row: Dict[str, str], seen: set) -> User:
+        username = row['username']
+        if username in seen or username in self.data_manager.users:
+            raise ValueError(f"username: User '{username}' already exists")
+        if username in self.data_manager.tombstones:
+            raise ValueError(f"username: '{username}' belongs to a deleted user; restore or compact it first")
+        if '@' not in row['email']:
+            raise ValueError("email: Invalid email address")
+        is_admin = _parse_bool(row.get('is_admin', ''))
+        balance = None if is_admin else self._parse_balance(row, DEFAULT_LEAVE_BALANCE)
+        seen.add(username)
+        return User(
+            username=username,
+            password=row['password'],  # Hashed in the worker pool unless already a hash
+            email=row['email'],
+            department=row.get('department', ''),
+            leave_balance=balance,
+            is_admin=is_admin,
+            manager=row.get('manager') or None
+        )
+
+    def _validate_balances(self, row: Dict[str, str], seen: set):
+        username = row['username']
+        user = self.data_manager.users.get(username)
+        if user is None:
+            raise ValueError(f"username: User '{username}' not found")
+        if user.is_admin:
+            raise ValueError(f"username: Admin '{username}' has no leave balance")
+        if username in seen:
+            raise ValueError(f"username: Duplicate row for '{username}'")
+        seen.add(username)
+        return username, self._parse_balance(row, user.leave_balance)
+
+    def _validate_holidays(self, row: Dict[str, str], seen: set) -> dict:
+        try:
+            holiday_date = _parse_date(row['date'])
+        except ValueError:
+            raise ValueError("date: Date must be in YYYY-MM-DD format")
+        key = holiday_date.isoformat()
+        if key in seen:
+            raise ValueError(f"date: Holiday on {key} already exists")
+        seen.add(key)
+        return {'date': key, 'description': row['description']}
+
+    def _validate_leaves(self, row: Dict[str, str], seen: set) -> LeaveRequest:
+        if row['username'] not in self.data_manager.users:
+            raise ValueError(f"username: User '{row['username']}' not found")
+        try:
+            start_date = _parse_date(row['start_date'])
+            end_date = _parse_date(row['end_date'])
+        except ValueError:
+            raise ValueError("start_date: Dates must be in YYYY-MM-DD format")
+        if end_date < start_date:
+            raise ValueError("end_date: End date is before start date")
+        if row['leave_type'] not in LEAVE_TYPES:
+            raise ValueError(f"leave_type: Unknown leave type '{row['leave_type']}'")
+        status = row.get('status') or 'Approved'
+        if status not in LEAVE_STATUSES:
+            raise ValueError(f"status: Unknown status '{status}'")
+        return LeaveRequest(
+            id="",  # Will be set by data manager
+            username=row['username'],
+            start_date=start_date,
+            end_date=end_date,
+            leave_type=row['leave_type'],
+            reason=row.get('reason', ''),
+            status=status,
+            admin_comment=row.get('admin_comment', ''),
+            action_date=None if status == 'Pending' else datetime.now()
+        )
+
+    def _commit_users(self, users: List[User]):
+        for user in users:
+            self.data_manager.add_user(user)
+
+    def _commit_balances(self, balances):
+        for username, balance in balances:
+            self.data_manager.update_user(username, {'leave_balance': balance})
+
+    def _commit_holidays(self, holidays: List[dict]):
+        self.data_manager.add_holidays(holidays)
+
+    def _commit_leaves(self, leaves: List[LeaveRequest]):
+        for leave in leaves:
+            self.data_manager.add_leave_request(leave)
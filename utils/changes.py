@@ -0,0 +1,79 @@
+# app/utils/changes.py
+
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import FrozenSet, List, Optional
+
+# Events that only move data in or out of memory; they do not change the data
+CACHE_EVENTS = frozenset({'leaves_loaded', 'leaves_unloaded'})
+
+@dataclass(frozen=True)
+class Change:
+    """What one change event touched, small enough to keep many of them"""
+    version: int
+    event: str
+    usernames: FrozenSet[str] = frozenset()
+    statuses: FrozenSet[str] = frozenset()
+    # Date span of the leaves or holidays involved
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    @classmethod
+    def from_event(cls, version: int, event: str, payload) -> 'Change':
+        if event in ('leave_added', 'leave_updated'):
+            payload = [payload]
+        if event in ('leave_added', 'leave_updated', 'leaves_removed', 'leaves_restored'):
+            if not payload:
+                return cls(version, event)
+            return cls(version, event,
+                       usernames=frozenset(leave.username for leave in payload),
+                       statuses=frozenset(leave.status for leave in payload),
+                       start=min(leave.start_date for leave in payload),
+                       end=max(leave.end_date for leave in payload))
+        if event == 'holidays_added':
+            dates = [datetime.strptime(holiday['date'], '%Y-%m-%d').date() for holiday in payload]
+            return cls(version, event, start=min(dates, default=None), end=max(dates, default=None))
+        if event in ('user_added', 'user_updated', 'user_deleted'):
+            return cls(version, event, usernames=frozenset([payload.username]))
+        return cls(version, event)
+
+    def touches(self, start: date, end: date) -> bool:
+        """Whether the change involves any day in [start, end]; resets touch everything"""
+        if self.event == 'reset':
+            return True
+        return self.start is not None and self.start <= end and self.end >= start
+
+class ChangeFeed:
+    """Monotonically increasing data version and the most recent changes.
+
+    Readers remember the version they rendered and ask for what changed
+    since then. If they fall further behind than the feed keeps, they get a
+    single 'reset' change and should refresh everything.
+    """
+
+    def __init__(self, size: int):
+        self._lock = threading.Lock()
+        self._changes = deque(maxlen=size)
+        self.version = 0
+        # Versions of different feeds (e.g. of a tenant closed and reopened) do not compare
+        self.id = uuid.uuid4().hex
+
+    def record(self, event: str, payload=None) -> int:
+        if event in CACHE_EVENTS:
+            return self.version
+        with self._lock:
+            self.version += 1
+            self._changes.append(Change.from_event(self.version, event, payload))
+            return self.version
+
+    def since(self, version: int) -> List[Change]:
+        """Changes after version, oldest first"""
+        with self._lock:
+            if version >= self.version:
+                return []
+            if not self._changes or self._changes[0].version > version + 1:
+                return [Change(self.version, 'reset')]
+            return [change for change in self._changes if change.version > version]
@@ -0,0 +1,49 @@
+# app/utils/compaction.py
+
+import threading
+from datetime import timedelta
+from typing import Optional
+from config import COMPACTION_INTERVAL, TOMBSTONE_MIN_AGE
+
+class CompactionWorker:
+    """Purge deleted users in the background, many at a time.
+
+    Every interval seconds the data is reloaded if another process saved
+    it, then tombstones older than min_age are compacted in one pass.
+    """
+
+    def __init__(self, data_manager, interval: float = COMPACTION_INTERVAL,
+                 min_age: float = TOMBSTONE_MIN_AGE):
+        self.data_manager = data_manager
+        self.interval = interval
+        self.min_age = timedelta(seconds=min_age)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self._run, name="compaction", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.data_manager.reload_if_changed()
+                purged = self.data_manager.compact(self.min_age)
+                if purged:
+                    print(f"Compaction purged {len(purged)} deleted users")
+            except Exception as e:
+                print(f"Error compacting data: {e}")
+
+def start_compaction(data_manager, interval: float = COMPACTION_INTERVAL) -> Optional[CompactionWorker]:
+    """Start background compaction, unless the interval is 0"""
+    if not interval:
+        return None
+    worker = CompactionWorker(data_manager, interval)
+    worker.start()
+    return worker
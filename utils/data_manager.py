@@ -1,24 +1,326 @@
 # app/utils/data_manager.py
 
-import pickle
-from typing import List, Dict
+import functools
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import uuid
-from datetime import datetime
-from config import USERS_FILE, LEAVES_FILE, HOLIDAYS_FILE
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from config import (DATA_DIR, USERS_FILE, LEAVES_FILE, HOLIDAYS_FILE, LEAVES_DIR,
+                    META_FILE, WRITE_LOCK_FILE, HOT_LEAVE_YEARS, CHANGE_FEED_SIZE, AUDIT_DIR, DEFAULT_TENANT,
+                    ensure_data_dir)
 from models.user import User
 from models.leave import LeaveRequest
+from utils.profiling import profiler, timed
+from utils.backup import BackupStore, BackupInfo
+from utils.storage import read_pickle, write_pickle
+from utils.changes import Change, ChangeFeed
+from utils.audit import AuditEvent, AuditLog
+from utils.snapshots import Snapshot, SnapshotStore
+from utils.search import LeaveSearchIndex
+from utils.directory import UserDirectory
+from utils.departments import DepartmentRegistry
+from utils.leave_index import UserLeaveIndex
+from utils.approvals import ApprovalQueues
+try:
+    import fcntl
+except ImportError:  # Windows: writers are serialized within a process only
+    fcntl = None
+from utils.metrics import (SAVE_DURATION, LOAD_DURATION, DATA_FILE_BYTES, RECORDS, PENDING_REQUESTS,
+                           APPROVAL_QUEUE_DEPTH, APPROVAL_QUEUE_AGE)
+
+# Record identity per dataset, used to place backup chunk boundaries
+BACKUP_KEYS = {
+    'users': lambda user: user.username,
+    'leaves': lambda leave: leave.id,
+    'holidays': lambda holiday: holiday['date'],
+    'meta': lambda meta: 'meta',
+}
+
+class _DirectoryLock:
+    """Write lock of one data directory, shared by its DataManagers in this process.
+
+    An instance closed and reopened (tenants are evicted and opened again)
+    still writes under the same lock as its successor. The outermost holder
+    also takes a file lock, which serializes writers across processes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    @contextmanager
+    def held(self):
+        """Yields True to the outermost holder"""
+        with self.thread_lock:
+            outermost = self._depth == 0
+            if outermost:
+                self._file = open(self.path, 'a')
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield outermost
+            finally:
+                self._depth -= 1
+                if outermost:
+                    if fcntl is not None:
+                        fcntl.flock(self._file, fcntl.LOCK_UN)
+                    self._file.close()
+                    self._file = None
+
+_directory_locks: Dict[Path, _DirectoryLock] = {}
+_directory_locks_guard = threading.Lock()
+
+def _directory_lock(data_dir: Path) -> _DirectoryLock:
+    key = data_dir.resolve()
+    with _directory_locks_guard:
+        if key not in _directory_locks:
+            _directory_locks[key] = _DirectoryLock(key / WRITE_LOCK_FILE.name)
+        return _directory_locks[key]
+
+def _writer(method):
+    """Hold the data directory for the whole change, so writers never interleave"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._exclusive():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class DataManager:
-    def __init__(self):
+    def __init__(self, data_dir: Path = None, tenant: str = DEFAULT_TENANT):
+        # Data files live in config.DATA_DIR unless another directory is given
+        self.data_dir = Path(data_dir) if data_dir else DATA_DIR
+        self.tenant = tenant
+        self.users_file = self.data_dir / USERS_FILE.name
+        self.leaves_file = self.data_dir / LEAVES_FILE.name
+        self.holidays_file = self.data_dir / HOLIDAYS_FILE.name
+        self.leaves_dir = self.data_dir / LEAVES_DIR.name
+        self.meta_file = self.data_dir / META_FILE.name
+        self.backups = BackupStore(self.data_dir / 'backups')
+        self.audit = AuditLog(self.data_dir / AUDIT_DIR.name)
+
         self.users: Dict[str, User] = {}
+        # Leave requests of every loaded year partition
         self.leave_requests: List[LeaveRequest] = []
+        self.loaded_years: Set[int] = set()
         self.holidays: List[dict] = []
+        # Bookkeeping for batch jobs, e.g. {'accrual_runs': {2024: {...}}}
+        self.meta: dict = {}
+        # {year: {'records': n, 'pending': n}} for every partition on disk
+        self._partition_index: Dict[int, dict] = {}
+        # Callbacks notified of changes, see add_listener()
+        self._listeners: List[Callable[[str, object], None]] = []
+        # Callbacks told when changes are saved or discarded, see add_commit_listener()
+        self._commit_listeners: List[Callable[[bool], None]] = []
+        # Data version and recent changes, see changes_since()
+        self.changes = ChangeFeed(CHANGE_FEED_SIZE)
+        # A single instance is shared by all sessions, so saves are serialized;
+        # the lock belongs to the data directory, see _exclusive()
+        self._directory_lock = _directory_lock(self.data_dir)
+        self._lock = self._directory_lock.thread_lock
+        self._batch_depth = 0
+        self._save_pending = False
+        # Audit events of changes not saved yet; written once the save succeeds
+        self._audit_pending: List[AuditEvent] = []
+        # Identity of the data files as last loaded or saved by this process
+        self._disk_stamp = None
+        # Year partitions changed since the last save (None: all of them)
+        self._dirty_years: Set[int] = None
+        # Read-only views for readers that must not block writers, see snapshot()
+        self.snapshots = SnapshotStore(self)
+        ensure_data_dir(self.data_dir)
+        self.leaves_dir.mkdir(exist_ok=True)
         self.load_data()
+        # Process-wide gauges describe the default tenant
+        if tenant == DEFAULT_TENANT:
+            self._register_metrics()
+        self.leave_index = UserLeaveIndex(self)
+        self.search_index = LeaveSearchIndex(self)
+        self.user_directory = UserDirectory(self)
+        self.departments = DepartmentRegistry(self)
+        self.approvals = ApprovalQueues(self)
+
+    def add_listener(self, callback: Callable[[str, object], None]):
+        """Register callback(event, payload) to keep derived indexes in sync.
+
+        Events: 'user_added', 'user_updated', 'user_deleted' (User),
+        'leave_added', 'leave_updated' (LeaveRequest), 'leaves_removed',
+        'leaves_restored' (list of LeaveRequest; hidden by a user's deletion,
+        shown again when it is undone), 'holidays_added' (list of holiday dicts),
+        'leaves_loaded', 'leaves_unloaded' (list of
+        LeaveRequest) when year partitions move in or out of memory, and
+        'reset' (None) when data is replaced wholesale by a load, restore or
+        purge.
+        """
+        self._listeners.append(callback)
+
+    def add_commit_listener(self, callback: Callable[[bool], None]):
+        """Register callback(committed) for side effects that must wait for the save.
+
+        Called with True once changes have been saved, and with False when a
+        transaction fails and its changes are discarded.
+        """
+        self._commit_listeners.append(callback)
+
+    def _notify_commit(self, committed: bool):
+        for callback in self._commit_listeners:
+            try:
+                callback(committed)
+            except Exception as e:
+                print(f"Error in commit listener: {e}")
+
+    def _notify(self, event: str, payload=None):
+        self.changes.record(event, payload)
+        if event == 'reset':
+            self._dirty_years = None
+        elif event in ('leave_added', 'leave_updated'):
+            self._mark_dirty([payload])
+        # 'leaves_removed'/'leaves_restored' only hide or show requests of a
+        # tombstoned user; nothing in their partitions changes until compact()
+        for callback in self._listeners:
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"Error in {event} listener: {e}")
+
+    def _mark_dirty(self, leaves: Iterable[LeaveRequest]):
+        if self._dirty_years is not None:
+            self._dirty_years.update(leave.start_date.year for leave in leaves)
+
+    @property
+    def version(self) -> int:
+        """Data version, increased by every change"""
+        return self.changes.version
+
+    def changes_since(self, version: int) -> List[Change]:
+        """Changes after version, or a single 'reset' change if they are no longer kept"""
+        return self.changes.since(version)
+
+    def snapshot(self, years: Iterable[int] = None) -> Snapshot:
+        """The data as of the last completed change, for long reads without locking.
+
+        Changes made later, and those of a transaction still in progress,
+        go into a newer snapshot; the one returned never changes. Given
+        years that are not loaded are read from their partitions into this
+        snapshot only, so browsing old years does not keep them in memory.
+        """
+        snapshot = self.snapshots.current
+        archived = set(years or ()) - snapshot.loaded_years
+        if not archived:
+            return snapshot
+        leaves = self.visible_leaves(leave for year in sorted(archived) for leave in self._read_partition(year))
+        return snapshot.with_archived(archived, leaves)
+
+    def _publish(self):
+        """Hand the current state to snapshot readers, unless a transaction is open"""
+        if not self._batch_depth:
+            self.snapshots.publish()
+
+    @property
+    def tombstones(self) -> Dict[str, dict]:
+        """Deleted users awaiting compaction: {username: {'user': User, 'deleted_at': datetime}}"""
+        return self.meta.setdefault('tombstones', {})
+
+    def visible_leaves(self, leaves: Iterable[LeaveRequest] = None) -> List[LeaveRequest]:
+        """Leave requests of users that are not deleted (all loaded ones by default)"""
+        leaves = self.leave_requests if leaves is None else leaves
+        tombstones = self.meta.get('tombstones')
+        if not tombstones:
+            return leaves if isinstance(leaves, list) else list(leaves)
+        return [leave for leave in leaves if leave.username not in tombstones]
+
+    def _audit(self, action: str, target: str = "", **details):
+        """Record a change for the audit log, attributed to the current actor"""
+        self._audit_pending.append(AuditEvent(action, target or "", details))
+
+    def record_audit(self, action: str, target: str = "", **details):
+        """Record a change made outside the DataManager's own methods, e.g. by the accrual run.
+
+        Like every change, the event is written once the change is saved.
+        """
+        self._audit(action, target, **details)
+
+    def _flush_audit(self):
+        try:
+            self.audit.append(self._audit_pending)
+            self._audit_pending = []
+        except Exception as e:
+            print(f"Error writing audit log: {e}")
+
+    def _register_metrics(self):
+        """Expose record counts and file sizes as gauges computed at scrape time"""
+        RECORDS.set_function(lambda: {
+            ('users',): len(self.users),
+            ('leave_requests',): len(self.visible_leaves()),
+            ('holidays',): len(self.holidays),
+        })
+        PENDING_REQUESTS.set_function(lambda: {
+            (): sum(1 for leave in self.visible_leaves() if leave.status == "Pending")
+        })
+        DATA_FILE_BYTES.set_function(lambda: {
+            ('users',): self.users_file.stat().st_size if self.users_file.exists() else 0,
+            ('holidays',): self.holidays_file.stat().st_size if self.holidays_file.exists() else 0,
+            ('leaves',): sum(path.stat().st_size for path in self.leaves_dir.glob('[0-9]*.pkl')),
+        })
+        APPROVAL_QUEUE_DEPTH.set_function(lambda: {
+            (stage,): stats['pending'] for stage, stats in self.approvals.stats().items()
+        })
+        APPROVAL_QUEUE_AGE.set_function(lambda: {
+            (stage,): stats['oldest_seconds'] for stage, stats in self.approvals.stats().items()
+        })
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the data directory against other instances and processes.
+
+        The outermost holder first reloads what another writer saved since
+        this instance last loaded, so the change applies to the latest data.
+        """
+        with self._directory_lock.held() as outermost:
+            if outermost:
+                self.reload_if_changed()
+            yield
+
+    @contextmanager
+    def transaction(self):
+        """Group several changes into a single save.
+
+        Calls to save_data() inside the block are deferred until the outermost
+        block exits. If the block raises, in-memory changes are discarded by
+        reloading the last persisted state.
+        """
+        with self._exclusive():
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._save_pending = False
+                    # Nothing was saved, so nothing happened
+                    self._audit_pending = []
+                    self._notify_commit(False)
+                    self.load_data()
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._save_pending:
+                self._save_pending = False
+                self.save_data()
+            else:
+                self._publish()
     
+    @timed()
+    @_writer
     def update_user(self, username: str, user_data: dict) -> bool:
         """Update user information"""
         if username in self.users:
             user = self.users[username]
+            before = {'email': user.email, 'department': user.department, 'manager': user.manager,
+                      'leave_balance': dict(user.leave_balance or {}), 'password': user.password}
             
             # Update email if provided
             if 'email' in user_data:
@@ -35,152 +337,494 @@ class DataManager:
             # Update leave balance if provided
             if 'leave_balance' in user_data and not user.is_admin:
                 user.leave_balance = user_data['leave_balance']
+
+            # Update approving manager if provided
+            if 'manager' in user_data:
+                user.manager = user_data['manager'] or None
+
+            after = {'email': user.email, 'department': user.department, 'manager': user.manager,
+                     'leave_balance': dict(user.leave_balance or {}), 'password': user.password}
+            changed = {name: [before[name], after[name]] for name in before if before[name] != after[name]}
+            if 'password' in changed:
+                changed['password'] = "changed"  # Never log hashes
+            if changed:
+                self._audit('user_updated', username, **changed)
             
+            self._notify('user_updated', user)
             self.save_data()
             return True
         return False
 
+    @timed()
+    @_writer
     def delete_user(self, username: str) -> bool:
-        """Delete a user and their associated leave requests"""
+        """Delete a user and their leave requests.
+
+        The user gets a tombstone: they and their requests are hidden from
+        every query at once, and purged from the files by compact(), which
+        handles many deletions in one pass. restore_user() undoes the
+        deletion until then.
+        """
         if username in self.users:
-            # Delete user
-            del self.users[username]
-            
-            # Delete associated leave requests
-            self.leave_requests = [leave for leave in self.leave_requests 
-                                if leave.username != username]
-            
+            user = self.users.pop(username)
+            self.tombstones[username] = {'user': user, 'deleted_at': datetime.now()}
+
+            # Loaded requests leave the indexes; archived ones stay hidden on disk
+            hidden = self.leave_index.leaves(username)
+            self._notify('leaves_removed', hidden)
+            self._notify('user_deleted', user)
+            self._audit('user_deleted', username, department=user.department, leaves_hidden=len(hidden))
             self.save_data()
             return True
         return False
 
+    def delete_users(self, usernames: Iterable[str]) -> int:
+        """Delete several users with one save; returns how many were deleted"""
+        with self.transaction():
+            return sum(self.delete_user(username) for username in usernames)
+
+    @timed()
+    @_writer
+    def restore_user(self, username: str) -> bool:
+        """Undo a deletion that has not been compacted yet"""
+        if username in self.users or username not in self.tombstones:
+            return False
+        user = self.tombstones.pop(username)['user']
+        self.users[username] = user
+        self._notify('user_added', user)
+        restored = [leave for leave in self.leave_requests if leave.username == username]
+        self._notify('leaves_restored', restored)
+        self._audit('user_restored', username, department=user.department, leaves_restored=len(restored))
+        self.save_data()
+        return True
+
+    @timed()
+    def compact(self, min_age: timedelta = None) -> List[str]:
+        """Purge deleted users and their leave requests from memory and disk.
+
+        Tombstones younger than min_age are kept for a later run. Loaded
+        requests are filtered in one pass and each archived partition is
+        rewritten at most once, however many users are purged. Returns the
+        purged usernames.
+        """
+        with self._exclusive():
+            if self._batch_depth:
+                return []
+            cutoff = datetime.now() - (min_age or timedelta(0))
+            purged = {username for username, tombstone in self.tombstones.items()
+                      if tombstone['deleted_at'] <= cutoff}
+            if not purged:
+                return []
+
+            self._mark_dirty(leave for leave in self.leave_requests if leave.username in purged)
+            self.leave_requests = [leave for leave in self.leave_requests if leave.username not in purged]
+            # Archived years are filtered on disk without loading them
+            for year in sorted(self._partition_years_on_disk() - self.loaded_years):
+                path = self._partition_path(year)
+                leaves = read_pickle(path)
+                kept = [leave for leave in leaves if leave.username not in purged]
+                if len(kept) == len(leaves):
+                    continue
+                if kept:
+                    write_pickle(path, kept)
+                    self._partition_index[year] = {
+                        'records': len(kept),
+                        'pending': sum(1 for leave in kept if leave.status == "Pending"),
+                    }
+                else:
+                    path.unlink()
+                    self._partition_index.pop(year, None)
+
+            for username in purged:
+                del self.tombstones[username]
+            self._audit('users_compacted', users=sorted(purged))
+            self.save_data()
+            return sorted(purged)
+
     def get_user(self, username: str) -> User:
         """Get user by username"""
         return self.users.get(username)
     
+    @timed()
     def load_data(self):
-        """Load data from pickle files"""
+        """Load users, holidays and the hot leave partitions from disk"""
+        with LOAD_DURATION.time(), self._lock:
+            self._load_files()
+            self._disk_stamp = self._read_disk_stamp()
+            self._notify('reset')
+            self._publish()
+
+    def _read_disk_stamp(self):
+        # Files are replaced atomically on save, so a new inode means a new version
+        stamp = []
+        for path in (self.users_file, self.holidays_file, self.meta_file, self._partition_path('index')):
+            try:
+                stat = path.stat()
+                stamp.append((stat.st_ino, stat.st_mtime_ns))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def reload_if_changed(self) -> bool:
+        """Reload if another process saved since this one last loaded or saved"""
+        with self._lock:
+            if self._batch_depth or self._read_disk_stamp() == self._disk_stamp:
+                return False
+            self.load_data()
+            return True
+
+    def _load_files(self):
         try:
-            if USERS_FILE.exists():
-                with open(USERS_FILE, 'rb') as f:
-                    self.users = pickle.load(f)
-            
-            if LEAVES_FILE.exists():
-                with open(LEAVES_FILE, 'rb') as f:
-                    self.leave_requests = pickle.load(f)
+            if self.users_file.exists():
+                self.users = read_pickle(self.users_file)
             
-            if HOLIDAYS_FILE.exists():
-                with open(HOLIDAYS_FILE, 'rb') as f:
-                    self.holidays = pickle.load(f)
+            if self.holidays_file.exists():
+                self.holidays = read_pickle(self.holidays_file)
+
+            if self.meta_file.exists():
+                self.meta = read_pickle(self.meta_file)
+
+            if self.leaves_file.exists():
+                self._migrate_legacy_leaves()
+
+            index_file = self._partition_path('index')
+            self._partition_index = read_pickle(index_file) if index_file.exists() else {}
+            self.leave_requests = []
+            self.loaded_years = set()
+
+            # Years with pending requests are needed by the approval queue
+            years = self.hot_years() | {year for year, info in self._partition_index.items()
+                                        if info['pending']}
+            for year in sorted(years):
+                self._load_partition(year)
         except Exception as e:
             print(f"Error loading data: {e}")
 
+    def _partition_path(self, year) -> Path:
+        return self.leaves_dir / f"{year}.pkl"
+
+    def _partition_years_on_disk(self) -> Set[int]:
+        return {int(path.stem) for path in self.leaves_dir.glob('[0-9]*.pkl')}
+
+    def _load_partition(self, year: int) -> List[LeaveRequest]:
+        path = self._partition_path(year)
+        leaves = []
+        if path.exists():
+            leaves = read_pickle(path)
+            self.leave_requests.extend(leaves)
+        self.loaded_years.add(year)
+        return leaves
+
+    def _migrate_legacy_leaves(self):
+        """Split a pre-partitioning leaves.pkl into year partitions"""
+        leaves = read_pickle(self.leaves_file)
+        self.leave_requests = leaves
+        self.loaded_years = {leave.start_date.year for leave in leaves}
+        self._dirty_years = None
+        self._save_leave_partitions()
+        self.leaves_file.rename(self.leaves_file.with_name(self.leaves_file.name + '.migrated'))
+
+    def hot_years(self) -> Set[int]:
+        """Years loaded at startup: the current year and the next"""
+        current = date.today().year
+        return {current + offset for offset in range(HOT_LEAVE_YEARS)}
+
+    def partition_years(self) -> List[int]:
+        """All years that have leave requests, loaded or not"""
+        return sorted(self._partition_years_on_disk() | self.loaded_years)
+
+    @timed()
+    def load_years(self, years: Iterable[int] = None):
+        """Load archived year partitions on demand (all years if none given)"""
+        with self._lock:
+            if years is None:
+                years = self._partition_years_on_disk()
+            loaded = []
+            for year in sorted(set(years) - self.loaded_years):
+                loaded.extend(self._load_partition(year))
+            if loaded:
+                self._notify('leaves_loaded', self.visible_leaves(loaded))
+                self._publish()
+
+    def _read_partition(self, year: int) -> List[LeaveRequest]:
+        """Read one partition from disk without loading it"""
+        path = self._partition_path(year)
+        return read_pickle(path) if path.exists() else []
+
+    def _cold_partitions(self, newest_first: bool = False) -> Iterator[Tuple[int, List[LeaveRequest]]]:
+        """(year, leaves) of each partition that is not loaded, read one at a time"""
+        for year in sorted(self._partition_years_on_disk() - self.loaded_years, reverse=newest_first):
+            yield year, self._read_partition(year)
+
+    def _read_cold_leaves(self) -> List[LeaveRequest]:
+        """Read partitions that are not loaded, without adding them to the hot set"""
+        return [leave for _, leaves in self._cold_partitions() for leave in leaves]
+
+    def _cold_year_of(self, leave_id: str) -> Optional[int]:
+        """Year of the archived partition holding a request"""
+        for year, leaves in self._cold_partitions(newest_first=True):
+            if any(leave.id == leave_id for leave in leaves):
+                return year
+        return None
+
+    @timed()
+    def archive_closed_years(self) -> List[int]:
+        """Move closed years (before the hot years, nothing pending) out of memory.
+
+        Returns the years that were archived.
+        """
+        with self._exclusive():
+            if self._batch_depth:
+                return []
+            pending_years = {leave.start_date.year for leave in self.visible_leaves()
+                            if leave.status == "Pending"}
+            closed = {year for year in self.loaded_years
+                      if year < min(self.hot_years()) and year not in pending_years}
+            if not closed:
+                return []
+
+            self.save_data()
+            evicted = [leave for leave in self.leave_requests if leave.start_date.year in closed]
+            self.leave_requests = [leave for leave in self.leave_requests
+                                   if leave.start_date.year not in closed]
+            self.loaded_years -= closed
+            self._notify('leaves_unloaded', evicted)
+            self._publish()
+            return sorted(closed)
+
+    @timed()
     def save_data(self):
         """Save data to pickle files"""
-        try:
-            with open(USERS_FILE, 'wb') as f:
-                pickle.dump(self.users, f)
-            
-            with open(LEAVES_FILE, 'wb') as f:
-                pickle.dump(self.leave_requests, f)
-            
-            with open(HOLIDAYS_FILE, 'wb') as f:
-                pickle.dump(self.holidays, f)
-        except Exception as e:
-            print(f"Error saving data: {e}")
+        with self._directory_lock.held():
+            if self._batch_depth:
+                self._save_pending = True
+                return
+            try:
+                with SAVE_DURATION.time():
+                    self._save_files()
+                self._disk_stamp = self._read_disk_stamp()
+            except Exception as e:
+                print(f"Error saving data: {e}")
+                return
+            finally:
+                # Readers see the change whether or not it reached the disk
+                self._publish()
+            if self._audit_pending:
+                self._flush_audit()
+            self._notify_commit(True)
+
+    def _save_files(self):
+        size = write_pickle(self.users_file, self.users)
+        profiler.record_size('DataManager.save_data[users]', size)
 
+        size = self._save_leave_partitions()
+        profiler.record_size('DataManager.save_data[leaves]', size)
+
+        size = write_pickle(self.holidays_file, self.holidays)
+        profiler.record_size('DataManager.save_data[holidays]', size)
+
+        write_pickle(self.meta_file, self.meta)
+
+    def _save_leave_partitions(self) -> int:
+        """Write the loaded year partitions changed since the last save; returns the bytes written"""
+        dirty = self._dirty_years
+        partitions = {year: [] for year in self.loaded_years}
+        for leave in self.leave_requests:
+            partitions.setdefault(leave.start_date.year, []).append(leave)
+
+        # A year that was never loaded must not overwrite its partition on disk
+        for year in set(partitions) - self.loaded_years:
+            if self._partition_path(year).exists():
+                known = {leave.id for leave in partitions[year]}
+                existing = [leave for leave in read_pickle(self._partition_path(year))
+                            if leave.id not in known]
+                self.leave_requests.extend(existing)
+                partitions[year].extend(existing)
+                self._notify('leaves_loaded', self.visible_leaves(existing))
+            self.loaded_years.add(year)
+            if dirty is not None:
+                dirty.add(year)
+
+        written = 0
+        for year, leaves in partitions.items():
+            if dirty is not None and year not in dirty:
+                continue
+            path = self._partition_path(year)
+            if leaves:
+                written += write_pickle(path, leaves)
+                self._partition_index[year] = {
+                    'records': len(leaves),
+                    'pending': sum(1 for leave in leaves if leave.status == "Pending"),
+                }
+            else:
+                if path.exists():
+                    path.unlink()
+                self._partition_index.pop(year, None)
+        write_pickle(self._partition_path('index'), self._partition_index)
+        self._dirty_years = set()
+        return written
+
+    @timed()
+    @_writer
     def add_user(self, user: User) -> bool:
-        """Add a new user"""
-        if user.username not in self.users:
+        """Add a new user; the name of a deleted user is free once it is compacted"""
+        if user.username not in self.users and user.username not in self.tombstones:
             self.users[user.username] = user
+            self._notify('user_added', user)
+            self._audit('user_added', user.username, department=user.department, is_admin=user.is_admin)
             self.save_data()
             return True
         return False
 
+    @timed()
+    @_writer
     def add_leave_request(self, leave_request: LeaveRequest) -> bool:
         """Add a new leave request"""
         leave_request.id = str(uuid.uuid4())
+        self.load_years([leave_request.start_date.year])
         self.leave_requests.append(leave_request)
+        self._notify('leave_added', leave_request)
+        self._audit('leave_submitted', leave_request.username, leave_id=leave_request.id,
+                    leave_type=leave_request.leave_type, start_date=leave_request.start_date,
+                    end_date=leave_request.end_date, status=leave_request.status)
         self.save_data()
         return True
     
-    def create_backup(self):
-        """Create a backup of current data"""
-        from datetime import datetime
-        import shutil
-        import os
-
-        backup_dir = os.path.join(os.path.dirname(self.users_file), 'backups')
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    @timed()
+    @_writer
+    def add_holidays(self, holidays: List[dict]) -> bool:
+        """Add holidays ({'date': 'YYYY-MM-DD', 'description': ...})"""
+        self.holidays.extend(holidays)
+        self._notify('holidays_added', holidays)
+        self._audit('holidays_added', dates=[holiday['date'] for holiday in holidays])
+        self.save_data()
+        return True
 
+    @timed()
+    def create_backup(self) -> bool:
+        """Create an incremental backup of current data"""
         try:
-            # Backup each file
-            for filename in [self.users_file, self.leaves_file, self.holidays_file]:
-                if os.path.exists(filename):
-                    backup_file = os.path.join(
-                        backup_dir,
-                        f"{os.path.basename(filename)}_{timestamp}.bak"
-                    )
-                    shutil.copy2(filename, backup_file)
+            with self._lock:
+                datasets = {
+                    'users': list(self.users.values()),
+                    'leaves': list(self.leave_requests),
+                    'holidays': list(self.holidays),
+                    'meta': [self.meta],
+                }
+                # Archived years are only read if their file changed since the last backup
+                sources = {}
+                for year in sorted(self._partition_years_on_disk() - self.loaded_years):
+                    stat = self._partition_path(year).stat()
+                    sources[f"leaves/{year}"] = ([stat.st_ino, stat.st_mtime_ns, stat.st_size],
+                                                 functools.partial(self._read_partition, year))
+                self.backups.create(datasets, BACKUP_KEYS, sources)
             return True
         except Exception as e:
             print(f"Backup failed: {e}")
             return False
 
-        def restore_backup(self, timestamp):
-            """Restore data from a backup"""
-            import os
+    def list_backups(self) -> List[BackupInfo]:
+        """List available backups, newest first"""
+        return self.backups.list_backups()
 
-            backup_dir = os.path.join(os.path.dirname(self.users_file), 'backups')
-            try:
-                # Restore each file
-                for filename in [self.users_file, self.leaves_file, self.holidays_file]:
-                    backup_file = os.path.join(
-                        backup_dir,
-                        f"{os.path.basename(filename)}_{timestamp}.bak"
-                    )
-                    if os.path.exists(backup_file):
-                        shutil.copy2(backup_file, filename)
-                
-                # Reload data
-                self.load_data()
-                return True
-            except Exception as e:
-                print(f"Restore failed: {e}")
-                return False
+    def verify_backup(self, backup_id: str) -> List[str]:
+        """Verify the checksums of a backup; returns a list of problems"""
+        return self.backups.verify(backup_id)
 
+    @timed()
+    def restore_backup(self, backup_id: str) -> bool:
+        """Restore data from a backup"""
+        try:
+            datasets = self.backups.restore(backup_id)
+            with self._exclusive():
+                self.users = {user.username: user for user in datasets['users']}
+                # Every partition is rewritten, so years missing from the backup are emptied
+                self.loaded_years = self._partition_years_on_disk()
+                self.leave_requests = datasets['leaves']
+                self.holidays = datasets['holidays']
+                self.meta = datasets.get('meta', [{}])[0]
+                self._notify('reset')
+                self._audit('backup_restored', backup_id=backup_id, users=len(self.users),
+                            leaves=len(self.leave_requests))
+                self.save_data()
+            return True
+        except Exception as e:
+            print(f"Restore failed: {e}")
+            return False
+
+    @timed()
+    @_writer
     def purge_data(self):
         """Purge all data and reinitialize with default admin"""
         from utils.auth import create_admin_user  # Import here to avoid circular import
 
+        self._audit('data_purged', users=len(self.users), holidays=len(self.holidays),
+                    leaves=sum(info['records'] for info in self._partition_index.values()))
+
         # Reset data structures
         self.users = {'admin': create_admin_user()}
+        self.loaded_years = self._partition_years_on_disk()
         self.leave_requests = []
         self.holidays = []
+        self.meta = {}
+        self._notify('reset')
 
         # Save empty data
         self.save_data()
 
         return True
 
+    @timed()
+    @_writer
     def update_leave_request(self, leave_id: str, status: str, comment: str = "") -> bool:
         """Update leave request status"""
-        for leave in self.leave_requests:
-            if leave.id == leave_id:
-                leave.status = status
-                leave.admin_comment = comment
-                leave.action_date = datetime.now()
-                self.save_data()
-                return True
+        leave = self._find_leave(leave_id)
+        if leave is None:
+            # The request may be in an archived year; load only that one
+            year = self._cold_year_of(leave_id)
+            if year is not None:
+                self.load_years([year])
+                leave = self._find_leave(leave_id)
+        if leave is not None:
+            before = (leave.status, leave.admin_comment, leave.action_date)
+            leave.status = status
+            leave.admin_comment = comment
+            leave.action_date = datetime.now()
+            self._notify('leave_updated', leave)
+            # The request itself only keeps the latest decision
+            self._audit('leave_status_changed', leave.username, leave_id=leave.id,
+                        status=[before[0], status], admin_comment=[before[1], comment],
+                        action_date=[before[2], leave.action_date])
+            self.save_data()
+            return True
         return False
 
-    def get_user_leaves(self, username: str) -> List[LeaveRequest]:
-        """Get all leave requests for a user"""
-        return [leave for leave in self.leave_requests if leave.username == username]
+    def _find_leave(self, leave_id: str) -> LeaveRequest:
+        return self.leave_index.get(leave_id)
+
+    @timed()
+    def get_user_leaves(self, username: str, years: Iterable[int] = None) -> List[LeaveRequest]:
+        """Get leave requests for a user from the loaded years, or from the given years.
+
+        Years that are not loaded are read from disk without loading them.
+        """
+        if years is None:
+            return self.leave_index.leaves(username)
+        years = set(years)
+        leaves = [leave for leave in self.leave_index.leaves(username) if leave.start_date.year in years]
+        for year in sorted(years - self.loaded_years):
+            leaves.extend(leave for leave in self._read_partition(year) if leave.username == username)
+        return leaves
+
+    @timed()
+    def get_approved_leaves(self, start: date, end: date, department: str = None) -> List[LeaveRequest]:
+        """Approved leave requests overlapping [start, end], optionally for one department"""
+        return self.snapshot(range(start.year, end.year + 1)).approved_leaves(start, end, department)
 
-    def get_pending_leaves(self) -> List[LeaveRequest]:
-        """Get all pending leave requests"""
-        return [leave for leave in self.leave_requests if leave.status == "Pending"]
\ No newline at end of file
+    @timed()
+    def get_pending_leaves(self, department: str = None) -> List[LeaveRequest]:
+        """Get pending leave requests, optionally only for one department"""
+        if department:
+            pending = self.leave_index.leaves_for(self.departments.members(department), "Pending")
+            return sorted(pending, key=lambda leave: leave.request_date)
+        return [leave for leave in self.visible_leaves() if leave.status == "Pending"]
\ No newline at end of file
@@ -0,0 +1,103 @@
+# app/utils/departments.py
+
+import threading
+from collections import defaultdict
+from typing import Dict, List, Set
+from models.user import User
+
+class DepartmentRegistry:
+    """Known departments and their members.
+
+    A department exists while it has members or after it is added explicitly
+    (kept in DataManager.meta['departments']). Membership is kept in sync
+    through DataManager change events, so listing a department's members
+    costs the size of the department rather than the whole org.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._lock = threading.RLock()
+        self._members: Dict[str, Set[str]] = defaultdict(set)
+        self._user_department: Dict[str, str] = {}
+        self._rebuild()
+        data_manager.add_listener(self._on_change)
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return (name or "").strip()
+
+    def _rebuild(self):
+        with self._lock:
+            self._members = defaultdict(set)
+            self._user_department = {}
+            for user in self.data_manager.users.values():
+                self._add(user)
+
+    def _add(self, user: User):
+        department = self.normalize(user.department)
+        self._user_department[user.username] = department
+        self._members[department].add(user.username)
+
+    def _remove(self, username: str):
+        department = self._user_department.pop(username, None)
+        if department is None:
+            return
+        members = self._members.get(department)
+        if members is not None:
+            members.discard(username)
+            if not members:
+                del self._members[department]
+
+    def _on_change(self, event: str, payload):
+        with self._lock:
+            if event == 'reset':
+                self._rebuild()
+            elif event == 'user_added':
+                self._add(payload)
+            elif event == 'user_updated':
+                self._remove(payload.username)
+                self._add(payload)
+            elif event == 'user_deleted':
+                self._remove(payload.username)
+
+    def _declared(self) -> List[str]:
+        return self.data_manager.meta.setdefault('departments', [])
+
+    def departments(self) -> List[str]:
+        """All department names, sorted"""
+        with self._lock:
+            names = {name for name, members in self._members.items() if name and members}
+            return sorted(names | set(self._declared()), key=str.lower)
+
+    def members(self, department: str) -> Set[str]:
+        """Usernames in a department"""
+        with self._lock:
+            return set(self._members.get(self.normalize(department), ()))
+
+    def member_counts(self) -> Dict[str, int]:
+        """Number of members per department"""
+        with self._lock:
+            return {name: len(self._members.get(name, ())) for name in self.departments()}
+
+    def department_of(self, username: str) -> str:
+        return self._user_department.get(username, "")
+
+    def add_department(self, name: str) -> bool:
+        """Register a department so it can be chosen before it has members"""
+        name = self.normalize(name)
+        with self.data_manager.transaction():
+            if not name or name in self.departments():
+                return False
+            self._declared().append(name)
+            self.data_manager.save_data()
+        return True
+
+    def remove_department(self, name: str) -> bool:
+        """Remove a registered department; departments with members are kept"""
+        name = self.normalize(name)
+        with self.data_manager.transaction():
+            if self._members.get(name) or name not in self._declared():
+                return False
+            self._declared().remove(name)
+            self.data_manager.save_data()
+        return True
@@ -0,0 +1,156 @@
+# app/utils/directory.py
+
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from models.user import User
+
+SORT_FIELDS = ('username', 'email', 'department')
+
+@dataclass
+class DirectoryPage:
+    usernames: List[str]
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class UserDirectory:
+    """Searchable, sortable index of users for the admin pages.
+
+    Keeps one sorted list per sort field, so an unfiltered page is a slice,
+    and a trigram index over username, email and department, so substring
+    searches only look at candidate users. Kept in sync through
+    DataManager change events.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._lock = threading.RLock()
+        self._sorted: Dict[str, List[Tuple[str, str]]] = {}
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        self._entries: Dict[str, Tuple[str, str, str]] = {}
+        self.admin_count = 0
+        self._rebuild()
+        data_manager.add_listener(self._on_change)
+
+    def _fields(self, user: User) -> Tuple[str, str, str]:
+        return user.username.lower(), (user.email or "").lower(), (user.department or "").lower()
+
+    def _rebuild(self):
+        with self._lock:
+            self._sorted = {field: [] for field in SORT_FIELDS}
+            self._trigram_index = defaultdict(set)
+            self._entries = {}
+            self.admin_count = 0
+            for user in self.data_manager.users.values():
+                self._add(user, sort=False)
+            for entries in self._sorted.values():
+                entries.sort()
+
+    def _add(self, user: User, sort: bool = True):
+        fields = self._fields(user)
+        self._entries[user.username] = fields
+        for field, value in zip(SORT_FIELDS, fields):
+            entry = (value, user.username)
+            if sort:
+                insort(self._sorted[field], entry)
+            else:
+                self._sorted[field].append(entry)
+        for trigram in _trigrams(" ".join(fields)):
+            self._trigram_index[trigram].add(user.username)
+        self.admin_count += bool(user.is_admin)
+
+    def _remove(self, username: str, was_admin: bool):
+        fields = self._entries.pop(username, None)
+        if fields is None:
+            return
+        for field, value in zip(SORT_FIELDS, fields):
+            entries = self._sorted[field]
+            index = bisect_left(entries, (value, username))
+            if index < len(entries) and entries[index] == (value, username):
+                del entries[index]
+        for trigram in _trigrams(" ".join(fields)):
+            members = self._trigram_index.get(trigram)
+            if members is not None:
+                members.discard(username)
+                if not members:
+                    del self._trigram_index[trigram]
+        self.admin_count -= bool(was_admin)
+
+    def _on_change(self, event: str, payload):
+        with self._lock:
+            if event == 'reset':
+                self._rebuild()
+            elif event == 'user_added':
+                self._add(payload)
+            elif event == 'user_updated':
+                self._remove(payload.username, payload.is_admin)
+                self._add(payload)
+            elif event == 'user_deleted':
+                self._remove(payload.username, payload.is_admin)
+
+    def _matches(self, query: str) -> Set[str]:
+        """Usernames whose username, email or department contains query"""
+        query = query.lower()
+        if len(query) >= 3:
+            candidates = None
+            for trigram in sorted(_trigrams(query), key=lambda t: len(self._trigram_index.get(t, ()))):
+                members = self._trigram_index.get(trigram, set())
+                candidates = set(members) if candidates is None else candidates & members
+                if not candidates:
+                    return set()
+        else:
+            candidates = self._entries.keys()
+        return {username for username in candidates
+                if any(query in value for value in self._entries[username])}
+
+    def search(self, query: str = "", sort_by: str = 'username', descending: bool = False,
+               page: int = 1, page_size: int = 25, is_admin: Optional[bool] = None) -> DirectoryPage:
+        """Return one page of usernames matching query, sorted by a field"""
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort_by}")
+        page = max(1, page)
+        offset = (page - 1) * page_size
+        users = self.data_manager.users
+
+        with self._lock:
+            if query.strip():
+                matches = self._matches(query.strip())
+                if is_admin is not None:
+                    matches = {name for name in matches if users[name].is_admin == is_admin}
+                field_index = SORT_FIELDS.index(sort_by)
+                ordered = sorted(matches, key=lambda name: (self._entries[name][field_index], name),
+                                 reverse=descending)
+                return DirectoryPage(ordered[offset:offset + page_size], len(ordered), page, page_size)
+
+            entries = self._sorted[sort_by]
+            if is_admin is None:
+                total = len(entries)
+                if descending:
+                    window = entries[max(0, total - offset - page_size):total - offset][::-1]
+                else:
+                    window = entries[offset:offset + page_size]
+                return DirectoryPage([name for _, name in window], total, page, page_size)
+
+            # Role filter: walk the sorted list until the page is filled
+            total = self.admin_count if is_admin else len(entries) - self.admin_count
+            selected, skipped = [], 0
+            for _, name in (reversed(entries) if descending else entries):
+                if users[name].is_admin != is_admin:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                selected.append(name)
+                if len(selected) == page_size:
+                    break
+            return DirectoryPage(selected, total, page, page_size)
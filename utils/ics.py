@@ -0,0 +1,193 @@
+# app/utils/ics.py
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+from config import LEAVE_TYPES, ICS_PAST_DAYS, ICS_FUTURE_DAYS
+from models.leave import LeaveRequest
+from models.user import User
+from utils.changes import Change
+from utils.snapshots import Snapshot
+
+PRODID = "-//Leave Management System//Leave feeds//EN"
+UID_DOMAIN = "leave-management"
+
+def _escape(text: str) -> str:
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting UTF-8 characters"""
+    if len(line.encode()) <= 75:
+        return line
+    parts, current, size = [], [], 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(''.join(current))
+            current, size = [' '], 1
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n'.join(parts)
+
+def _stamp(moment: datetime) -> str:
+    # Stored datetimes are naive local time; DTSTAMP must be UTC
+    return moment.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+def _event(uid: str, stamp: datetime, start: date, end: date, summary: str,
+           description: str = "", category: str = "") -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@{UID_DOMAIN}",
+        f"DTSTAMP:{_stamp(stamp)}",
+        f"DTSTART;VALUE=DATE:{start:%Y%m%d}",
+        # All-day events end on the day after
+        f"DTEND;VALUE=DATE:{end + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:{_escape(summary)}",
+        "TRANSP:TRANSPARENT",
+    ]
+    if description:
+        lines.append(f"DESCRIPTION:{_escape(description)}")
+    if category:
+        lines.append(f"CATEGORIES:{_escape(category)}")
+    lines.append("END:VEVENT")
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+@dataclass(frozen=True)
+class Feed:
+    body: bytes
+    etag: str
+    version: int  # Data version the body is known to be current for
+    window: Tuple[date, date]
+
+class ICSFeeds:
+    """iCalendar feeds of approved leaves and holidays, cached per data version.
+
+    Feeds are 'user' (one person, with reasons), 'department' and 'org'.
+    A cached feed is reused while the data version is unchanged. When it
+    moves on, the changes since are checked against the feed and it is only
+    rendered again if one of them touches it, so the ETag only changes with
+    the content. Rendered events are memoized per leave and shared by feeds.
+    """
+
+    def __init__(self, data_manager, past_days: int = ICS_PAST_DAYS, future_days: int = ICS_FUTURE_DAYS):
+        self.data_manager = data_manager
+        self.past_days = past_days
+        self.future_days = future_days
+        self._lock = threading.Lock()
+        self._feeds: Dict[Tuple[str, str], Feed] = {}
+        self._events: Dict[Tuple[str, bool], Tuple[tuple, str]] = {}
+        self.renders = 0
+
+    def window(self, today: date = None) -> Tuple[date, date]:
+        today = today or date.today()
+        return today - timedelta(days=self.past_days), today + timedelta(days=self.future_days)
+
+    def feed(self, kind: str, name: str = "") -> Feed:
+        """The current feed; kind is 'user', 'department' or 'org'"""
+        key = (kind, name or "")
+        window = self.window()
+        with self._lock:
+            # Render from one snapshot and label the feed with its version
+            snapshot = self.data_manager.snapshot(range(window[0].year, window[1].year + 1))
+            version = snapshot.version
+            cached = self._feeds.get(key)
+            if cached is not None and cached.window == window:
+                if cached.version == version:
+                    return cached
+                changes = self.data_manager.changes_since(cached.version)
+                if not any(self._touches(change, kind, name, window) for change in changes):
+                    cached = Feed(cached.body, cached.etag, version, window)
+                    self._feeds[key] = cached
+                    return cached
+
+            body = self._render(snapshot, kind, name, window)
+            feed = Feed(body, f'"{hashlib.sha1(body).hexdigest()}"', version, window)
+            self._feeds[key] = feed
+            self.renders += 1
+            return feed
+
+    def _touches(self, change: Change, kind: str, name: str, window: Tuple[date, date]) -> bool:
+        """Whether a change can alter a feed, as CalendarView decides for a month"""
+        if change.event == 'reset':
+            return True
+        if change.event == 'holidays_added':
+            return change.touches(*window)
+        if change.event in ('user_added', 'user_updated', 'user_deleted'):
+            # Department moves change who is in a department feed
+            return kind == 'department' or name in change.usernames
+        if "Approved" not in change.statuses or not change.touches(*window):
+            return False
+        if kind == 'user':
+            return name in change.usernames
+        if kind == 'department':
+            return bool(change.usernames & self.data_manager.departments.members(name))
+        return True
+
+    def _leaves(self, snapshot: Snapshot, kind: str, name: str, window: Tuple[date, date]) -> List[LeaveRequest]:
+        start, end = window
+        if kind == 'user':
+            return [leave for leave in snapshot.user_leaves(name)
+                    if leave.status == "Approved" and leave.start_date <= end and leave.end_date >= start]
+        return snapshot.approved_leaves(start, end, name if kind == 'department' else None)
+
+    def _leave_event(self, leave: LeaveRequest, personal: bool) -> str:
+        signature = (leave.status, leave.start_date, leave.end_date, leave.leave_type,
+                     leave.reason if personal else None, leave.action_date)
+        memo = self._events.get((leave.id, personal))
+        if memo is not None and memo[0] == signature:
+            return memo[1]
+        leave_name = LEAVE_TYPES.get(leave.leave_type, leave.leave_type)
+        text = _event(
+            uid=leave.id,
+            stamp=leave.action_date or leave.request_date,
+            start=leave.start_date,
+            end=leave.end_date,
+            summary=leave_name if personal else f"{leave.username}: {leave_name}",
+            description=leave.reason if personal else "",
+            category=leave.leave_type,
+        )
+        self._events[(leave.id, personal)] = (signature, text)
+        return text
+
+    def _render(self, snapshot: Snapshot, kind: str, name: str, window: Tuple[date, date]) -> bytes:
+        leaves = self._leaves(snapshot, kind, name, window)
+        # Memoized events of requests that are gone are dropped now and then
+        if len(self._events) > 2 * len(snapshot.leave_requests) + 1000:
+            self._events.clear()
+
+        start, end = window
+        title = {'user': f"Leave: {name}", 'department': f"Leave: {name}", 'org': "Leave: everyone"}[kind]
+        parts = [
+            "BEGIN:VCALENDAR\r\n",
+            "VERSION:2.0\r\n",
+            f"PRODID:{PRODID}\r\n",
+            "CALSCALE:GREGORIAN\r\n",
+            "METHOD:PUBLISH\r\n",
+            _fold(f"X-WR-CALNAME:{_escape(title)}") + "\r\n",
+        ]
+        for holiday in sorted(snapshot.holidays, key=lambda holiday: holiday['date']):
+            day = datetime.strptime(holiday['date'], '%Y-%m-%d').date()
+            if start <= day <= end:
+                parts.append(_event(f"holiday-{day:%Y%m%d}", datetime.combine(day, datetime.min.time()),
+                                    day, day, holiday['description'], category="Holiday"))
+        personal = kind == 'user'
+        for leave in sorted(leaves, key=lambda leave: (leave.start_date, leave.id)):
+            parts.append(self._leave_event(leave, personal))
+        parts.append("END:VCALENDAR\r\n")
+        return ''.join(parts).encode()
+
+def feed_urls(base_url: str, user: User, token: str) -> Dict[str, str]:
+    """Subscription URLs for a user's own, department and organisation feeds"""
+    base_url = base_url.rstrip('/')
+    urls = {
+        'user': f"{base_url}/ics/user/{quote(user.username, safe='')}.ics?token={token}",
+        'org': f"{base_url}/ics/org.ics?token={token}",
+    }
+    if user.department:
+        urls['department'] = f"{base_url}/ics/department/{quote(user.department, safe='')}.ics?token={token}"
+    return urls
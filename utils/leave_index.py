@@ -0,0 +1,68 @@
+# app/utils/leave_index.py
+
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from models.leave import LeaveRequest
+
+class UserLeaveIndex:
+    """Loaded leave requests by id and by user.
+
+    Mirrors DataManager.leave_requests (the loaded year partitions) and is
+    kept in sync through DataManager change events, so per-user lookups do
+    not scan every request.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, LeaveRequest] = {}
+        self._by_user: Dict[str, Dict[str, LeaveRequest]] = defaultdict(dict)
+        self._rebuild()
+        data_manager.add_listener(self._on_change)
+
+    def _rebuild(self):
+        with self._lock:
+            self._by_id = {}
+            self._by_user = defaultdict(dict)
+            self._add_all(self.data_manager.visible_leaves())
+
+    def _add_all(self, leaves: Iterable[LeaveRequest]):
+        for leave in leaves:
+            self._by_id[leave.id] = leave
+            self._by_user[leave.username][leave.id] = leave
+
+    def _remove_all(self, leaves: Iterable[LeaveRequest]):
+        for leave in leaves:
+            self._by_id.pop(leave.id, None)
+            user_leaves = self._by_user.get(leave.username)
+            if user_leaves is not None:
+                user_leaves.pop(leave.id, None)
+                if not user_leaves:
+                    del self._by_user[leave.username]
+
+    def _on_change(self, event: str, payload):
+        with self._lock:
+            if event == 'reset':
+                self._rebuild()
+            elif event in ('leave_added', 'leave_updated'):
+                self._add_all([payload])
+            elif event in ('leaves_loaded', 'leaves_restored'):
+                self._add_all(payload)
+            elif event in ('leaves_removed', 'leaves_unloaded'):
+                self._remove_all(payload)
+
+    def get(self, leave_id: str) -> Optional[LeaveRequest]:
+        return self._by_id.get(leave_id)
+
+    def leaves(self, username: str) -> List[LeaveRequest]:
+        """A user's loaded leave requests"""
+        with self._lock:
+            return list(self._by_user.get(username, {}).values())
+
+    def leaves_for(self, usernames: Iterable[str], status: str = None) -> List[LeaveRequest]:
+        """Loaded leave requests of several users, optionally with one status"""
+        with self._lock:
+            return [leave for username in usernames
+                    for leave in self._by_user.get(username, {}).values()
+                    if status is None or leave.status == status]
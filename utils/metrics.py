@@ -0,0 +1,269 @@
+# app/utils/metrics.py
+
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Pending samples are folded into the totals by the recording thread once
+# this many have queued up, so memory stays bounded without a scraper.
+FOLD_THRESHOLD = 10000
+
+def _escape_label(value) -> str:
+    """Escape a label value as the text exposition format requires"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class: samples are appended to a deque and aggregated on read.
+
+    deque.append is atomic, so recording never takes a lock. Only the
+    folding step, which runs on scrape (or rarely on overflow), is locked.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._pending = deque()
+        self._fold_lock = threading.Lock()
+
+    def _label_key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _push(self, item):
+        self._pending.append(item)
+        if len(self._pending) > FOLD_THRESHOLD and self._fold_lock.acquire(blocking=False):
+            try:
+                self._drain()
+            finally:
+                self._fold_lock.release()
+
+    def _fold(self):
+        with self._fold_lock:
+            self._drain()
+
+    def _drain(self):
+        pending = self._pending
+        while pending:
+            self._apply(pending.popleft())
+
+    def _apply(self, item):
+        raise NotImplementedError
+
+    def samples(self):
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        self._push((self._label_key(labels), amount))
+
+    def _apply(self, item):
+        key, amount = item
+        self._values[key] += amount
+
+    def samples(self):
+        self._fold()
+        for key, value in sorted(self._values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts = defaultdict(lambda: [0] * len(self.buckets))
+        self._sums = defaultdict(float)
+
+    def observe(self, value: float, **labels):
+        self._push((self._label_key(labels), value))
+
+    def time(self, **labels):
+        """Context manager observing the duration of the enclosed block"""
+        return _Timer(self, labels)
+
+    def _apply(self, item):
+        key, value = item
+        counts = self._counts[key]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        self._sums[key] += value
+
+    def samples(self):
+        self._fold()
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets, self._counts[key]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, self._sums[key]
+            yield f"{self.name}_count", labels, cumulative
+
+class Gauge(_Metric):
+    """Gauge whose values are computed by a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Callable[[], Dict[Tuple, float]] = None
+
+    def set_function(self, function: Callable[[], Dict[Tuple, float]]):
+        """Set a callback returning {label values tuple: value}"""
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            return
+        try:
+            values = self._function()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {e}")
+            return
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Data layer
+SAVE_DURATION = registry.register(Histogram(
+    "lms_save_duration_seconds", "Time spent persisting data files"))
+LOAD_DURATION = registry.register(Histogram(
+    "lms_load_duration_seconds", "Time spent loading data files"))
+DATA_FILE_BYTES = registry.register(Gauge(
+    "lms_data_file_bytes", "Size of each data file on disk", ["file"]))
+RECORDS = registry.register(Gauge(
+    "lms_records", "Number of records held in memory", ["kind"]))
+PENDING_REQUESTS = registry.register(Gauge(
+    "lms_pending_requests", "Leave requests waiting for approval"))
+APPROVAL_QUEUE_DEPTH = registry.register(Gauge(
+    "lms_approval_queue_depth", "Leave requests waiting at each approval stage", ["stage"]))
+APPROVAL_QUEUE_AGE = registry.register(Gauge(
+    "lms_approval_queue_oldest_seconds", "Age of the oldest request at each approval stage", ["stage"]))
+
+# Notifications
+NOTIFICATIONS = registry.register(Counter(
+    "lms_notifications_total", "Email delivery attempts by result", ["result"]))
+OUTBOX_MESSAGES = registry.register(Gauge(
+    "lms_outbox_messages", "Email messages waiting in the outbox"))
+
+# Login
+LOGIN_ATTEMPTS = registry.register(Counter(
+    "lms_login_attempts_total", "Login attempts by result", ["result"]))
+
+# JSON API service
+API_REQUESTS = registry.register(Counter(
+    "lms_api_requests_total", "API requests by method and status", ["method", "status"]))
+API_REQUEST_DURATION = registry.register(Histogram(
+    "lms_api_request_duration_seconds", "Time spent handling API requests"))
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the Streamlit log
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread; safe to call on every rerun"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+def write_textfile(path) -> None:
+    """Atomically write all metrics for the node_exporter textfile collector"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(registry.render())
+    os.replace(tmp_path, path)
+
+_textfile_thread = None
+
+def start_textfile_writer(path, interval: float = 15.0) -> threading.Thread:
+    """Periodically write metrics to a textfile from a daemon thread"""
+    global _textfile_thread
+
+    def loop():
+        while True:
+            try:
+                write_textfile(path)
+            except OSError as e:
+                print(f"Error writing metrics textfile: {e}")
+            time.sleep(interval)
+
+    with _server_lock:
+        if _textfile_thread is None:
+            _textfile_thread = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+            _textfile_thread.start()
+    return _textfile_thread
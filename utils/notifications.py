@@ -0,0 +1,309 @@
+# app/utils/notifications.py
+
+import asyncio
+import smtplib
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List, Optional
+from models.leave import LeaveRequest
+from utils.storage import read_pickle, write_pickle
+from utils.metrics import NOTIFICATIONS, OUTBOX_MESSAGES
+from config import (SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_STARTTLS, MAIL_FROM,
+                    OUTBOX_DIR, OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL, OUTBOX_BATCH_WINDOW,
+                    OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE, DEFAULT_TENANT)
+
+@dataclass
+class OutboxMessage:
+    to: List[str]
+    subject: str
+    body: str
+    # Sortable ids keep delivery in submission order
+    id: str = field(default_factory=lambda: f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}")
+    created_at: datetime = field(default_factory=datetime.now)
+    attempts: int = 0
+    next_attempt_at: datetime = None
+    last_error: str = ""
+
+class Outbox:
+    """Durable message queue, one file per message.
+
+    Writing a message is a single small atomic write, so queueing costs the
+    caller next to nothing; delivery happens in OutboxWorker. A message
+    waiting for a retry has the retry time in its file name
+    (<id>.<epoch ms>.pkl), so polls skip it without reading it. Messages
+    that keep failing are moved to the failed/ subdirectory.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.failed_dir = self.directory / "failed"
+        self.failed_dir.mkdir(parents=True, exist_ok=True)
+        self._listeners = []
+
+    def _path(self, message: OutboxMessage, failed: bool = False) -> Path:
+        if failed or message.next_attempt_at is None:
+            return (self.failed_dir if failed else self.directory) / f"{message.id}.pkl"
+        return self.directory / f"{message.id}.{int(message.next_attempt_at.timestamp() * 1000)}.pkl"
+
+    @staticmethod
+    def _retry_at(path: Path) -> int:
+        """Retry time in epoch milliseconds from a file name, 0 if the message is due now"""
+        _, _, retry_at = path.stem.partition('.')
+        return int(retry_at) if retry_at else 0
+
+    def on_put(self, callback):
+        """Call callback() after every put, e.g. to wake the worker"""
+        self._listeners.append(callback)
+
+    def put(self, message: OutboxMessage):
+        write_pickle(self._path(message), message)
+        for callback in self._listeners:
+            callback()
+
+    def _read(self, directory: Path, limit: int = None) -> List[OutboxMessage]:
+        return self._read_paths(sorted(directory.glob('*.pkl'))[:limit])
+
+    def _read_paths(self, paths: List[Path]) -> List[OutboxMessage]:
+        messages = []
+        for path in paths:
+            try:
+                messages.append(read_pickle(path))
+            except FileNotFoundError:
+                continue  # Delivered by another worker meanwhile
+        return messages
+
+    def due(self, limit: int, now: datetime = None) -> List[OutboxMessage]:
+        """Up to limit messages ready to send, oldest first"""
+        now = now or datetime.now()
+        now_ms = now.timestamp() * 1000
+        paths = [path for path in sorted(self.directory.glob('*.pkl')) if self._retry_at(path) <= now_ms]
+        return self._read_paths(paths[:limit])
+
+    def delivered(self, message: OutboxMessage):
+        self._path(message).unlink(missing_ok=True)
+
+    def retry_later(self, message: OutboxMessage, error: str, max_attempts: int, retry_base: float) -> bool:
+        """Record a failed attempt; returns False if the message was given up on"""
+        message.attempts += 1
+        message.last_error = error
+        if message.attempts >= max_attempts:
+            write_pickle(self._path(message, failed=True), message)
+            self.delivered(message)
+            return False
+        waiting = self._path(message)
+        message.next_attempt_at = datetime.now() + timedelta(seconds=retry_base * 2 ** (message.attempts - 1))
+        write_pickle(self._path(message), message)
+        waiting.unlink(missing_ok=True)
+        return True
+
+    def requeue_failed(self) -> int:
+        """Move failed messages back into the queue for another round of attempts"""
+        messages = self._read(self.failed_dir)
+        for message in messages:
+            message.attempts = 0
+            message.next_attempt_at = None
+            write_pickle(self._path(message), message)
+            self._path(message, failed=True).unlink(missing_ok=True)
+        return len(messages)
+
+    def pending_count(self) -> int:
+        return sum(1 for _ in self.directory.glob('*.pkl'))
+
+    def failed(self) -> List[OutboxMessage]:
+        return self._read(self.failed_dir)
+
+class SmtpSender:
+    """Send a batch of messages over one SMTP connection (blocking)"""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, username: str = SMTP_USERNAME,
+                 password: str = SMTP_PASSWORD, starttls: bool = SMTP_STARTTLS,
+                 sender: str = MAIL_FROM, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender
+        self.timeout = timeout
+
+    def send_batch(self, messages: List[OutboxMessage]) -> Dict[str, Optional[str]]:
+        """Returns {message id: None if sent, else the error}"""
+        results = {}
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                for message in messages:
+                    email = EmailMessage()
+                    email['From'] = self.sender
+                    email['To'] = ", ".join(message.to)
+                    email['Subject'] = message.subject
+                    email.set_content(message.body)
+                    try:
+                        smtp.send_message(email)
+                        results[message.id] = None
+                    except smtplib.SMTPException as e:
+                        results[message.id] = f"{type(e).__name__}: {e}"
+        except (OSError, smtplib.SMTPException) as e:
+            # Connection-level failure: every message not yet sent is retried
+            for message in messages:
+                results.setdefault(message.id, f"{type(e).__name__}: {e}")
+        return results
+
+class OutboxWorker:
+    """Drain the outbox in batches from an asyncio loop on a background thread.
+
+    A wake starts a batch_window during which further messages are
+    collected, so a burst of changes goes out over one SMTP connection.
+    """
+
+    def __init__(self, outbox: Outbox, sender: SmtpSender, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL, batch_window: float = OUTBOX_BATCH_WINDOW,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, retry_base: float = OUTBOX_RETRY_BASE):
+        self.outbox = outbox
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.batch_window = batch_window
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        outbox.on_put(self.wake)
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()),
+                                        name="outbox-worker", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped = True
+        self.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """Deliver soon instead of waiting for the next poll"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while not self._stopped:
+            try:
+                sent = await self.drain_once()
+            except Exception as e:
+                print(f"Error delivering notifications: {e}")
+                sent = 0
+            if sent < self.batch_size:
+                # Queue drained (or only messages waiting to be retried)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    continue
+                self._wake.clear()
+                if not self._stopped:
+                    await asyncio.sleep(self.batch_window)
+
+    async def drain_once(self) -> int:
+        """Send one batch of due messages; returns the batch size"""
+        loop = asyncio.get_running_loop()
+        batch = await loop.run_in_executor(None, self.outbox.due, self.batch_size)
+        if not batch:
+            return 0
+        results = await loop.run_in_executor(None, self.sender.send_batch, batch)
+        for message in batch:
+            error = results.get(message.id, "Not attempted")
+            if error is None:
+                self.outbox.delivered(message)
+                NOTIFICATIONS.inc(result="sent")
+            elif self.outbox.retry_later(message, error, self.max_attempts, self.retry_base):
+                NOTIFICATIONS.inc(result="retry")
+            else:
+                NOTIFICATIONS.inc(result="failed")
+        return len(batch)
+
+class LeaveNotifier:
+    """Turn DataManager change events into outbox messages.
+
+    New requests and requests moving to the next approval stage notify the
+    approvers of the current stage; decisions notify the requester. Messages
+    are held until the change is saved and dropped if it is rolled back.
+    """
+
+    def __init__(self, data_manager, outbox: Outbox):
+        self.data_manager = data_manager
+        self.outbox = outbox
+        self._admins: Dict[str, str] = {}
+        self._pending: List[OutboxMessage] = []
+        self._rebuild()
+        data_manager.add_listener(self._on_change)
+        data_manager.add_commit_listener(self._on_commit)
+
+    def _rebuild(self):
+        self._admins = {user.username: user.email for user in self.data_manager.users.values()
+                        if user.is_admin}
+
+    def _approver_emails(self, leave: LeaveRequest) -> List[str]:
+        key = self.data_manager.approvals.queue_key(leave)
+        manager = self.data_manager.users.get(key)
+        if manager is not None:
+            return [manager.email]
+        return list(self._admins.values())
+
+    def _on_change(self, event: str, payload):
+        if event == 'reset':
+            self._rebuild()
+        elif event in ('user_added', 'user_updated', 'user_deleted'):
+            self._admins.pop(payload.username, None)
+            if payload.is_admin and event != 'user_deleted':
+                self._admins[payload.username] = payload.email
+        elif event in ('leave_added', 'leave_updated'):
+            self._notify_leave(event, payload)
+
+    def _on_commit(self, committed: bool):
+        pending, self._pending = self._pending, []
+        if committed:
+            for message in pending:
+                self.outbox.put(message)
+
+    def _notify_leave(self, event: str, leave: LeaveRequest):
+        summary = f"{leave.leave_type} from {leave.start_date} to {leave.end_date}"
+        if leave.status == "Pending":
+            stage = self.data_manager.approvals.current_stage(leave)
+            to = [email for email in self._approver_emails(leave) if email]
+            subject = f"Leave request from {leave.username} awaiting {stage} approval"
+            body = f"{leave.username} requested {summary}.\n\nReason: {leave.reason}\n"
+        elif event == 'leave_updated':
+            requester = self.data_manager.users.get(leave.username)
+            to = [requester.email] if requester and requester.email else []
+            subject = f"Your leave request was {leave.status.lower()}"
+            body = f"Your request for {summary} was {leave.status.lower()}.\n"
+            if leave.admin_comment:
+                body += f"\nComment: {leave.admin_comment}\n"
+        else:
+            return  # Imported with a final status; nobody to notify
+
+        if to:
+            self._pending.append(OutboxMessage(to=to, subject=subject, body=body))
+
+def start_notifications(data_manager, sender: SmtpSender = None, **worker_options) -> OutboxWorker:
+    """Queue notifications for data_manager's events and start delivering them"""
+    outbox = Outbox(data_manager.data_dir / OUTBOX_DIR.name)
+    if data_manager.tenant == DEFAULT_TENANT:  # Metrics describe the default tenant
+        OUTBOX_MESSAGES.set_function(lambda: {(): outbox.pending_count()})
+    LeaveNotifier(data_manager, outbox)
+    worker = OutboxWorker(outbox, sender or SmtpSender(), **worker_options)
+    worker.start()
+    return worker
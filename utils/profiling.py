@@ -0,0 +1,114 @@
+# app/utils/profiling.py
+
+import functools
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+from config import PROFILING_ENABLED, PROFILING_WINDOW
+
+_NULL_CONTEXT = nullcontext()
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class Profiler:
+    """Collect timings and write sizes per operation.
+
+    When disabled, timed functions cost a single attribute check and
+    track() returns a shared no-op context manager.
+    """
+
+    def __init__(self, enabled: bool = False, window: int = PROFILING_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._timings: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self._sizes: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._total_time: Dict[str, float] = defaultdict(float)
+
+    def record(self, name: str, seconds: float):
+        """Record one timing sample for an operation"""
+        with self._lock:
+            self._timings[name].append(seconds)
+            self._calls[name] += 1
+            self._total_time[name] += seconds
+
+    def record_size(self, name: str, size: int):
+        """Record the number of bytes written by an operation"""
+        if self.enabled:
+            with self._lock:
+                self._sizes[name].append(size)
+
+    def track(self, name: str):
+        """Context manager timing the enclosed block"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._track(name)
+
+    @contextmanager
+    def _track(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: str = None):
+        """Decorator timing every call of the wrapped function"""
+        def decorator(func):
+            op_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(op_name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def stats(self) -> List[dict]:
+        """Summarize recent samples per operation"""
+        with self._lock:
+            timings = {name: sorted(samples) for name, samples in self._timings.items()}
+            sizes = {name: sorted(samples) for name, samples in self._sizes.items()}
+            calls = dict(self._calls)
+            total_time = dict(self._total_time)
+
+        rows = []
+        for name in sorted(set(timings) | set(sizes)):
+            samples = timings.get(name, [])
+            written = sizes.get(name, [])
+            rows.append({
+                'Operation': name,
+                'Calls': calls.get(name, 0),
+                'Total (ms)': round(total_time.get(name, 0.0) * 1000, 2),
+                'p50 (ms)': round(_percentile(samples, 50) * 1000, 2),
+                'p95 (ms)': round(_percentile(samples, 95) * 1000, 2),
+                'Max (ms)': round(samples[-1] * 1000, 2) if samples else 0.0,
+                'p50 Bytes': int(_percentile(written, 50)),
+                'Max Bytes': written[-1] if written else 0,
+            })
+        return rows
+
+    def reset(self):
+        """Discard all collected samples"""
+        with self._lock:
+            self._timings.clear()
+            self._sizes.clear()
+            self._calls.clear()
+            self._total_time.clear()
+
+# Process-wide profiler shared by the data layer and components
+profiler = Profiler(enabled=PROFILING_ENABLED)
+timed = profiler.timed
+track = profiler.track
@@ -0,0 +1,241 @@
+# app/utils/search.py
+
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from models.leave import LeaveRequest
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MIN_TOKEN_LENGTH = 2
+# Matches are ranked through the date-sorted list, rather than by sorting
+# them, when the narrowest clause holds more than 1/BROAD_MATCH_SHARE of all requests
+BROAD_MATCH_SHARE = 8
+
+def tokenize(text: str) -> Set[str]:
+    """Lowercase word tokens of a text field"""
+    return {token for token in TOKEN_PATTERN.findall((text or "").lower())
+            if len(token) >= MIN_TOKEN_LENGTH}
+
+def _field_token(field: str, value) -> str:
+    # Field filters share the postings table; ':' never occurs in a word token
+    return f"{field}:{value}"
+
+class LeaveSearchIndex:
+    """Inverted index over leave reasons and admin comments.
+
+    Word tokens and field values (user, status, type) share one postings
+    table, so text matches and filters are both set intersections. The index
+    covers every year partition but keeps only ids, postings and dates in
+    memory: matches are ranked by start date (a sorted list serves date
+    ranges and filter-free queries), and only the requests returned are
+    fetched, from memory or from their archived partition. It is built on
+    the first search and kept up to date through DataManager change events.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._lock = threading.RLock()
+        self._built = False
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._doc_tokens: Dict[str, FrozenSet[str]] = {}  # Loaded requests only
+        self._dates: Dict[str, Tuple[date, date]] = {}
+        self._by_start: List[Tuple[date, str]] = []
+        self._max_days = 0  # Longest request, bounds the scan for overlaps
+        self._vocabulary: List[str] = []
+        self._vocabulary_stale = True
+        data_manager.add_listener(self._on_change)
+
+    def _on_change(self, event: str, payload):
+        with self._lock:
+            if event == 'reset':
+                self._built = False
+            elif not self._built:
+                return  # Picked up when the index is built
+            elif event in ('leave_added', 'leave_updated'):
+                self._index(payload)
+            elif event == 'leaves_removed':
+                self._remove(leave.id for leave in payload)
+            elif event == 'user_deleted':
+                # Takes the user's archived requests too
+                self._remove(list(self._postings.get(_field_token('user', payload.username), ())))
+            elif event == 'leaves_restored':
+                self._built = False  # Archived requests come back with the next build
+            elif event == 'leaves_loaded':
+                for leave in payload:
+                    if leave.id in self._dates:
+                        self._doc_tokens[leave.id] = self._doc_terms(leave)
+
+    def _doc_terms(self, leave: LeaveRequest) -> FrozenSet[str]:
+        return frozenset(
+            tokenize(leave.reason) | tokenize(leave.admin_comment) | {
+                _field_token('user', leave.username),
+                _field_token('status', leave.status),
+                _field_token('type', leave.leave_type),
+            }
+        )
+
+    def _index(self, leave: LeaveRequest, loaded: bool = True):
+        self._remove([leave.id])
+        terms = self._doc_terms(leave)
+        for term in terms:
+            if term not in self._postings:
+                self._vocabulary_stale = True
+            self._postings[term].add(leave.id)
+        if loaded:
+            self._doc_tokens[leave.id] = terms
+        self._dates[leave.id] = (leave.start_date, leave.end_date)
+        self._max_days = max(self._max_days, (leave.end_date - leave.start_date).days)
+        if self._built:
+            insort(self._by_start, (leave.start_date, leave.id))
+
+    def _remove(self, leave_ids: Iterable[str]):
+        untracked = set()
+        for leave_id in leave_ids:
+            dates = self._dates.pop(leave_id, None)
+            if dates is None:
+                continue
+            index = bisect_left(self._by_start, (dates[0], leave_id))
+            if index < len(self._by_start) and self._by_start[index][1] == leave_id:
+                del self._by_start[index]
+            terms = self._doc_tokens.pop(leave_id, None)
+            if terms is None:
+                untracked.add(leave_id)
+            else:
+                for term in terms:
+                    self._discard(term, {leave_id})
+        if untracked:
+            # Archived requests keep no term list; one pass over the postings finds them
+            for term in [term for term, postings in self._postings.items() if not postings.isdisjoint(untracked)]:
+                self._discard(term, untracked)
+
+    def _discard(self, term: str, leave_ids: Set[str]):
+        postings = self._postings.get(term)
+        if postings is not None:
+            postings -= leave_ids
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_stale = True
+
+    def build(self):
+        """(Re)build the index from every year partition"""
+        with self._lock:
+            self._built = False
+            self._postings = defaultdict(set)
+            self._doc_tokens = {}
+            self._dates = {}
+            self._by_start = []
+            self._max_days = 0
+            for leave in self.data_manager.visible_leaves(self.data_manager.leave_requests):
+                self._index(leave)
+            # Archived partitions are read one at a time and not kept
+            for _, leaves in self.data_manager._cold_partitions():
+                for leave in self.data_manager.visible_leaves(leaves):
+                    self._index(leave, loaded=False)
+            self._by_start = sorted((dates[0], leave_id) for leave_id, dates in self._dates.items())
+            self._built = True
+
+    def _ensure_built(self):
+        if not self._built:
+            self.build()
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        """Union of postings for every word starting with prefix"""
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(term for term in self._postings if ':' not in term)
+            self._vocabulary_stale = False
+        matches = set()
+        index = bisect_left(self._vocabulary, prefix)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(prefix):
+            matches |= self._postings[self._vocabulary[index]]
+            index += 1
+        return matches
+
+    def _overlaps(self, leave_id: str, start: Optional[date], end: Optional[date]) -> bool:
+        leave_start, leave_end = self._dates[leave_id]
+        return (end is None or leave_start <= end) and (start is None or leave_end >= start)
+
+    def _newest(self, start: Optional[date], end: Optional[date], limit: int,
+                clauses: List[Set[str]] = ()) -> List[str]:
+        """Ids in every clause overlapping [start, end], newest start first, from the sorted list"""
+        index = len(self._by_start)
+        if end is not None:
+            index = bisect_left(self._by_start, (end + timedelta(days=1),))
+        # Nothing starting before this can reach start
+        earliest = start - timedelta(days=self._max_days) if start is not None else None
+        ranked = []
+        while index > 0 and len(ranked) < limit:
+            index -= 1
+            leave_start, leave_id = self._by_start[index]
+            if earliest is not None and leave_start < earliest:
+                break
+            if ((start is None or self._dates[leave_id][1] >= start)
+                    and all(leave_id in clause for clause in clauses)):
+                ranked.append(leave_id)
+        return ranked
+
+    def _fetch(self, ranked: List[Tuple[str, int]]) -> List[LeaveRequest]:
+        """Requests for (id, year) pairs: loaded ones from memory, the rest from their partition"""
+        found, archived = {}, defaultdict(set)
+        for leave_id, year in ranked:
+            leave = self.data_manager._find_leave(leave_id)
+            if leave is not None:
+                found[leave_id] = leave
+            else:
+                archived[year].add(leave_id)
+        for year, leave_ids in archived.items():
+            found.update((leave.id, leave) for leave in self.data_manager._read_partition(year)
+                         if leave.id in leave_ids)
+        return [found[leave_id] for leave_id, _ in ranked if leave_id in found]
+
+    def search(self, query: str = "", username: str = None, statuses: Iterable[str] = None,
+               leave_types: Iterable[str] = None, start: Optional[date] = None,
+               end: Optional[date] = None, limit: int = 100) -> List[LeaveRequest]:
+        """Find leave requests matching every word of query and the filters.
+
+        A word ending in '*' matches by prefix. The date range keeps requests
+        overlapping [start, end]. Results are ordered by start date, newest first.
+        """
+        with self._lock:
+            self._ensure_built()
+
+            # Each clause is a set of doc ids; any-of filters are unions
+            clauses = []
+            for word in query.lower().split():
+                if word.endswith('*'):
+                    clauses.append(self._prefix_matches(word.rstrip('*')))
+                else:
+                    terms = tokenize(word)
+                    clauses.extend(self._postings.get(term, set()) for term in terms)
+            if username:
+                clauses.append(self._postings.get(_field_token('user', username), set()))
+            if statuses:
+                clauses.append(set().union(*(self._postings.get(_field_token('status', status), set())
+                                             for status in statuses)))
+            if leave_types:
+                clauses.append(set().union(*(self._postings.get(_field_token('type', leave_type), set())
+                                             for leave_type in leave_types)))
+
+            clauses.sort(key=len)
+            if clauses and len(clauses[0]) * BROAD_MATCH_SHARE < len(self._by_start):
+                matches = set(clauses[0])
+                for clause in clauses[1:]:
+                    if not matches:
+                        break
+                    matches &= clause
+                if start or end:
+                    matches = [leave_id for leave_id in matches if self._overlaps(leave_id, start, end)]
+                ranked = heapq.nlargest(limit, matches, key=lambda leave_id: self._dates[leave_id][0])
+            else:
+                # Broad or no filters: walking newest first stops after limit matches
+                ranked = self._newest(start, end, limit, clauses)
+            ranked = [(leave_id, self._dates[leave_id][0].year) for leave_id in ranked]
+
+        return self._fetch(ranked)
+
+    def __len__(self):
+        self._ensure_built()
+        return len(self._dates)
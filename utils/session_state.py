@@ -0,0 +1,69 @@
+# app/utils/session_state.py
+
+from collections import OrderedDict
+from typing import Callable, Iterator, MutableMapping
+from config import SESSION_NAMESPACE_SIZE
+
+PREFIX = "_ns_"
+
+class SessionNamespace:
+    """Per-item UI state kept under one session state key.
+
+    Pages that hold state for each item they show (a request being rejected,
+    a form being filled) keep it here instead of in a session state key per
+    item. At most max_entries items are kept, least recently used first out,
+    and prune() drops the items that no longer need any state.
+    """
+
+    def __init__(self, state: MutableMapping, name: str, max_entries: int = SESSION_NAMESPACE_SIZE):
+        self.name = name
+        self.max_entries = max_entries
+        key = PREFIX + name
+        if key not in state:
+            state[key] = OrderedDict()
+        self._entries: OrderedDict = state[key]
+
+    def get(self, key: str, default: Callable[[], object] = dict):
+        """State of one item, created with default() the first time"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        value = self._entries[key] = default()
+        self._evict()
+        return value
+
+    def set(self, key: str, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str, default=None):
+        return self._entries.pop(key, default)
+
+    def prune(self, is_live: Callable[[str], bool]) -> int:
+        """Drop the items is_live rejects; returns how many were dropped"""
+        stale = [key for key in self._entries if not is_live(key)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def clear_namespaces(state: MutableMapping):
+    """Remove every namespace from a session, e.g. at logout"""
+    for key in [key for key in state.keys() if key.startswith(PREFIX)]:
+        del state[key]
@@ -0,0 +1,213 @@
+# app/utils/snapshots.py
+
+import threading
+from dataclasses import dataclass
+from datetime import date
+from functools import cached_property
+from itertools import chain
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+from models.leave import LeaveRequest
+from models.user import User
+
+def _copy(record):
+    """Shallow copy of a dataclass record, without copy.copy's overhead"""
+    clone = object.__new__(type(record))
+    clone.__dict__ = record.__dict__.copy()
+    return clone
+
+def _copy_user(user: User) -> User:
+    clone = _copy(user)
+    clone.leave_balance = dict(user.leave_balance or {})
+    return clone
+
+def _copy_leave(leave: LeaveRequest) -> LeaveRequest:
+    clone = _copy(leave)
+    if leave.transitions is not None:
+        clone.transitions = list(leave.transitions)
+    return clone
+
+EMPTY = MappingProxyType({})
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Read-only view of the data as of one data version.
+
+    Records are private copies that no writer touches, so a reader can walk
+    a snapshot for as long as it likes without locks and without seeing a
+    change half made. Treat the records as read-only.
+    """
+    version: int
+    users: Mapping[str, User]
+    holidays: Tuple[dict, ...]
+    loaded_years: FrozenSet[int]
+    # Leave requests of the loaded years by user, in submission order
+    by_user: Mapping[str, Tuple[LeaveRequest, ...]]
+
+    @cached_property
+    def leave_requests(self) -> Tuple[LeaveRequest, ...]:
+        return tuple(chain.from_iterable(self.by_user.values()))
+
+    @cached_property
+    def _by_id(self) -> Dict[str, LeaveRequest]:
+        return {leave.id: leave for leave in self.leave_requests}
+
+    @cached_property
+    def _members(self) -> Dict[str, FrozenSet[str]]:
+        members: Dict[str, set] = {}
+        for user in self.users.values():
+            members.setdefault((user.department or "").strip(), set()).add(user.username)
+        return {department: frozenset(names) for department, names in members.items()}
+
+    def get_user(self, username: str) -> Optional[User]:
+        return self.users.get(username)
+
+    def get_leave(self, leave_id: str) -> Optional[LeaveRequest]:
+        return self._by_id.get(leave_id)
+
+    def departments(self) -> List[str]:
+        """Names of departments with members, sorted"""
+        return sorted((name for name in self._members if name), key=str.lower)
+
+    def members(self, department: str) -> FrozenSet[str]:
+        return self._members.get((department or "").strip(), frozenset())
+
+    def user_leaves(self, username: str) -> Tuple[LeaveRequest, ...]:
+        return self.by_user.get(username, ())
+
+    def leaves_for(self, usernames: Iterable[str], status: str = None) -> List[LeaveRequest]:
+        """Leave requests of several users, optionally with one status"""
+        return [leave for username in usernames for leave in self.by_user.get(username, ())
+                if status is None or leave.status == status]
+
+    def with_archived(self, years: Iterable[int], leaves: Iterable[LeaveRequest]) -> 'Snapshot':
+        """This snapshot plus leave requests of years read from archived partitions.
+
+        The requests must be fresh from disk, as they are not copied.
+        """
+        by_user = dict(self.by_user)
+        archived: Dict[str, List[LeaveRequest]] = {}
+        for leave in leaves:
+            archived.setdefault(leave.username, []).append(leave)
+        for username, user_leaves in archived.items():
+            by_user[username] = by_user.get(username, ()) + tuple(user_leaves)
+        return Snapshot(self.version, self.users, self.holidays, self.loaded_years | frozenset(years),
+                        MappingProxyType(by_user))
+
+    def approved_leaves(self, start: date, end: date, department: str = None) -> List[LeaveRequest]:
+        """Approved leave requests overlapping [start, end], optionally for one department"""
+        leaves = (self.leaves_for(self.members(department), "Approved") if department
+                  else self.leave_requests)
+        return [leave for leave in leaves
+                if leave.status == "Approved" and leave.start_date <= end and leave.end_date >= start]
+
+class SnapshotStore:
+    """Publishes copy-on-write snapshots of a DataManager's data.
+
+    Change events record which users and leave requests changed. When the
+    DataManager publishes (after a change, or at the end of a transaction)
+    the next snapshot copies only those records and the per-user tuples
+    they belong to; everything else is shared with the previous snapshot.
+    Reading `current` is a plain attribute read, so readers never wait for
+    writers and never see a transaction that is still in progress.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._lock = threading.Lock()
+        self._reset = True
+        self._users: Dict[str, Optional[User]] = {}
+        self._leaves: Dict[str, Tuple[str, Optional[LeaveRequest]]] = {}
+        self._holidays = False
+        self.current = Snapshot(0, EMPTY, (), frozenset(), EMPTY)
+        data_manager.add_listener(self._on_change)
+
+    def _on_change(self, event: str, payload):
+        with self._lock:
+            if event == 'reset':
+                self._reset = True
+                self._users, self._leaves, self._holidays = {}, {}, False
+            elif self._reset:
+                return  # Everything is copied on the next publish
+            elif event in ('user_added', 'user_updated'):
+                self._users[payload.username] = payload
+            elif event == 'user_deleted':
+                self._users[payload.username] = None
+            elif event in ('leave_added', 'leave_updated'):
+                self._leaves[payload.id] = (payload.username, payload)
+            elif event in ('leaves_loaded', 'leaves_restored'):
+                for leave in payload:
+                    self._leaves[leave.id] = (leave.username, leave)
+            elif event in ('leaves_removed', 'leaves_unloaded'):
+                for leave in payload:
+                    self._leaves[leave.id] = (leave.username, None)
+            elif event == 'holidays_added':
+                self._holidays = True
+
+    @property
+    def stale(self) -> bool:
+        return (self._reset or bool(self._users) or bool(self._leaves) or self._holidays
+                or self.current.loaded_years != self.data_manager.loaded_years)
+
+    def publish(self) -> Snapshot:
+        """Make the DataManager's current state the snapshot readers get.
+
+        Called by the DataManager with its lock held, so no change is half
+        made while records are copied.
+        """
+        data_manager = self.data_manager
+        with self._lock:
+            if not self.stale:
+                if self.current.version != data_manager.version:
+                    self.current = Snapshot(data_manager.version, self.current.users, self.current.holidays,
+                                            self.current.loaded_years, self.current.by_user)
+                return self.current
+
+            previous = self.current
+            if self._reset:
+                users = {username: _copy_user(user) for username, user in data_manager.users.items()}
+                by_user: Dict[str, Dict[str, LeaveRequest]] = {}
+                for leave in data_manager.visible_leaves():
+                    by_user.setdefault(leave.username, {})[leave.id] = _copy_leave(leave)
+                leaves = {username: tuple(user_leaves.values()) for username, user_leaves in by_user.items()}
+            else:
+                users = previous.users
+                if self._users:
+                    users = dict(users)
+                    for username, user in self._users.items():
+                        if user is None:
+                            users.pop(username, None)
+                        else:
+                            users[username] = _copy_user(user)
+                leaves = previous.by_user
+                if self._leaves:
+                    leaves = dict(leaves)
+                    changed: Dict[str, Dict[str, Optional[LeaveRequest]]] = {}
+                    for leave_id, (username, leave) in self._leaves.items():
+                        changed.setdefault(username, {})[leave_id] = leave
+                    for username, user_changes in changed.items():
+                        user_leaves = {leave.id: leave for leave in leaves.get(username, ())}
+                        for leave_id, leave in user_changes.items():
+                            if leave is None:
+                                user_leaves.pop(leave_id, None)
+                            else:
+                                user_leaves[leave_id] = _copy_leave(leave)
+                        if user_leaves:
+                            leaves[username] = tuple(user_leaves.values())
+                        else:
+                            leaves.pop(username, None)
+
+            holidays = previous.holidays
+            if self._reset or self._holidays:
+                holidays = tuple(dict(holiday) for holiday in data_manager.holidays)
+
+            self.current = Snapshot(
+                version=data_manager.version,
+                users=users if isinstance(users, MappingProxyType) else MappingProxyType(users),
+                holidays=holidays,
+                loaded_years=frozenset(data_manager.loaded_years),
+                by_user=leaves if isinstance(leaves, MappingProxyType) else MappingProxyType(leaves),
+            )
+            self._reset = False
+            self._users, self._leaves, self._holidays = {}, {}, False
+            return self.current
@@ -0,0 +1,73 @@
+# app/utils/storage.py
+
+import bz2
+import lzma
+import os
+import pickle
+import zlib
+from pathlib import Path
+from config import STORAGE_CODEC, STORAGE_LEVEL
+
+def _zlib(data: bytes, level: int) -> bytes:
+    return zlib.compress(data, level)
+
+def _bz2(data: bytes, level: int) -> bytes:
+    return bz2.compress(data, max(1, level))
+
+def _lzma(data: bytes, level: int) -> bytes:
+    return lzma.compress(data, preset=level)
+
+# Every codec's output starts with its own magic bytes and a pickle starts
+# with 0x80, so files are decoded by what they contain, whatever the setting
+# was when they were written
+CODECS = {
+    'none': None,
+    'zlib': _zlib,
+    'bz2': _bz2,
+    'lzma': _lzma,
+}
+
+# A bad setting would otherwise only show up as failed saves, so refuse to start
+if STORAGE_CODEC not in CODECS:
+    raise ValueError(f"Unknown LMS_STORAGE_CODEC '{STORAGE_CODEC}', expected one of {', '.join(CODECS)}")
+if not 0 <= STORAGE_LEVEL <= 9:
+    raise ValueError(f"LMS_STORAGE_LEVEL must be between 0 and 9, got {STORAGE_LEVEL}")
+
+def compress(data: bytes, codec: str = None, level: int = None) -> bytes:
+    """Compress data with codec (config.STORAGE_CODEC by default)"""
+    codec = codec or STORAGE_CODEC
+    if codec not in CODECS:
+        raise ValueError(f"Unknown storage codec '{codec}', expected one of {', '.join(CODECS)}")
+    if CODECS[codec] is None:
+        return data
+    return CODECS[codec](data, STORAGE_LEVEL if level is None else level)
+
+def decompress(data) -> bytes:
+    """Undo compress() with whichever codec wrote data; plain data is returned as is"""
+    head = bytes(data[:6])
+    if head[:1] == b'\x78':
+        return zlib.decompress(data)
+    if head[:3] == b'BZh':
+        return bz2.decompress(data)
+    if head == b'\xfd7zXZ\x00':
+        return lzma.decompress(data)
+    return data
+
+def write_pickle(path: Path, obj, codec: str = None, level: int = None) -> int:
+    """Atomically write obj to path; returns the number of bytes written.
+
+    Data is written to a temporary file and renamed over the target, so
+    readers never see a partially written file.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    data = compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), codec, level)
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+def read_pickle(path: Path):
+    """Read a pickled object; the whole file is unpickled into memory"""
+    with open(path, 'rb') as f:
+        return pickle.loads(decompress(f.read()))
@@ -0,0 +1,136 @@
+# app/utils/tenants.py
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from config import (DATA_DIR, TENANTS_DIR, TENANTS_FILE, DEFAULT_TENANT, DEFAULT_TENANT_NAME,
+                    TENANT_CACHE_SIZE)
+from utils.data_manager import DataManager
+from utils.storage import read_pickle, write_pickle
+
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{0,39}$")
+
+@dataclass
+class Tenant:
+    id: str
+    name: str
+    created_at: datetime = field(default_factory=datetime.now)
+
+class TenantRegistry:
+    """Organisations hosted by this installation and where their data lives.
+
+    The default tenant keeps using the data directory itself, so existing
+    single-tenant installs are unchanged; every other tenant gets its own
+    shard under tenants/<id> with its own users, leaves and backups.
+    """
+
+    def __init__(self, data_dir: Path = None):
+        self.data_dir = Path(data_dir) if data_dir else DATA_DIR
+        self.file = self.data_dir / TENANTS_FILE.name
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Tenant]:
+        tenants = {DEFAULT_TENANT: Tenant(DEFAULT_TENANT, DEFAULT_TENANT_NAME, datetime.min)}
+        if self.file.exists():
+            tenants.update(read_pickle(self.file))
+        return tenants
+
+    def tenants(self) -> List[Tenant]:
+        """All tenants, the default one first"""
+        tenants = self._load()
+        default = tenants.pop(DEFAULT_TENANT)
+        return [default] + sorted(tenants.values(), key=lambda tenant: tenant.name.lower())
+
+    def get(self, tenant_id: str) -> Optional[Tenant]:
+        return self._load().get(tenant_id)
+
+    def add(self, tenant_id: str, name: str) -> Tenant:
+        """Register a tenant and create its data directory.
+
+        Raises ValueError if the id is malformed or taken.
+        """
+        tenant_id = (tenant_id or "").strip().lower()
+        name = (name or "").strip() or tenant_id
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise ValueError("Organization id must be 1-40 lowercase letters, digits or dashes")
+        with self._lock:
+            tenants = self._load()
+            if tenant_id in tenants:
+                raise ValueError(f"Organization '{tenant_id}' already exists")
+            tenant = Tenant(tenant_id, name)
+            self.data_dir_for(tenant_id).mkdir(parents=True, exist_ok=True)
+            tenants[tenant_id] = tenant
+            del tenants[DEFAULT_TENANT]
+            write_pickle(self.file, tenants)
+        return tenant
+
+    def data_dir_for(self, tenant_id: str) -> Path:
+        if tenant_id == DEFAULT_TENANT:
+            return self.data_dir
+        return self.data_dir / TENANTS_DIR.name / tenant_id
+
+class TenantManagers:
+    """One DataManager per tenant, at most `capacity` of them open.
+
+    Tenants have their own files and their own DataManager lock, so a busy
+    tenant does not hold up the others, and opening one tenant only blocks
+    sessions of that tenant. The least recently used tenant is closed when
+    more than capacity are open. Sessions fetch their DataManager on every
+    run, so a closed tenant is simply loaded again on its next request.
+    """
+
+    def __init__(self, registry: TenantRegistry = None, capacity: int = TENANT_CACHE_SIZE,
+                 on_open: Callable[[DataManager], None] = None,
+                 on_close: Callable[[DataManager], None] = None):
+        self.registry = registry or TenantRegistry()
+        self.capacity = capacity
+        self.on_open = on_open
+        self.on_close = on_close
+        self._lock = threading.Lock()
+        self._open: 'OrderedDict[str, DataManager]' = OrderedDict()
+        self._opening: Dict[str, threading.Lock] = {}
+
+    def _cached(self, tenant_id: str) -> Optional[DataManager]:
+        with self._lock:
+            data_manager = self._open.get(tenant_id)
+            if data_manager is not None:
+                self._open.move_to_end(tenant_id)
+            return data_manager
+
+    def get(self, tenant_id: str) -> DataManager:
+        """The tenant's DataManager, loading it if needed; KeyError for unknown tenants"""
+        data_manager = self._cached(tenant_id)
+        if data_manager is not None:
+            return data_manager
+
+        with self._lock:
+            opening = self._opening.setdefault(tenant_id, threading.Lock())
+        with opening:
+            # Another session may have opened it while we waited
+            data_manager = self._cached(tenant_id)
+            if data_manager is not None:
+                return data_manager
+            if self.registry.get(tenant_id) is None:
+                raise KeyError(f"Unknown organization '{tenant_id}'")
+            data_manager = DataManager(self.registry.data_dir_for(tenant_id), tenant=tenant_id)
+            if self.on_open:
+                self.on_open(data_manager)
+            with self._lock:
+                self._open[tenant_id] = data_manager
+                closed = []
+                while len(self._open) > self.capacity:
+                    closed.append(self._open.popitem(last=False)[1])
+
+        for old in closed:
+            if self.on_close:
+                self.on_close(old)
+        return data_manager
+
+    def open_tenants(self) -> List[str]:
+        """Ids of the tenants in memory, least recently used first"""
+        with self._lock:
+            return list(self._open)